@@ -0,0 +1,189 @@
+import threading
+import time
+from datetime import datetime
+
+from metrics_aggregates import LatencyHistogram, value_at_percentiles
+
+DETAILED, AGGREGATE = "detailed", "aggregate"
+OTHER_PATH = "other"
+
+
+class PathAggregate:
+    """Per-second request counts and latency histogram of one path"""
+    __slots__ = ('requests', 'statuses', 'latency', 'latency_sum', 'latency_max')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.latency = LatencyHistogram()
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def add(self, status, latency_ms):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latency.record(latency_ms * 1000)
+        self.latency_sum += latency_ms
+        if latency_ms > self.latency_max:
+            self.latency_max = latency_ms
+
+    def as_dict(self):
+        latency = value_at_percentiles([self.latency], (50, 95, 99))
+        return {
+            "requests": self.requests,
+            "status": {str(status): count for status, count in self.statuses.items()},
+            "latency_p50_ms": latency[50] / 1000,
+            "latency_p95_ms": latency[95] / 1000,
+            "latency_p99_ms": latency[99] / 1000,
+            "latency_sum_ms": self.latency_sum,
+            "latency_max_ms": self.latency_max
+        }
+
+
+class AdaptiveRequestLog:
+    """Switches request logging between per-request and per-second events.
+
+    In `detailed` mode every request is logged as its own event. When the
+    request rate over the last second crosses `rate_threshold`, the log
+    switches to `aggregate` mode: requests are only counted into a
+    `request_aggregate` event per second with counts by path and status
+    and per-path latency percentiles. It switches back once the rate has
+    stayed below `exit_ratio` of the threshold for `hold_seconds`. Every
+    switch is logged as a `log_mode_switch` event.
+
+    Each request is decided once, so it appears either as its own event or
+    in exactly one aggregate and totals stay exact. Flask serves requests
+    on many threads, so state changes happen under one lock and a daemon
+    thread closes seconds that see no request.
+    """
+
+    def __init__(self, source, emit, rate_threshold=2000.0, exit_ratio=0.5, hold_seconds=5.0,
+                 max_paths=256):
+        self.source = source
+        self.emit = emit
+        self.rate_threshold = rate_threshold
+        self.exit_ratio = exit_ratio
+        self.hold_seconds = hold_seconds
+        self.max_paths = max_paths
+
+        self.mode = DETAILED
+        self.second = None
+        self.second_requests = 0
+        self.calm_since = None
+        self.paths = {}
+
+        self.detailed_requests = 0
+        self.aggregated_requests = 0
+        self.switches = 0
+
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def detailed(self, now=None):
+        """Count one request; True if it should be logged as its own event"""
+        second = int(time.time() if now is None else now)
+        with self.lock:
+            if second != self.second:
+                self._roll(second)
+            self.second_requests += 1
+            if self.mode == DETAILED:
+                self.detailed_requests += 1
+                return True
+            return False
+
+    def aggregate(self, path, status, latency_ms):
+        """Fold a request that detailed() turned down into the current second"""
+        with self.lock:
+            entry = self.paths.get(path)
+            if entry is None:
+                if len(self.paths) >= self.max_paths:
+                    path = OTHER_PATH
+                    entry = self.paths.get(path)
+                if entry is None:
+                    entry = self.paths[path] = PathAggregate()
+            entry.add(status, latency_ms)
+            self.aggregated_requests += 1
+
+    def tick(self, now=None):
+        """Close the current second even when no request arrives"""
+        second = int(time.time() if now is None else now)
+        with self.lock:
+            if self.second is not None and second != self.second:
+                self._roll(second)
+
+    def start(self, interval=1.0):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop_event.wait(interval):
+            self.tick()
+
+    def close(self):
+        """Stop the ticker and flush the aggregate of the second still open"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self.lock:
+            self._flush()
+
+    def _roll(self, second):
+        if self.second is not None:
+            self._flush()
+            self._evaluate(self.second_requests, self.second + 1)
+            if second > self.second + 1:
+                # Seconds without any request count as calm
+                self._evaluate(0, second)
+        self.second = second
+        self.second_requests = 0
+
+    def _flush(self):
+        if not self.paths:
+            return
+        paths = self.paths
+        self.paths = {}
+        self.emit({
+            "event_type": "request_aggregate",
+            "timestamp": datetime.fromtimestamp(self.second).isoformat(),
+            "source": self.source,
+            "seconds": 1,
+            "requests": sum(entry.requests for entry in paths.values()),
+            "paths": {path: entry.as_dict() for path, entry in paths.items()},
+            "detailed_requests": self.detailed_requests,
+            "aggregated_requests": self.aggregated_requests
+        })
+
+    def _evaluate(self, rate, at):
+        if self.mode == DETAILED:
+            if rate > self.rate_threshold:
+                self._switch(AGGREGATE, "request_rate", rate)
+            return
+
+        if rate > self.rate_threshold * self.exit_ratio:
+            self.calm_since = None
+        elif self.calm_since is None:
+            self.calm_since = at
+        elif at - self.calm_since >= self.hold_seconds:
+            self._switch(DETAILED, "load_normal", rate)
+
+    def _switch(self, mode, reason, rate):
+        previous = self.mode
+        self.mode = mode
+        self.calm_since = None
+        self.switches += 1
+        self.emit({
+            "event_type": "log_mode_switch",
+            "timestamp": datetime.now().isoformat(),
+            "source": self.source,
+            "mode": mode,
+            "previous_mode": previous,
+            "reason": reason,
+            "request_rate": rate,
+            "rate_threshold": self.rate_threshold,
+            "detailed_requests": self.detailed_requests,
+            "aggregated_requests": self.aggregated_requests
+        })
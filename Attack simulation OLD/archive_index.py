@@ -0,0 +1,278 @@
+"""Seekable log archives with a time-range sidecar index.
+
+Usage:
+    # Events between 14:02 and 14:07 on day 2, reading only the blocks that cover them
+    python3 archive_index.py logs/archives --start '2026-03-02 14:02' --end '2026-03-02 14:07'
+
+    # Rewrite older single-stream archives as indexed ones
+    python3 archive_index.py logs/archives --reindex
+
+Archives are written as a sequence of independent zstd frames (or gzip
+members) of about `block_bytes` uncompressed bytes, cut at line
+boundaries; concatenated frames are still an ordinary .zst/.gz file. The
+`<archive>.idx` sidecar lists each block's compressed offset and length
+and the first and last timestamp seen in it, so a time-range read skips
+whole archives and blocks outside the range and decompresses the rest
+one block at a time. Files without an index are scanned.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from log_files import discover_log_files, iter_lines
+
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+DEFAULT_BLOCK_BYTES = 1024 * 1024
+
+# First timestamp on a line: the JSON "timestamp" of an event, or the asctime
+# prefix of a formatted log line ("2026-03-02 14:02:11,123 - ..." / "...|INFO|")
+TIMESTAMP = re.compile(rb'(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d:\d\d)(?:[.,](\d{1,6}))?')
+
+
+def line_timestamp(line):
+    """Sortable b'YYYY-MM-DD HH:MM:SS.ffffff' key of a line, or None"""
+    match = TIMESTAMP.search(line)
+    if match is None:
+        return None
+    date, clock, fraction = match.groups()
+    return b'%s %s.%s' % (date, clock, (fraction or b'').ljust(6, b'0'))
+
+
+def timestamp_key(value):
+    """datetime or ISO string -> the same sortable key as line_timestamp"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f').encode()
+
+
+def block_time_range(lines):
+    first = last = None
+    for line in lines:
+        key = line_timestamp(line)
+        if key is None:
+            continue
+        if first is None or key < first:
+            first = key
+        if last is None or key > last:
+            last = key
+    return first, last
+
+
+def compress_block(data, codec, level):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress_block(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def iter_blocks(f, block_bytes):
+    """Read a binary stream in blocks of about `block_bytes`, cut after a newline"""
+    carry = b''
+    while True:
+        chunk = f.read(block_bytes)
+        if not chunk:
+            break
+        chunk = carry + chunk
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            carry = chunk
+            continue
+        carry = chunk[cut:]
+        yield chunk[:cut]
+    if carry:
+        yield carry
+
+
+def write_indexed_archive(f_in, f_out, codec='zstd', level=3, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Compress `f_in` into `f_out` block by block; returns the index"""
+    blocks = []
+    offset = 0
+    total_lines = 0
+    total_bytes = 0
+    for data in iter_blocks(f_in, block_bytes):
+        lines = data.splitlines()
+        first, last = block_time_range(lines)
+        compressed = compress_block(data, codec, level)
+        f_out.write(compressed)
+        blocks.append([
+            offset, len(compressed),
+            first.decode() if first else None, last.decode() if last else None,
+            len(lines)
+        ])
+        offset += len(compressed)
+        total_lines += len(lines)
+        total_bytes += len(data)
+
+    stamped = [block for block in blocks if block[2] is not None]
+    return {
+        'version': INDEX_VERSION,
+        'codec': codec,
+        'block_bytes': block_bytes,
+        'first': min(block[2] for block in stamped) if stamped else None,
+        'last': max(block[3] for block in stamped) if stamped else None,
+        'lines': total_lines,
+        'bytes': total_bytes,
+        'blocks': blocks
+    }
+
+
+def write_index(index, archive):
+    """Write `<archive>.idx` atomically"""
+    path = archive + INDEX_SUFFIX
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def load_index(archive):
+    """The sidecar index of an archive, or None if it has none (or a stale one)"""
+    path = archive + INDEX_SUFFIX
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(archive):
+            return None
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION:
+        return None
+    return index
+
+
+def overlaps(first, last, start, end):
+    """Whether [first, last] intersects [start, end) for sortable string keys"""
+    if first is None:
+        return False
+    return (end is None or first < end) and (start is None or last >= start)
+
+
+def iter_archive_range(archive, start=None, end=None, index=None):
+    """Lines of an indexed archive with a timestamp in [start, end).
+
+    `start` and `end` are timestamp_key() values (or None for open ends);
+    only blocks whose time span overlaps the range are read.
+    """
+    index = index or load_index(archive)
+    codec = index['codec']
+    start_text = start.decode() if start else None
+    end_text = end.decode() if end else None
+    with open(archive, 'rb') as f:
+        for offset, length, first, last, _ in index['blocks']:
+            if not overlaps(first, last, start_text, end_text):
+                continue
+            f.seek(offset)
+            data = decompress_block(f.read(length), codec)
+            for line in data.splitlines():
+                key = line_timestamp(line)
+                if key is not None and (start is None or key >= start) and (end is None or key < end):
+                    yield line.decode('utf-8', errors='replace')
+
+
+def iter_file_range(path, start=None, end=None):
+    """Scan a file without an index and yield the lines inside [start, end)"""
+    for line in iter_lines(path):
+        key = line_timestamp(line.encode())
+        if key is not None and (start is None or key >= start) and (end is None or key < end):
+            yield line.rstrip('\n')
+
+
+def plan_time_range(paths, start=None, end=None):
+    """(path, index or None) for files that may hold lines in [start, end)"""
+    start_text = start.decode() if start else None
+    end_text = end.decode() if end else None
+    plan = []
+    for path in paths:
+        index = load_index(path)
+        if index is not None and not overlaps(index['first'], index['last'], start_text, end_text):
+            continue
+        plan.append((path, index))
+    return plan
+
+
+def iter_time_range(inputs, start=None, end=None):
+    """Yield lines in [start, end) from files, globs or directories.
+
+    Indexed archives outside the range are not opened at all; the others
+    are read block by block, and unindexed files are scanned.
+    """
+    start = timestamp_key(start) if start is not None else None
+    end = timestamp_key(end) if end is not None else None
+    for path, index in plan_time_range(discover_log_files(inputs), start, end):
+        if index is not None:
+            yield from iter_archive_range(path, start, end, index)
+        else:
+            yield from iter_file_range(path, start, end)
+
+
+def reindex_archive(path, level=None, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Rewrite a single-stream .zst/.gz archive as an indexed one, atomically"""
+    codec = 'zstd' if path.endswith('.zst') else 'gzip'
+    level = level if level is not None else (3 if codec == 'zstd' else 6)
+    temp_path = f"{path}.tmp"
+    if codec == 'zstd':
+        f_in = zstandard.open(path, 'rb')
+    else:
+        f_in = gzip.open(path, 'rb')
+    try:
+        with f_in, open(temp_path, 'wb') as f_out:
+            index = write_indexed_archive(f_in, f_out, codec, level, block_bytes)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    write_index(index, path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read a time range from indexed log archives')
+    parser.add_argument('inputs', nargs='+', help='Archives, log files, globs or directories')
+    parser.add_argument('--start', help="Inclusive start, e.g. '2026-03-02 14:02'")
+    parser.add_argument('--end', help="Exclusive end, e.g. '2026-03-02 14:07'")
+    parser.add_argument('--output', help='Write matching lines here instead of stdout')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Rewrite .zst/.gz archives that have no index as indexed archives')
+    parser.add_argument('--block-kb', type=int, default=DEFAULT_BLOCK_BYTES // 1024)
+    args = parser.parse_args()
+
+    paths = discover_log_files(args.inputs)
+    if args.reindex:
+        for path in paths:
+            if path.endswith(('.zst', '.gz')) and load_index(path) is None:
+                index = reindex_archive(path, block_bytes=args.block_kb * 1024)
+                print(f"Indexed: {path} ({len(index['blocks'])} blocks, {index['first']} .. {index['last']})")
+        return
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    out = open(args.output, 'w') if args.output else sys.stdout
+    count = 0
+    try:
+        for line in iter_time_range(paths, start, end):
+            out.write(line + '\n')
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"{count:,} lines", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,58 +6,8 @@ import random
 import json
 import logging
 from datetime import datetime
-from dataclasses import dataclass
-from typing import List
 
-@dataclass
-class AttackConfig:
-    name: str
-    concurrent_streams: int
-    request_rate: int  # requests per second
-    duration_seconds: int
-    reset_probability: float  # 0.0 to 1.0
-    endpoints: List[str]
-    user_agents: List[str]
-
-# Define different attack intensities
-ATTACK_CONFIGS = {
-    'light': AttackConfig(
-        name='Light Rapid Reset',
-        concurrent_streams=20,
-        request_rate=50,
-        duration_seconds=30,
-        reset_probability=0.8,
-        endpoints=['/api/fast', '/api/medium'],
-        user_agents=['LightAttacker/1.0', 'TestBot/1.0']
-    ),
-    'medium': AttackConfig(
-        name='Medium Rapid Reset',
-        concurrent_streams=50,
-        request_rate=150,
-        duration_seconds=60,
-        reset_probability=0.9,
-        endpoints=['/api/fast', '/api/medium', '/api/slow'],
-        user_agents=['MediumAttacker/1.0', 'LoadTester/2.0']
-    ),
-    'heavy': AttackConfig(
-        name='Heavy Rapid Reset',
-        concurrent_streams=100,
-        request_rate=300,
-        duration_seconds=45,
-        reset_probability=0.95,
-        endpoints=['/api/fast', '/api/medium', '/api/slow', '/api/heavy'],
-        user_agents=['HeavyAttacker/1.0', 'StressBot/3.0']
-    ),
-    'extreme': AttackConfig(
-        name='Extreme Rapid Reset',
-        concurrent_streams=200,
-        request_rate=500,
-        duration_seconds=30,
-        reset_probability=0.98,
-        endpoints=['/api/fast', '/api/medium', '/api/slow', '/api/heavy', '/api/data/1000'],
-        user_agents=['ExtremeAttacker/1.0', 'MaxStress/4.0']
-    )
-}
+from workload_profiles import ATTACK_CONFIGS, ATTACK_HEADERS, AttackConfig
 
 # Setup attack logging
 logging.basicConfig(
@@ -83,11 +33,7 @@ class RapidResetSimulator:
         user_agent = random.choice(config.user_agents)
         url = f"{self.target_url}{endpoint}"
         
-        headers = {
-            'User-Agent': user_agent,
-            'Accept': 'application/json',
-            'Connection': 'keep-alive'
-        }
+        headers = {'User-Agent': user_agent, **ATTACK_HEADERS}
         
         try:
             # Decide if this request should be reset
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+
+# Headers kept on every request_start event; everything else is only
+# recorded for sampled clients
+DEFAULT_HEADER_ALLOWLIST = ('User-Agent', 'Accept', 'Accept-Encoding', 'Accept-Language',
+                            'Content-Type', 'Connection', 'Cache-Control')
+FINGERPRINT_MODES = ('hash', 'intern')
+
+
+class CapturePolicy:
+    """Decides how much of each request the ML logger records.
+
+    Clients are sampled deterministically: a keyed hash of the client IP
+    maps every client to a fixed point in [0, 1), so a sampled client keeps
+    full header capture for all of its requests and runs with the same seed
+    sample the same clients. Other requests record only the allowlisted
+    headers. Every request gets a header fingerprint of its ordered header
+    names, either a short hash or an id interned on first sight (announced
+    once through `on_new_fingerprint`). Counters fed by every request are
+    kept elsewhere, so sampling never changes the aggregates.
+    """
+
+    def __init__(self, sample_rate=0.1, header_allowlist=DEFAULT_HEADER_ALLOWLIST,
+                 fingerprint='hash', seed=0, max_clients=100000, max_fingerprints=10000,
+                 on_new_fingerprint=None):
+        if fingerprint not in FINGERPRINT_MODES:
+            raise ValueError(f"Unknown fingerprint mode: {fingerprint}")
+        self.sample_rate = sample_rate
+        self.allowlist = frozenset(name.lower() for name in header_allowlist)
+        self.fingerprint_mode = fingerprint
+        self.key = str(seed).encode()
+        self.max_clients = max_clients
+        self.max_fingerprints = max_fingerprints
+        self.on_new_fingerprint = on_new_fingerprint
+        self.threshold = int(min(max(sample_rate, 0.0), 1.0) * (1 << 64))
+
+        self._clients = {}
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def sampled(self, client_ip):
+        """Whether this client's requests are captured in full"""
+        decision = self._clients.get(client_ip)
+        if decision is None:
+            digest = hashlib.blake2b(str(client_ip).encode(), digest_size=8, key=self.key).digest()
+            decision = int.from_bytes(digest, 'big') < self.threshold
+            if len(self._clients) >= self.max_clients:
+                self._clients.clear()
+            self._clients[client_ip] = decision
+        return decision
+
+    def fingerprint(self, names):
+        """Stable id of an ordered tuple of lowercase header names"""
+        fingerprint = self._fingerprints.get(names)
+        if fingerprint is not None:
+            return fingerprint
+
+        with self._lock:
+            fingerprint = self._fingerprints.get(names)
+            if fingerprint is not None:
+                return fingerprint
+            if self.fingerprint_mode == 'intern' and len(self._fingerprints) < self.max_fingerprints:
+                fingerprint = f"h{len(self._fingerprints)}"
+                if self.on_new_fingerprint:
+                    self.on_new_fingerprint(fingerprint, list(names))
+            else:
+                fingerprint = hashlib.blake2b('\n'.join(names).encode(), digest_size=6).hexdigest()
+            if len(self._fingerprints) < self.max_fingerprints:
+                self._fingerprints[names] = fingerprint
+        return fingerprint
+
+    def capture_headers(self, headers, sampled):
+        """(headers to log, fingerprint) for an iterable of (name, value) pairs"""
+        pairs = list(headers)
+        fingerprint = self.fingerprint(tuple(name.lower() for name, _ in pairs))
+        if sampled:
+            return dict(pairs), fingerprint
+        allowlist = self.allowlist
+        return {name: value for name, value in pairs if name.lower() in allowlist}, fingerprint
+
+    @property
+    def fingerprint_count(self):
+        return len(self._fingerprints)
@@ -0,0 +1,264 @@
+"""Single-pass, parallel data quality report for ML training logs.
+
+Usage:
+    python3 data_quality_report.py logs/ml_training_data.jsonl logs/archives \
+        --output logs/data_quality_report.json --workers 8
+
+Produces the same data_quality_report.json as `create_data_quality_report`
+in log-inspector.ipynb without loading the dataset into pandas. Input files
+(plain, rotated or gzipped) are split into tasks for a process pool; each
+task builds a mergeable partial summary in constant memory and the parent
+merges the partials.
+
+Notes on exactness:
+- Large time gaps are exact: timestamps are bucketed by the gap threshold
+  and only bucket min/max are kept, since a gap longer than the threshold
+  can only occur between neighbouring non-empty buckets.
+- Duplicate timestamps are detected within a sliding event-time window
+  (--duplicate-window seconds) and across the edges of neighbouring tasks,
+  which covers duplicates from concurrent writers without keeping every
+  timestamp in memory.
+"""
+import argparse
+import json
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from log_files import discover_log_files, iter_lines, split_byte_ranges
+
+MICROSECONDS = 1000000
+
+
+def parse_timestamp_us(value):
+    """ISO timestamp -> integer microseconds since the epoch (naive local time)"""
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is not None:
+        ts = ts.replace(tzinfo=None)
+    return int((ts - datetime(1970, 1, 1)).total_seconds()) * MICROSECONDS + ts.microsecond
+
+
+def format_timestamp_us(value):
+    return str(datetime(1970, 1, 1) + timedelta(microseconds=value))
+
+
+class QualitySummary:
+    """Mergeable partial summary of one slice of the log stream"""
+
+    def __init__(self, gap_threshold_seconds=300, duplicate_window_seconds=5):
+        self.gap_bucket_us = int(gap_threshold_seconds * MICROSECONDS)
+        self.duplicate_window_us = int(duplicate_window_seconds * MICROSECONDS)
+
+        self.total_records = 0
+        self.non_null_values = 0
+        self.columns = set()
+        self.event_counts = Counter()
+        self.min_ts = None
+        self.max_ts = None
+        self.duplicate_timestamps = 0
+        self.invalid_lines = 0
+        # gap bucket -> [min_ts, max_ts]
+        self.gap_buckets = {}
+
+        # Timestamps near the start and end of this slice, for edge merging
+        self.head = set()
+        self._first_ts = None
+        self._recent = set()
+        self._recent_order = deque()
+
+    def add_record(self, record):
+        self.total_records += 1
+        if not isinstance(record, dict):
+            return
+
+        for key, value in record.items():
+            self.columns.add(key)
+            if value is not None:
+                self.non_null_values += 1
+
+        event_type = record.get('event_type')
+        if event_type is not None:
+            self.event_counts[event_type] += 1
+
+        try:
+            ts = parse_timestamp_us(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return
+        self._add_timestamp(ts)
+
+    def _add_timestamp(self, ts):
+        if self.min_ts is None or ts < self.min_ts:
+            self.min_ts = ts
+        if self.max_ts is None or ts > self.max_ts:
+            self.max_ts = ts
+
+        bucket = ts // self.gap_bucket_us
+        bounds = self.gap_buckets.get(bucket)
+        if bounds is None:
+            self.gap_buckets[bucket] = [ts, ts]
+        elif ts < bounds[0]:
+            bounds[0] = ts
+        elif ts > bounds[1]:
+            bounds[1] = ts
+
+        if self._first_ts is None:
+            self._first_ts = ts
+        if ts - self._first_ts <= self.duplicate_window_us:
+            self.head.add(ts)
+
+        # Windowed duplicate detection
+        horizon = self.max_ts - self.duplicate_window_us
+        while self._recent_order and self._recent_order[0] < horizon:
+            self._recent.discard(self._recent_order.popleft())
+        if ts in self._recent:
+            self.duplicate_timestamps += 1
+        else:
+            self._recent.add(ts)
+            self._recent_order.append(ts)
+
+    @property
+    def tail(self):
+        return self._recent
+
+    def merge(self, other):
+        """Merge a summary of the slice that directly follows this one"""
+        self.duplicate_timestamps += other.duplicate_timestamps + len(self.tail & other.head)
+
+        self.total_records += other.total_records
+        self.non_null_values += other.non_null_values
+        self.columns |= other.columns
+        self.event_counts.update(other.event_counts)
+        self.invalid_lines += other.invalid_lines
+
+        for bucket, (low, high) in other.gap_buckets.items():
+            bounds = self.gap_buckets.get(bucket)
+            if bounds is None:
+                self.gap_buckets[bucket] = [low, high]
+            else:
+                bounds[0] = min(bounds[0], low)
+                bounds[1] = max(bounds[1], high)
+
+        if other.min_ts is not None:
+            if self.min_ts is None:
+                self.head = other.head
+                self._first_ts = other._first_ts
+            self.min_ts = other.min_ts if self.min_ts is None else min(self.min_ts, other.min_ts)
+            self.max_ts = other.max_ts if self.max_ts is None else max(self.max_ts, other.max_ts)
+            self._recent = other._recent
+            self._recent_order = other._recent_order
+        return self
+
+    def large_time_gaps(self):
+        gaps = 0
+        previous_max = None
+        for bucket in sorted(self.gap_buckets):
+            low, high = self.gap_buckets[bucket]
+            if previous_max is not None and low - previous_max > self.gap_bucket_us:
+                gaps += 1
+            previous_max = high
+        return gaps
+
+    def to_report(self):
+        cells = self.total_records * len(self.columns)
+        missing = cells - self.non_null_values
+        completeness = round((1 - missing / cells) * 100, 2) if cells else 0.0
+
+        if self.min_ts is not None:
+            time_range = {
+                'start': format_timestamp_us(self.min_ts),
+                'end': format_timestamp_us(self.max_ts),
+                'duration_hours': (self.max_ts - self.min_ts) / MICROSECONDS / 3600
+            }
+        else:
+            time_range = {'start': None, 'end': None, 'duration_hours': 0}
+
+        return {
+            'assessment_timestamp': datetime.now().isoformat(),
+            'total_records': self.total_records,
+            'time_range': time_range,
+            'data_completeness': {
+                'total_missing_values': int(missing),
+                'completeness_percentage': completeness
+            },
+            'event_distribution': dict(self.event_counts.most_common()),
+            'data_quality_issues': {
+                'duplicate_timestamps': self.duplicate_timestamps,
+                'large_time_gaps': self.large_time_gaps()
+            }
+        }
+
+
+def summarize_range(task):
+    """Process-pool worker: summarise the lines of one file byte range"""
+    path, start, end, gap_threshold, duplicate_window = task
+    summary = QualitySummary(gap_threshold, duplicate_window)
+    for line in iter_lines(path, start, end):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            summary.invalid_lines += 1
+            continue
+        summary.add_record(record)
+    return summary
+
+
+def build_report(paths, workers=None, chunk_mb=64, gap_threshold=300, duplicate_window=5):
+    tasks = []
+    for path in paths:
+        for start, end in split_byte_ranges(path, int(chunk_mb * 1024 * 1024)):
+            tasks.append((path, start, end, gap_threshold, duplicate_window))
+
+    merged = QualitySummary(gap_threshold, duplicate_window)
+    if not tasks:
+        return merged
+
+    # Partials come back in task order, so neighbouring slices merge edge to edge
+    if workers == 1 or len(tasks) == 1:
+        for partial in map(summarize_range, tasks):
+            merged.merge(partial)
+        return merged
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(summarize_range, tasks):
+            merged.merge(partial)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming data quality report for ML logs')
+    parser.add_argument('inputs', nargs='+',
+                        help='JSONL files (plain, rotated or .gz), globs or directories')
+    parser.add_argument('--output', default='logs/data_quality_report.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-mb', type=float, default=64,
+                        help='Split plain files into ranges of this size')
+    parser.add_argument('--gap-threshold', type=float, default=300,
+                        help='Seconds between events that count as a large gap')
+    parser.add_argument('--duplicate-window', type=float, default=5,
+                        help='Event-time window (seconds) for duplicate detection')
+    args = parser.parse_args()
+
+    paths = discover_log_files(args.inputs, patterns=('*.jsonl', '*.jsonl.*'))
+    start = datetime.now()
+    summary = build_report(paths, args.workers, args.chunk_mb,
+                           args.gap_threshold, args.duplicate_window)
+    quality_report = summary.to_report()
+
+    with open(args.output, 'w') as f:
+        json.dump(quality_report, f, indent=2)
+
+    elapsed = (datetime.now() - start).total_seconds()
+    print("\n=== DATA QUALITY SUMMARY ===")
+    print(f"Files: {len(paths)} in {elapsed:.1f}s ({summary.invalid_lines:,} invalid lines skipped)")
+    print(f"Total records: {quality_report['total_records']:,}")
+    print(f"Duration: {quality_report['time_range']['duration_hours']:.2f} hours")
+    print(f"Data completeness: {quality_report['data_completeness']['completeness_percentage']}%")
+    print(f"Report saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
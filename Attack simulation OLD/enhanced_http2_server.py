@@ -6,8 +6,13 @@ import uuid
 from datetime import datetime
 import threading
 from collections import defaultdict, deque
-import psutil
 import os
+import re
+
+from adaptive_logging import AdaptiveRequestLog
+from capture_policy import DEFAULT_HEADER_ALLOWLIST, CapturePolicy
+from metrics_aggregates import RateCounter, RollingLatencyHistogram
+from system_sampler import SystemSampler
 
 # Enhanced logging configuration
 def setup_logging():
@@ -51,39 +56,76 @@ app_logger, ml_logger = setup_logging()
 
 app = Flask(__name__)
 
+# Benign bots send a trace id that is used as the request id, so bot and
+# server logs can be joined (Bots_Server: python -m servers.request_tracing).
+# The two trees are deployed separately and never import each other, and
+# this server is WSGI while HTTP2Server is ASGI, so the id format and the
+# arrival stamp are mirrored here; keep TRACE_ID and RECEIVED_AT identical
+# to Bots_Server/servers/request_tracing.py.
+TRACE_HEADER = 'X-Trace-Id'
+TRACE_ID = re.compile(r'[0-9A-Za-z_-]{1,32}\Z')
+RECEIVED_AT = 'trace.received_at'
+
+def stamp_arrivals(wsgi_app):
+    """WSGI middleware recording when each request reached the app"""
+    def stamped(environ, start_response):
+        environ[RECEIVED_AT] = time.time()
+        return wsgi_app(environ, start_response)
+    return stamped
+
+app.wsgi_app = stamp_arrivals(app.wsgi_app)
+
+# System stats are refreshed in the background; request handlers only read
+# the latest snapshot
+system_sampler = SystemSampler(interval=float(os.environ.get('SYSTEM_SAMPLE_INTERVAL', '1.0')))
+system_sampler.start()
+
 # Global tracking variables
 class ServerMetrics:
-    def __init__(self):
+    def __init__(self, window_seconds=60):
         self.request_count = 0
         self.connection_count = 0
         self.active_connections = set()
-        self.request_times = deque(maxlen=1000)
+        # Fixed-size sliding-window aggregates: per-second rate/latency-sum
+        # buckets and a rotating latency histogram for percentiles
+        self.window_seconds = window_seconds
+        self.request_rate = RateCounter(window_seconds)
+        self.latency_histogram = RollingLatencyHistogram(window_seconds)
+        self.lock = threading.Lock()
         self.request_sizes = deque(maxlen=1000)
         self.client_ips = defaultdict(int)
         self.user_agents = defaultdict(int)
         self.error_count = 0
         self.reset_count = 0
         self.concurrent_requests = 0
+        self.captured_requests = 0
         self.start_time = time.time()
         
-    def add_request(self, client_ip, user_agent, request_size, response_time):
-        self.request_count += 1
-        self.request_times.append(response_time)
-        self.request_sizes.append(request_size)
-        self.client_ips[client_ip] += 1
-        self.user_agents[user_agent] += 1
+    def add_request(self, client_ip, user_agent, request_size, response_time, captured=False):
+        now = time.time()
+        with self.lock:
+            self.request_count += 1
+            if captured:
+                self.captured_requests += 1
+            self.request_rate.add(response_time, now)
+            self.latency_histogram.record(response_time * 1000000, now)
+            self.request_sizes.append(request_size)
+            self.client_ips[client_ip] += 1
+            self.user_agents[user_agent] += 1
         
     def get_metrics_dict(self):
         current_time = time.time()
         uptime = current_time - self.start_time
         
-        # Calculate rates
-        recent_requests = [t for t in self.request_times if current_time - t < 60]
-        requests_per_minute = len(recent_requests)
+        # Calculate rates over the sliding window
+        with self.lock:
+            window_requests = self.request_rate.count(current_time)
+            avg_response_time = self.request_rate.mean(current_time)
+            latency = self.latency_histogram.percentiles((50, 95, 99), current_time)
+        requests_per_minute = window_requests * 60 / self.window_seconds
         
-        # System metrics
-        cpu_percent = psutil.cpu_percent()
-        memory_info = psutil.virtual_memory()
+        # System metrics from the shared background snapshot
+        system = system_sampler.snapshot
         
         return {
             'timestamp': datetime.now().isoformat(),
@@ -97,23 +139,75 @@ class ServerMetrics:
             'concurrent_requests': self.concurrent_requests,
             'unique_clients': len(self.client_ips),
             'unique_user_agents': len(self.user_agents),
-            'avg_response_time': sum(self.request_times) / len(self.request_times) if self.request_times else 0,
-            'cpu_percent': cpu_percent,
-            'memory_percent': memory_info.percent,
-            'memory_used_mb': memory_info.used / 1024 / 1024
+            'captured_requests': self.captured_requests,
+            'header_fingerprints': capture_policy.fingerprint_count,
+            'avg_response_time': avg_response_time,
+            'response_time_p50_ms': latency[50] / 1000,
+            'response_time_p95_ms': latency[95] / 1000,
+            'response_time_p99_ms': latency[99] / 1000,
+            'cpu_percent': system.cpu_percent,
+            'memory_percent': system.memory_percent,
+            'memory_used_mb': system.memory_used_mb,
+            'process_cpu_percent': system.process_cpu_percent,
+            'process_rss_mb': system.process_rss_mb,
+            'process_num_fds': system.process_num_fds,
+            'process_num_threads': system.process_num_threads,
+            'system_sample_time': system.sample_timestamp
         }
 
-metrics = ServerMetrics()
+metrics = ServerMetrics(window_seconds=int(os.environ.get('METRICS_WINDOW_SECONDS', '60')))
+
+def log_header_fingerprint(fingerprint, header_names):
+    ml_logger.info(json.dumps({
+        'event_type': 'header_fingerprint',
+        'timestamp': datetime.now().isoformat(),
+        'header_fingerprint': fingerprint,
+        'header_names': header_names
+    }))
+
+# Full headers and measured body sizes for a deterministic sample of
+# clients; everyone else gets allowlisted headers and a header fingerprint.
+# Counters in `metrics` still see every request.
+capture_policy = CapturePolicy(
+    sample_rate=float(os.environ.get('CAPTURE_SAMPLE_RATE', '0.1')),
+    header_allowlist=[name.strip() for name in os.environ.get(
+        'CAPTURE_HEADER_ALLOWLIST', ','.join(DEFAULT_HEADER_ALLOWLIST)).split(',') if name.strip()],
+    fingerprint=os.environ.get('CAPTURE_FINGERPRINT', 'hash'),
+    seed=os.environ.get('CAPTURE_SEED', '0'),
+    on_new_fingerprint=log_header_fingerprint
+)
+
+def log_ml_event(event):
+    ml_logger.info(json.dumps(event))
+
+# Above ADAPTIVE_RATE_THRESHOLD requests/s the request_start/request_end
+# pairs give way to one request_aggregate event per second; logging here is
+# synchronous, so request rate is the only load signal
+request_log = None
+if os.environ.get('ADAPTIVE_LOGGING', '0') == '1':
+    request_log = AdaptiveRequestLog(
+        'enhanced_http2_server', log_ml_event,
+        rate_threshold=float(os.environ.get('ADAPTIVE_RATE_THRESHOLD', '500')),
+        hold_seconds=float(os.environ.get('ADAPTIVE_HOLD_SECONDS', '5'))
+    )
+    request_log.start()
 
 @app.before_request
 def before_request():
     """Enhanced request logging and tracking"""
     request.start_time = time.time()
-    request.request_id = str(uuid.uuid4())[:8]
+    trace_id = request.headers.get(TRACE_HEADER)
+    request.trace_id = trace_id if trace_id and TRACE_ID.match(trace_id) else None
+    request.request_id = request.trace_id or str(uuid.uuid4())[:8]
     
     # Track concurrent requests
     metrics.concurrent_requests += 1
     
+    # Under load this request is only counted in a per-second aggregate
+    request.detailed = request_log is None or request_log.detailed(request.start_time)
+    if not request.detailed:
+        return
+    
     # Extract detailed request information
     client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
     user_agent = request.headers.get('User-Agent', 'Unknown')
@@ -126,6 +220,9 @@ def before_request():
     protocol = request.environ.get('SERVER_PROTOCOL', 'Unknown')
     connection_header = request.headers.get('Connection', '')
     
+    request.captured = capture_policy.sampled(client_ip)
+    headers, header_fingerprint = capture_policy.capture_headers(request.headers, request.captured)
+    
     # Enhanced logging
     app_logger.info(f"REQUEST_START|{request.request_id}|{client_ip}|{method}|{path}|{user_agent}")
     
@@ -142,10 +239,16 @@ def before_request():
         'protocol': protocol,
         'content_length': content_length,
         'connection_header': connection_header,
-        'headers': dict(request.headers),
+        'headers': headers,
+        'header_fingerprint': header_fingerprint,
+        'capture_sampled': request.captured,
         'concurrent_requests': metrics.concurrent_requests,
         'client_request_count': metrics.client_ips[client_ip]
     }
+    if request.trace_id:
+        request_data['trace_id'] = request.trace_id
+        request_data['received_at'] = request.environ.get(RECEIVED_AT, request.start_time)
+        request_data['handler_start'] = request.start_time
     
     ml_logger.info(json.dumps(request_data))
 
@@ -161,12 +264,24 @@ def after_request(response):
         user_agent = request.headers.get('User-Agent', 'Unknown')
         request_size = request.content_length or 0
         
-        metrics.add_request(client_ip, user_agent, request_size, response_time)
+        captured = getattr(request, 'captured', False)
+        metrics.add_request(client_ip, user_agent, request_size, response_time, captured)
         metrics.concurrent_requests -= 1
         
+        if not getattr(request, 'detailed', True):
+            route = request.url_rule.rule if request.url_rule else 'other'
+            request_log.aggregate(route, response.status_code, response_time * 1000)
+            return response
+        
         # Enhanced response logging
         app_logger.info(f"REQUEST_END|{request.request_id}|{response.status_code}|{response_time:.3f}s")
         
+        # Content-Length is set for buffered responses; only sampled requests
+        # pay for materialising a body that lacks it
+        response_size = response.content_length
+        if response_size is None and captured and not response.is_streamed:
+            response_size = len(response.get_data())
+        
         # JSON structured log for ML training
         response_data = {
             'event_type': 'request_end',
@@ -174,10 +289,13 @@ def after_request(response):
             'request_id': request.request_id,
             'status_code': response.status_code,
             'response_time_ms': response_time * 1000,
-            'response_size': len(response.get_data()),
+            'response_size': response_size,
             'content_type': response.content_type,
             'server_metrics': metrics.get_metrics_dict()
         }
+        if request.trace_id:
+            response_data['trace_id'] = request.trace_id
+            response_data['handler_end'] = end_time
         
         ml_logger.info(json.dumps(response_data))
         
@@ -247,3 +365,5 @@ def handle_exception(e):
 if __name__ == '__main__':
     app_logger.info("Starting Enhanced HTTP/2 Server with detailed logging...")
     app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+    if request_log:
+        request_log.close()
@@ -0,0 +1,347 @@
+"""Stream ml_training_data.jsonl into typed, per-event-type Parquet tables.
+
+Usage:
+    python3 export_parquet.py logs/ml_training_data.jsonl --output logs/parquet
+
+Every event type gets its own fixed schema (no shared wide table), with real
+timestamp columns and dictionary-encoded low-cardinality strings. Output is
+hive-partitioned by hour:
+
+    <output>/<event_type>/date=YYYY-MM-DD/hour=HH/part-00000.parquet
+
+Records are buffered per partition and flushed as row groups, so memory use
+is bounded by the number of open partitions, not by the input size.
+"""
+import argparse
+import json
+import os
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from log_files import discover_log_files, open_log_file
+
+STRING = pa.string()
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+TIMESTAMP = pa.timestamp('us')
+
+SERVER_METRIC_FIELDS = [
+    ('uptime_seconds', pa.float64()),
+    ('total_requests', pa.int64()),
+    ('requests_per_minute', pa.float64()),
+    ('active_connections', pa.int32()),
+    ('total_connections', pa.int64()),
+    ('error_count', pa.int64()),
+    ('reset_count', pa.int64()),
+    ('concurrent_requests', pa.int32()),
+    ('unique_clients', pa.int64()),
+    ('unique_user_agents', pa.int64()),
+    ('captured_requests', pa.int64()),
+    ('header_fingerprints', pa.int64()),
+    ('avg_response_time', pa.float64()),
+    ('response_time_p50_ms', pa.float64()),
+    ('response_time_p95_ms', pa.float64()),
+    ('response_time_p99_ms', pa.float64()),
+    ('cpu_percent', pa.float32()),
+    ('memory_percent', pa.float32()),
+    ('memory_used_mb', pa.float64()),
+    ('process_cpu_percent', pa.float32()),
+    ('process_rss_mb', pa.float64()),
+    ('process_num_fds', pa.int32()),
+    ('process_num_threads', pa.int32()),
+]
+
+# event_type -> [(column, arrow type, key path in the JSON record)]
+EVENT_SCHEMAS = {
+    'request_start': [
+        ('request_id', STRING, ('request_id',)),
+        ('client_ip', CATEGORY, ('client_ip',)),
+        ('method', CATEGORY, ('method',)),
+        ('path', CATEGORY, ('path',)),
+        ('query_string', STRING, ('query_string',)),
+        ('user_agent', CATEGORY, ('user_agent',)),
+        ('protocol', CATEGORY, ('protocol',)),
+        ('content_length', pa.int64(), ('content_length',)),
+        ('connection_header', CATEGORY, ('connection_header',)),
+        ('headers_json', STRING, ('headers',)),
+        ('header_fingerprint', CATEGORY, ('header_fingerprint',)),
+        ('capture_sampled', pa.bool_(), ('capture_sampled',)),
+        ('concurrent_requests', pa.int32(), ('concurrent_requests',)),
+        ('client_request_count', pa.int64(), ('client_request_count',)),
+        ('trace_id', STRING, ('trace_id',)),
+        ('received_at', pa.float64(), ('received_at',)),
+        ('handler_start', pa.float64(), ('handler_start',)),
+    ],
+    'request_end': [
+        ('request_id', STRING, ('request_id',)),
+        ('status_code', pa.int16(), ('status_code',)),
+        ('response_time_ms', pa.float64(), ('response_time_ms',)),
+        ('response_size', pa.int64(), ('response_size',)),
+        ('content_type', CATEGORY, ('content_type',)),
+        ('trace_id', STRING, ('trace_id',)),
+        ('handler_end', pa.float64(), ('handler_end',)),
+    ] + [
+        (f'server_{name}', arrow_type, ('server_metrics', name))
+        for name, arrow_type in SERVER_METRIC_FIELDS
+    ],
+    'normal_request': [
+        ('request_id', pa.int64(), ('request_id',)),
+        ('endpoint', CATEGORY, ('endpoint',)),
+        ('status_code', pa.int16(), ('status_code',)),
+        ('response_time_ms', pa.float64(), ('response_time_ms',)),
+        ('user_agent', CATEGORY, ('user_agent',)),
+    ],
+    'error': [
+        ('request_id', STRING, ('request_id',)),
+        ('error_type', CATEGORY, ('error_type',)),
+        ('error_message', STRING, ('error_message',)),
+        ('path', CATEGORY, ('path',)),
+    ],
+    'attack_start': [
+        ('attack_name', CATEGORY, ('attack_name',)),
+        ('config_json', STRING, ('config',)),
+    ],
+    'attack_end': [
+        ('attack_name', CATEGORY, ('attack_name',)),
+        ('total_requests', pa.int64(), ('total_requests',)),
+        ('duration_seconds', pa.float64(), ('duration_seconds',)),
+    ],
+    'normal_traffic_start': [
+        ('duration_hours', pa.float64(), ('duration_hours',)),
+    ],
+    'normal_traffic_end': [
+        ('total_requests', pa.int64(), ('total_requests',)),
+        ('duration_seconds', pa.float64(), ('duration_seconds',)),
+        ('average_rps', pa.float64(), ('average_rps',)),
+    ],
+}
+
+# Anything not listed above keeps its full record as JSON
+OTHER_EVENT_SCHEMA = [
+    ('event_type', CATEGORY, ('event_type',)),
+    ('payload_json', STRING, ()),
+]
+
+
+def arrow_schema(columns):
+    fields = [pa.field('timestamp', TIMESTAMP, nullable=False)]
+    fields += [pa.field(name, arrow_type) for name, arrow_type, _ in columns]
+    return pa.schema(fields)
+
+
+def extract_value(record, key_path):
+    if not key_path:
+        return json.dumps(record)
+    value = record
+    for key in key_path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class PartitionBuffer:
+    """Column buffers and Parquet writer for one event_type/hour partition"""
+
+    def __init__(self, directory, schema, columns, compression):
+        self.directory = directory
+        self.schema = schema
+        self.columns = columns
+        self.compression = compression
+        self.timestamps = []
+        self.values = [[] for _ in columns]
+        self.writer = None
+        self.part = 0
+        self.rows_written = 0
+
+    def append(self, timestamp, record):
+        self.timestamps.append(timestamp)
+        for column_values, (_, _, key_path) in zip(self.values, self.columns):
+            column_values.append(extract_value(record, key_path))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _build_arrays(self):
+        arrays = [pa.array(self.timestamps, type=TIMESTAMP)]
+        for column_values, (name, arrow_type, _) in zip(self.values, self.columns):
+            try:
+                arrays.append(pa.array(column_values, type=arrow_type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                # Tolerate odd values (e.g. "unknown" in a numeric column)
+                arrays.append(pa.array(
+                    [coerce(value, arrow_type) for value in column_values], type=arrow_type
+                ))
+        return arrays
+
+    def flush(self):
+        if not self.timestamps:
+            return
+        if self.writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'part-{self.part:05d}.parquet')
+            while os.path.exists(path):
+                self.part += 1
+                path = os.path.join(self.directory, f'part-{self.part:05d}.parquet')
+            self.writer = pq.ParquetWriter(
+                path, self.schema, compression=self.compression, use_dictionary=True
+            )
+
+        table = pa.Table.from_arrays(self._build_arrays(), schema=self.schema)
+        self.writer.write_table(table)
+        self.rows_written += len(self.timestamps)
+        self.timestamps = []
+        self.values = [[] for _ in self.columns]
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.part += 1
+
+
+def coerce(value, arrow_type):
+    if value is None:
+        return None
+    try:
+        if pa.types.is_integer(arrow_type):
+            return int(value)
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+class ParquetExporter:
+    def __init__(self, output_dir, row_group_size=65536, max_open_partitions=64,
+                 compression='zstd'):
+        self.output_dir = output_dir
+        self.row_group_size = row_group_size
+        self.max_open_partitions = max_open_partitions
+        self.compression = compression
+        self.partitions = OrderedDict()
+        self.schemas = {
+            event_type: (arrow_schema(columns), columns)
+            for event_type, columns in EVENT_SCHEMAS.items()
+        }
+        self.schemas['other'] = (arrow_schema(OTHER_EVENT_SCHEMA), OTHER_EVENT_SCHEMA)
+        self.stats = {
+            'lines_read': 0,
+            'invalid_lines': 0,
+            'rows_by_event_type': defaultdict(int)
+        }
+
+    def _partition(self, table_name, timestamp):
+        key = (table_name, timestamp.strftime('%Y-%m-%d'), timestamp.hour)
+        partition = self.partitions.get(key)
+        if partition is not None:
+            self.partitions.move_to_end(key)
+            return partition
+
+        # Close the least recently used partition; a later reopen starts a new part file
+        if len(self.partitions) >= self.max_open_partitions:
+            _, oldest = self.partitions.popitem(last=False)
+            oldest.close()
+
+        schema, columns = self.schemas[table_name]
+        directory = os.path.join(
+            self.output_dir, table_name, f'date={key[1]}', f'hour={key[2]:02d}'
+        )
+        partition = PartitionBuffer(directory, schema, columns, self.compression)
+        self.partitions[key] = partition
+        return partition
+
+    def add_record(self, record):
+        try:
+            timestamp = datetime.fromisoformat(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            self.stats['invalid_lines'] += 1
+            return
+
+        event_type = record.get('event_type')
+        table_name = event_type if event_type in EVENT_SCHEMAS else 'other'
+
+        partition = self._partition(table_name, timestamp.replace(tzinfo=None))
+        partition.append(timestamp.replace(tzinfo=None), record)
+        self.stats['rows_by_event_type'][table_name] += 1
+
+        if len(partition) >= self.row_group_size:
+            partition.flush()
+
+    def export_file(self, path):
+        with open_log_file(path) as f:
+            for line in f:
+                self.stats['lines_read'] += 1
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    self.stats['invalid_lines'] += 1
+                    continue
+                if isinstance(record, dict):
+                    self.add_record(record)
+                else:
+                    self.stats['invalid_lines'] += 1
+
+    def close(self):
+        for partition in self.partitions.values():
+            partition.close()
+        self.partitions.clear()
+
+
+def read_events(parquet_dir, event_type, columns=None, filters=None):
+    """Load one event table (all partitions) as a pandas DataFrame"""
+    table = pq.read_table(
+        os.path.join(parquet_dir, event_type),
+        columns=columns,
+        filters=filters,
+        partitioning='hive'
+    )
+    return table.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export ML training JSONL logs to Parquet')
+    parser.add_argument('inputs', nargs='+',
+                        help='JSONL files (plain or .gz), globs or directories')
+    parser.add_argument('--output', default='logs/parquet', help='Output directory')
+    parser.add_argument('--row-group-size', type=int, default=65536)
+    parser.add_argument('--max-open-partitions', type=int, default=64)
+    parser.add_argument('--compression', default='zstd',
+                        choices=['zstd', 'snappy', 'gzip', 'lz4', 'none'])
+    args = parser.parse_args()
+
+    exporter = ParquetExporter(
+        args.output,
+        row_group_size=args.row_group_size,
+        max_open_partitions=args.max_open_partitions,
+        compression=args.compression
+    )
+
+    start = datetime.now()
+    try:
+        for path in discover_log_files(args.inputs):
+            print(f"Exporting {path}")
+            exporter.export_file(path)
+    finally:
+        exporter.close()
+
+    elapsed = (datetime.now() - start).total_seconds()
+    stats = exporter.stats
+    print(f"Read {stats['lines_read']:,} lines in {elapsed:.1f}s "
+          f"({stats['invalid_lines']:,} invalid)")
+    for event_type, rows in sorted(stats['rows_by_event_type'].items()):
+        print(f"  {event_type}: {rows:,} rows")
+    print(f"Parquet tables written to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
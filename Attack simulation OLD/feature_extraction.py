@@ -0,0 +1,520 @@
+"""Windowed per-client feature matrices from server request logs.
+
+Usage:
+    python3 feature_extraction.py logs/parquet --windows 1 10 60 \
+        --group-by client --output logs/features.parquet
+
+    python3 feature_extraction.py logs/ml_training_data.jsonl logs/archives \
+        --group-by connection --output logs/features.npz
+
+Inputs are either a Parquet directory written by export_parquet.py (read
+one hourly partition at a time) or JSONL files (plain, rotated or gzipped,
+read `--chunk-lines` at a time). Either way memory is bounded by a chunk
+plus the requests of the last open window, so multi-day logs are processed
+out of core. The Parquet input is the fast path: columns arrive typed and
+dictionary-encoded and all work below is vectorised; JSONL input is
+limited by json.loads.
+
+Each chunk's request_start rows are joined to their request_end rows by
+request_id (Arrow hash join). Starts whose end has not been seen yet are
+carried into the next chunk; a start still unmatched `--end-timeout`
+seconds behind the newest event is counted as reset, meaning the
+client went away before a response was logged.
+
+Requests older than the watermark are cut into aligned windows of every
+size in `--windows` and grouped by client (client_ip), connection
+(client_ip + user_agent, the closest thing to a connection in the logged
+schema) or globally. Features per (window, group), computed with NumPy
+sort/reduceat/bincount kernels:
+
+    request_count, request_rate, reset_ratio, error_ratio,
+    interarrival_mean_ms, interarrival_std_ms, interarrival_min_ms,
+    interarrival_cv, path_entropy, unique_paths, latency_mean_ms,
+    latency_p50_ms, latency_p95_ms, latency_p99_ms, concurrent_mean,
+    concurrent_max
+
+Undefined values (e.g. inter-arrival stats of a single request) are NaN.
+The output is one dense float32 row per (window_seconds, window_start,
+group), written incrementally as Parquet or collected into an .npz with a
+`features` matrix and `columns`, `window_start_us`, `window_seconds` and
+`group` arrays.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from log_files import discover_log_files, iter_lines
+
+MICROSECONDS = 1000000
+
+FEATURE_COLUMNS = [
+    'request_count', 'request_rate', 'reset_ratio', 'error_ratio',
+    'interarrival_mean_ms', 'interarrival_std_ms', 'interarrival_min_ms', 'interarrival_cv',
+    'path_entropy', 'unique_paths',
+    'latency_mean_ms', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+    'concurrent_mean', 'concurrent_max'
+]
+
+START_COLUMNS = ['request_id', 'timestamp', 'client_ip', 'user_agent', 'path', 'concurrent_requests']
+END_COLUMNS = ['request_id', 'status_code', 'response_time_ms']
+GROUP_KINDS = ('client', 'connection', 'global')
+
+
+class Encoder:
+    """Stable integer codes for strings (or int keys) across chunks"""
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def _code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.labels)
+            self.labels.append(value)
+        return code
+
+    def encode(self, array):
+        """Arrow string or dictionary array -> int32 NumPy codes"""
+        if isinstance(array, pa.ChunkedArray):
+            # Row groups carry their own dictionaries
+            if not array.num_chunks:
+                return np.zeros(0, dtype=np.int32)
+            return np.concatenate([self.encode(chunk) for chunk in array.chunks])
+        if not pa.types.is_dictionary(array.type):
+            array = pc.dictionary_encode(array)
+        mapping = np.array([self._code(value) for value in array.dictionary.to_pylist()] or [0], dtype=np.int32)
+        indices = array.indices.fill_null(0).to_numpy(zero_copy_only=False)
+        return mapping[indices]
+
+    def encode_keys(self, keys, label):
+        """int64 NumPy keys -> int32 codes, labelling new keys with label(key)"""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        mapping = np.empty(len(unique), dtype=np.int32)
+        for i, key in enumerate(unique.tolist()):
+            code = self.codes.get(key)
+            if code is None:
+                code = self.codes[key] = len(self.labels)
+                self.labels.append(label(key))
+            mapping[i] = code
+        return mapping[inverse]
+
+
+def window_features(timestamps, groups, paths, latency_ms, latency_rank, status, reset, concurrent, window_us):
+    """Feature rows for every (window, group) present in the requests.
+
+    Inputs must be non-empty and sorted by timestamp; `latency_rank` is each
+    row's rank by latency with resets (NaN latency) ranked last. Returns
+    (window_start_us, group_codes, features) with features shaped
+    (len(FEATURE_COLUMNS), rows) in float32, one contiguous row per feature.
+    """
+    n = len(timestamps)
+    windows = timestamps // window_us
+    group_count = int(groups.max()) + 1
+
+    # One int64 key per (window, group); a stable sort keeps time order inside
+    key = windows * group_count + groups
+    order = np.argsort(key, kind='stable')
+    key, timestamps, paths = key[order], timestamps[order], paths[order]
+    latency_ms, latency_rank, status = latency_ms[order], latency_rank[order], status[order]
+    reset, concurrent = reset[order], concurrent[order]
+
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    boundary[1:] = key[1:] != key[:-1]
+    starts = np.flatnonzero(boundary)
+    segments = len(starts)
+    segment = np.cumsum(boundary) - 1
+    counts = np.diff(np.append(starts, n)).astype(np.float64)
+
+    features = np.full((len(FEATURE_COLUMNS), segments), np.nan, dtype=np.float64)
+    column = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+    features[column['request_count']] = counts
+    features[column['request_rate']] = counts / (window_us / MICROSECONDS)
+    resets = np.add.reduceat(reset.astype(np.int64), starts)
+    features[column['reset_ratio']] = resets / counts
+    features[column['error_ratio']] = np.add.reduceat((status >= 500).astype(np.int64), starts) / counts
+
+    # Inter-arrival gaps inside each segment; the first row of a segment has none
+    gaps = np.empty(n, dtype=np.float64)
+    gaps[1:] = (timestamps[1:] - timestamps[:-1]) / 1000.0
+    gaps[boundary] = np.nan
+    valid_gaps = ~boundary
+    gap_segments = segment[valid_gaps]
+    gap_values = gaps[valid_gaps]
+    gap_count = np.bincount(gap_segments, minlength=segments)
+    gap_sum = np.bincount(gap_segments, weights=gap_values, minlength=segments)
+    gap_sq = np.bincount(gap_segments, weights=gap_values * gap_values, minlength=segments)
+    gap_min = np.minimum.reduceat(np.where(valid_gaps, gaps, np.inf), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gap_mean = gap_sum / gap_count
+        gap_std = np.sqrt(np.maximum(gap_sq / gap_count - gap_mean * gap_mean, 0.0))
+        features[column['interarrival_mean_ms']] = gap_mean
+        features[column['interarrival_std_ms']] = gap_std
+        features[column['interarrival_min_ms']] = np.where(np.isinf(gap_min), np.nan, gap_min)
+        features[column['interarrival_cv']] = np.where(gap_mean > 0, gap_std / gap_mean, np.nan)
+
+    # Shannon entropy (bits) of the path distribution per segment
+    path_count = int(paths.max()) + 1
+    pairs, pair_counts = np.unique(segment.astype(np.int64) * path_count + paths, return_counts=True)
+    pair_segments = pairs // path_count
+    share = pair_counts / counts[pair_segments]
+    features[column['path_entropy']] = np.bincount(pair_segments, weights=-share * np.log2(share), minlength=segments)
+    features[column['unique_paths']] = np.bincount(pair_segments, minlength=segments)
+
+    # Exact latency percentiles: order each segment by latency rank (resets
+    # rank last) with one int64 sort, then index by position
+    answered = counts - resets
+    latency_order = np.argsort(segment.astype(np.int64) * n + latency_rank)
+    sorted_latency = latency_ms[latency_order]
+    latency_sum = np.bincount(segment, weights=np.nan_to_num(latency_ms), minlength=segments)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features[column['latency_mean_ms']] = np.where(answered > 0, latency_sum / answered, np.nan)
+    for name, quantile in (('latency_p50_ms', 0.50), ('latency_p95_ms', 0.95), ('latency_p99_ms', 0.99)):
+        position = starts + np.floor(quantile * np.maximum(answered - 1, 0)).astype(np.int64)
+        features[column[name]] = np.where(answered > 0, sorted_latency[position], np.nan)
+
+    features[column['concurrent_mean']] = np.add.reduceat(concurrent.astype(np.float64), starts) / counts
+    features[column['concurrent_max']] = np.maximum.reduceat(concurrent, starts)
+
+    first = key[starts]
+    return first // group_count * window_us, (first % group_count).astype(np.int32), features.astype(np.float32)
+
+
+def iter_parquet_chunks(parquet_dir):
+    """(starts, ends) Arrow tables per hourly partition of export_parquet output"""
+    partitions = set()
+    for event_type in ('request_start', 'request_end'):
+        root = os.path.join(parquet_dir, event_type)
+        if not os.path.isdir(root):
+            continue
+        for date in os.listdir(root):
+            for hour in os.listdir(os.path.join(root, date)):
+                partitions.add((date, hour))
+
+    for date, hour in sorted(partitions):
+        tables = []
+        for event_type, columns in (('request_start', START_COLUMNS), ('request_end', END_COLUMNS)):
+            directory = os.path.join(parquet_dir, event_type, date, hour)
+            if os.path.isdir(directory):
+                table = pq.read_table(directory, columns=columns, partitioning=None)
+            else:
+                table = None
+            tables.append(table)
+        yield tables[0], tables[1]
+
+
+def iter_jsonl_chunks(paths, chunk_lines=200000):
+    """(starts, ends) Arrow tables for every `chunk_lines` lines of JSONL input"""
+    starts = {name: [] for name in START_COLUMNS}
+    ends = {name: [] for name in END_COLUMNS}
+    lines = 0
+
+    def flush():
+        start_table = pa.table({
+            'request_id': pa.array(starts['request_id'], pa.string()),
+            'timestamp': pa.array(starts['timestamp'], pa.string()).cast(pa.timestamp('us')),
+            'client_ip': pa.array(starts['client_ip'], pa.string()),
+            'user_agent': pa.array(starts['user_agent'], pa.string()),
+            'path': pa.array(starts['path'], pa.string()),
+            'concurrent_requests': pa.array(starts['concurrent_requests'], pa.int32()),
+        })
+        end_table = pa.table({
+            'request_id': pa.array(ends['request_id'], pa.string()),
+            'status_code': pa.array(ends['status_code'], pa.int16()),
+            'response_time_ms': pa.array(ends['response_time_ms'], pa.float64()),
+        })
+        for values in list(starts.values()) + list(ends.values()):
+            values.clear()
+        return start_table, end_table
+
+    for path in paths:
+        for line in iter_lines(path):
+            lines += 1
+            # Cheap prefilter before parsing: only request events are used
+            if '"request_' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            event_type = record.get('event_type')
+            if event_type == 'request_start':
+                starts['request_id'].append(record.get('request_id'))
+                starts['timestamp'].append(record.get('timestamp'))
+                starts['client_ip'].append(record.get('client_ip') or '')
+                starts['user_agent'].append(record.get('user_agent') or '')
+                starts['path'].append(record.get('path') or '')
+                starts['concurrent_requests'].append(record.get('concurrent_requests') or 0)
+            elif event_type == 'request_end':
+                ends['request_id'].append(record.get('request_id'))
+                ends['status_code'].append(record.get('status_code'))
+                ends['response_time_ms'].append(record.get('response_time_ms'))
+            if lines >= chunk_lines:
+                lines = 0
+                yield flush()
+    yield flush()
+
+
+def empty_batch():
+    return {
+        'window_seconds': np.zeros(0, dtype=np.float32),
+        'window_start_us': np.zeros(0, dtype=np.int64),
+        'group': np.zeros(0, dtype=np.int32),
+        'features': np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+    }
+
+
+class FeatureExtractor:
+    """Join request starts and ends chunk by chunk and emit closed windows"""
+
+    def __init__(self, windows=(1, 10, 60), group_by='client', end_timeout=30.0):
+        self.windows_us = sorted(int(w * MICROSECONDS) for w in windows)
+        largest = self.windows_us[-1]
+        if any(largest % w for w in self.windows_us):
+            raise ValueError("Every window size must divide the largest one")
+        self.group_by = group_by
+        self.end_timeout_us = int(end_timeout * MICROSECONDS)
+
+        self.clients = Encoder()
+        self.agents = Encoder()
+        self.paths = Encoder()
+        self.groups = Encoder()
+        self.pending = None
+        self.ready = []
+        self.newest_us = None
+        self.next_row = 0
+        self.stats = {'requests': 0, 'resets': 0, 'unmatched_ends': 0, 'feature_rows': 0}
+
+    def _group_codes(self, table):
+        if self.group_by == 'global':
+            return self.groups.encode_keys(np.zeros(table.num_rows, dtype=np.int64), lambda key: 'all')
+        clients = self.clients.encode(table['client_ip'])
+        if self.group_by == 'client':
+            return self.groups.encode_keys(clients.astype(np.int64), lambda key: self.clients.labels[key])
+        agents = self.agents.encode(table['user_agent'])
+        keys = clients.astype(np.int64) << 32 | agents.astype(np.int64)
+        return self.groups.encode_keys(
+            keys, lambda key: f"{self.clients.labels[key >> 32]}|{self.agents.labels[key & 0xffffffff]}"
+        )
+
+    def _normalise_starts(self, starts):
+        """Arrow start rows -> table with int64 microsecond timestamps and codes"""
+        timestamps = pc.cast(starts['timestamp'], pa.timestamp('us')).cast(pa.int64())
+        rows = np.arange(self.next_row, self.next_row + starts.num_rows, dtype=np.int64)
+        self.next_row += starts.num_rows
+        return pa.table({
+            'row': rows,
+            'request_id': starts['request_id'],
+            'ts': timestamps,
+            'group': pa.array(self._group_codes(starts)),
+            'path': pa.array(self.paths.encode(starts['path'])),
+            'concurrent': pc.fill_null(starts['concurrent_requests'].cast(pa.int32()), 0),
+        })
+
+    def _take_ready(self, table, reset):
+        latency = table['response_time_ms'].to_numpy(zero_copy_only=False).astype(np.float64) if not reset else None
+        rows = table.num_rows
+        self.ready.append({
+            'ts': table['ts'].to_numpy(zero_copy_only=False),
+            'group': table['group'].to_numpy(zero_copy_only=False),
+            'path': table['path'].to_numpy(zero_copy_only=False),
+            'concurrent': table['concurrent'].to_numpy(zero_copy_only=False),
+            'latency': latency if latency is not None else np.full(rows, np.nan),
+            'status': (table['status_code'].to_numpy(zero_copy_only=False).astype(np.int16)
+                       if not reset else np.zeros(rows, dtype=np.int16)),
+            'reset': np.full(rows, reset, dtype=bool),
+        })
+
+    def add_chunk(self, starts, ends):
+        """Join one chunk and return the feature rows of windows it closed"""
+        if starts is not None and starts.num_rows:
+            new = self._normalise_starts(starts)
+            pending = new if self.pending is None else pa.concat_tables([self.pending, new])
+            newest = pc.max(new['ts']).as_py()
+            self.newest_us = newest if self.newest_us is None else max(self.newest_us, newest)
+        else:
+            pending = self.pending
+        if pending is None:
+            return empty_batch()
+
+        if ends is not None and ends.num_rows:
+            ends = ends.select(END_COLUMNS)
+            joined = pending.join(ends, keys='request_id', join_type='left outer')
+            matched = pc.is_valid(joined['response_time_ms'])
+            answered = joined.filter(matched)
+            # Short request ids can collide; keep one end per start
+            _, first = np.unique(answered['row'].to_numpy(), return_index=True)
+            if len(first) < answered.num_rows:
+                answered = answered.take(first)
+            self._take_ready(answered, reset=False)
+            pending = joined.filter(pc.invert(matched)).select(pending.column_names)
+            self.stats['unmatched_ends'] += max(0, ends.num_rows - pc.sum(matched).as_py())
+
+        # Starts that stayed unanswered past the timeout are resets
+        cut = self._cut()
+        expired = pc.less(pending['ts'], cut)
+        resets = pending.filter(expired)
+        if resets.num_rows:
+            self._take_ready(resets, reset=True)
+            self.stats['resets'] += resets.num_rows
+        self.pending = pending.filter(pc.invert(expired))
+        return self._finalise(cut)
+
+    def _cut(self):
+        """Aligned boundary before which every request is resolved"""
+        largest = self.windows_us[-1]
+        watermark = self.newest_us - self.end_timeout_us
+        return watermark // largest * largest
+
+    def _finalise(self, cut):
+        if not self.ready:
+            return empty_batch()
+        rows = {key: np.concatenate([part[key] for part in self.ready]) for key in self.ready[0]}
+        closed = rows['ts'] < cut
+        keep = {key: values[~closed] for key, values in rows.items()}
+        self.ready = [keep] if len(keep['ts']) else []
+        if not closed.any():
+            return empty_batch()
+
+        # Sort by time and rank latencies once; every window size reuses both
+        order = np.argsort(rows['ts'][closed], kind='stable')
+        done = {key: values[closed][order] for key, values in rows.items()}
+        latency_rank = np.empty(len(order), dtype=np.int64)
+        latency_rank[np.argsort(done['latency'])] = np.arange(len(order))
+        self.stats['requests'] += len(order)
+        parts = []
+        for window_us in self.windows_us:
+            window_start, groups, features = window_features(
+                done['ts'], done['group'], done['path'], done['latency'], latency_rank,
+                done['status'], done['reset'], done['concurrent'], window_us
+            )
+            parts.append((np.full(len(groups), window_us / MICROSECONDS, dtype=np.float32), window_start, groups, features))
+        result = {
+            'window_seconds': np.concatenate([p[0] for p in parts]),
+            'window_start_us': np.concatenate([p[1] for p in parts]),
+            'group': np.concatenate([p[2] for p in parts]),
+            # (rows, features) view over feature-major storage
+            'features': np.concatenate([p[3] for p in parts], axis=1).T
+        }
+        self.stats['feature_rows'] += len(result['group'])
+        return result
+
+    def finish(self):
+        """Resolve everything still open at the end of the input"""
+        if self.pending is not None and self.pending.num_rows:
+            self._take_ready(self.pending, reset=True)
+            self.stats['resets'] += self.pending.num_rows
+            self.pending = None
+        if self.newest_us is None:
+            return empty_batch()
+        return self._finalise(self.newest_us + self.windows_us[-1])
+
+
+class FeatureWriter:
+    """Append feature batches to Parquet, or collect them for one .npz"""
+
+    def __init__(self, path, group_labels):
+        self.path = path
+        self.group_labels = group_labels
+        self.npz = path.endswith('.npz')
+        self.batches = []
+        self.writer = None
+        self.schema = pa.schema(
+            [('window_start', pa.timestamp('us')), ('window_seconds', pa.float32()),
+             ('group', pa.dictionary(pa.int32(), pa.string()))]
+            + [(name, pa.float32()) for name in FEATURE_COLUMNS]
+        )
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, batch):
+        if not len(batch['group']):
+            return
+        if self.npz:
+            self.batches.append(batch)
+            return
+        columns = [
+            pa.array(batch['window_start_us'], pa.int64()).cast(pa.timestamp('us')),
+            pa.array(batch['window_seconds']),
+            pa.DictionaryArray.from_arrays(pa.array(batch['group']), pa.array(self.group_labels.labels, pa.string())),
+        ] + [pa.array(column) for column in np.ascontiguousarray(batch['features'].T)]
+        if self.writer is None:
+            # Dictionary pages only pay off for the group labels
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression='zstd', use_dictionary=['group'])
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.npz:
+            batches = self.batches or [empty_batch()]
+            groups = np.concatenate([b['group'] for b in batches])
+            np.savez(
+                self.path,
+                features=np.concatenate([b['features'] for b in batches]),
+                columns=np.array(FEATURE_COLUMNS),
+                window_start_us=np.concatenate([b['window_start_us'] for b in batches]),
+                window_seconds=np.concatenate([b['window_seconds'] for b in batches]),
+                group=np.array(self.group_labels.labels, dtype=str)[groups] if len(groups) else np.array([], dtype=str)
+            )
+
+
+def extract_features(inputs, output, windows=(1, 10, 60), group_by='client', end_timeout=30.0,
+                     chunk_lines=200000):
+    """Run the pipeline over Parquet directories and/or JSONL files"""
+    extractor = FeatureExtractor(windows, group_by, end_timeout)
+    writer = FeatureWriter(output, extractor.groups)
+    parquet_dirs = [item for item in inputs if os.path.isdir(os.path.join(item, 'request_start'))]
+    jsonl_inputs = [item for item in inputs if item not in parquet_dirs]
+
+    chunks = []
+    for parquet_dir in parquet_dirs:
+        chunks.append(iter_parquet_chunks(parquet_dir))
+    if jsonl_inputs:
+        chunks.append(iter_jsonl_chunks(discover_log_files(jsonl_inputs), chunk_lines))
+
+    try:
+        for source in chunks:
+            for starts, ends in source:
+                writer.write(extractor.add_chunk(starts, ends))
+        writer.write(extractor.finish())
+    finally:
+        writer.close()
+    return extractor.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract windowed ML features from request logs')
+    parser.add_argument('inputs', nargs='+',
+                        help='export_parquet.py output directories, or JSONL files/globs/directories')
+    parser.add_argument('--output', default='logs/features.parquet',
+                        help='Output file (.parquet, or .npz for a single dense matrix)')
+    parser.add_argument('--windows', type=float, nargs='+', default=[1, 10, 60],
+                        help='Window sizes in seconds; each must divide the largest')
+    parser.add_argument('--group-by', choices=GROUP_KINDS, default='client')
+    parser.add_argument('--end-timeout', type=float, default=30.0,
+                        help='Seconds after which a request without request_end counts as reset')
+    parser.add_argument('--chunk-lines', type=int, default=200000, help='JSONL lines per chunk')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = extract_features(
+        args.inputs, args.output, windows=args.windows, group_by=args.group_by,
+        end_timeout=args.end_timeout, chunk_lines=args.chunk_lines
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Processed {stats['requests']:,} requests in {elapsed:.1f}s "
+          f"({stats['requests'] / max(elapsed, 1e-9):,.0f} requests/s)")
+    print(f"  resets: {stats['resets']:,}, unmatched ends: {stats['unmatched_ends']:,}")
+    print(f"  feature rows: {stats['feature_rows']:,} x {len(FEATURE_COLUMNS)} columns")
+    print(f"Features written to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import glob
+import gzip
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG_FILE_PATTERNS = ('*.jsonl', '*.jsonl.*', '*.log', '*.log.*')
+
+
+def open_log_file(path):
+    """Open plain, gzip- or zstd-compressed log files as text"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+        return zstandard.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def discover_log_files(inputs, patterns=LOG_FILE_PATTERNS):
+    """Expand files, globs and directories (searched recursively) into log files"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in patterns:
+                files.extend(glob.glob(os.path.join(item, '**', pattern), recursive=True))
+        elif any(ch in item for ch in '*?['):
+            files.extend(glob.glob(item))
+        else:
+            files.append(item)
+
+    # Keep order stable and drop sidecar index files and unfinished writes
+    seen = set()
+    result = []
+    for path in sorted(files):
+        if path in seen or path.endswith(('.idx', '.json', '.tmp')):
+            continue
+        seen.add(path)
+        result.append(path)
+    return result
+
+
+def split_byte_ranges(path, chunk_bytes):
+    """Split a plain text file into (start, end) ranges for parallel readers.
+
+    Compressed files cannot be split and are returned as a single range.
+    """
+    if path.endswith('.gz') or path.endswith('.zst'):
+        return [(0, None)]
+    size = os.path.getsize(path)
+    if size <= chunk_bytes:
+        return [(0, None)]
+    return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def iter_lines(path, start=0, end=None):
+    """Yield lines of a file, or of the lines that start inside [start, end).
+
+    A range that begins mid-line skips the partial line; the previous range
+    reads it to completion, so every line is yielded exactly once.
+    """
+    if start == 0 and end is None:
+        with open_log_file(path) as f:
+            yield from f
+        return
+
+    with open(path, 'rb') as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8', errors='replace')
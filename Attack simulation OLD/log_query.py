@@ -0,0 +1,390 @@
+"""Query live logs, indexed archives and Parquet exports with pushed-down filters.
+
+Usage:
+    python3 log_query.py logs/ml_training_data.jsonl logs/archives ../Bots_Server/logs/server_logs \
+        --start '2026-03-02 14:02' --end '2026-03-02 14:07' \
+        --event-type request_end --where status_code=500,503 --output incident.jsonl
+
+    python3 log_query.py --parquet logs/parquet --event-type request_start \
+        --where client_ip=10.0.0.7 --where 'path=/api/data' --format csv
+
+--where takes FIELD=V1,V2 (any of), FIELD!=V, or FIELD>V / >= / < / <=
+(numeric); dotted fields reach into nested objects (server_metrics.cpu_percent).
+In Parquet tables a field is looked up under the column export_parquet
+flattened it into (server_metrics.cpu_percent -> server_cpu_percent).
+A record missing a predicate's field does not match.
+
+Filters are applied as early as each source allows:
+- files last written before --start and indexed archives whose time span
+  misses the range are not opened; archives only decompress the blocks
+  that overlap it (see archive_index.py);
+- Parquet tables without a predicate's column are skipped, and the rest
+  are read through pyarrow.dataset so hour partitions and row-group
+  statistics prune the scan;
+- each log line is checked against the time range and for the JSON text
+  of the wanted values before it is parsed.
+Files are split into tasks that a process pool decodes in parallel; matches
+are written in input order as the original JSON records (or CSV rows).
+A line's time is the first timestamp on it, as in the archive index.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from archive_index import (
+    decompress_block, line_timestamp, load_index, overlaps, timestamp_key
+)
+from export_parquet import EVENT_SCHEMAS
+from log_files import discover_log_files, iter_lines, split_byte_ranges
+
+DEFAULT_CSV_FIELDS = ['timestamp', 'event_type', 'server_id', 'client_ip', 'method', 'path',
+                      'status_code', 'response_time_ms']
+OPERATORS = ('!=', '>=', '<=', '=', '>', '<')
+BLOCKS_PER_TASK = 16
+
+# event_type -> {dotted JSON field: Parquet column} for the exported tables
+PARQUET_COLUMNS = {
+    event_type: {'.'.join(key_path): column for column, _, key_path in columns if key_path}
+    for event_type, columns in EVENT_SCHEMAS.items()
+}
+
+
+def parse_value(text):
+    """CLI value -> JSON scalar when it looks like one (500, 1.5, true), else the string"""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return text
+    return value if isinstance(value, (int, float, bool)) or value is None else text
+
+
+def parse_predicate(text):
+    for op in OPERATORS:
+        field, sep, raw = text.partition(op)
+        if sep and field and raw:
+            if op == '=':
+                return field, op, [parse_value(value) for value in raw.split(',')]
+            return field, op, [parse_value(raw)]
+    raise argparse.ArgumentTypeError(f"expected FIELD=V1,V2, FIELD!=V or FIELD>V, got {text!r}")
+
+
+def field_value(record, field):
+    value = record
+    for key in field.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def predicate_matches(value, op, values):
+    if value is None:
+        return False
+    if op == '=':
+        return any(value == wanted or str(value) == str(wanted) for wanted in values)
+    if op == '!=':
+        return str(value) != str(values[0])
+    try:
+        value = float(value)
+        wanted = float(values[0])
+    except (TypeError, ValueError):
+        return False
+    if op == '>':
+        return value > wanted
+    if op == '>=':
+        return value >= wanted
+    if op == '<':
+        return value < wanted
+    return value <= wanted
+
+
+class RecordFilter:
+    """Time range, event types and field predicates of one query"""
+
+    def __init__(self, start=None, end=None, event_types=None, predicates=()):
+        self.start = timestamp_key(start) if start is not None else None
+        self.end = timestamp_key(end) if end is not None else None
+        self.event_types = set(event_types or ())
+        self.predicates = list(predicates)
+        # Text that has to appear in a raw line for it to possibly match
+        self.required_text = []
+        if self.event_types:
+            self.required_text.append([json.dumps(event_type) for event_type in self.event_types])
+        for field, op, values in self.predicates:
+            if op == '=':
+                if not any(isinstance(value, float) for value in values):
+                    self.required_text.append([json.dumps(value) for value in values])
+
+    def time_key_matches(self, key):
+        if self.start is None and self.end is None:
+            return True
+        return key is not None and (self.start is None or key >= self.start) and (self.end is None or key < self.end)
+
+    def record_matches(self, record):
+        if self.event_types and record.get('event_type') not in self.event_types:
+            return False
+        for field, op, values in self.predicates:
+            if not predicate_matches(field_value(record, field), op, values):
+                return False
+        return True
+
+    def match_line(self, line):
+        """Parsed record of a raw log line that matches, else None"""
+        if not self.time_key_matches(line_timestamp(line.encode())):
+            return None
+        for alternatives in self.required_text:
+            if not any(text in line for text in alternatives):
+                return None
+        brace = line.find('{')
+        if brace < 0:
+            return None
+        try:
+            record = json.loads(line[brace:])
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or not self.record_matches(record):
+            return None
+        return record
+
+
+class OutputFormatter:
+    """Serialise matching records as JSONL or CSV text"""
+
+    def __init__(self, fmt='jsonl', fields=None):
+        self.fmt = fmt
+        self.fields = fields or DEFAULT_CSV_FIELDS
+
+    def header(self):
+        if self.fmt != 'csv':
+            return ''
+        return self.format_rows([dict(zip(self.fields, self.fields))])
+
+    def format_rows(self, records):
+        if self.fmt == 'jsonl':
+            return ''.join(json.dumps(record, default=str) + '\n' for record in records)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            row = []
+            for field in self.fields:
+                value = field_value(record, field)
+                row.append('' if value is None else json.dumps(value) if isinstance(value, (dict, list)) else value)
+            writer.writerow(row)
+        return buffer.getvalue()
+
+
+def filter_lines(lines, record_filter, formatter):
+    """Matching lines, formatted; JSONL keeps the original record text"""
+    if formatter.fmt == 'jsonl':
+        out = []
+        for line in lines:
+            if record_filter.match_line(line) is not None:
+                out.append(line[line.find('{'):].rstrip('\n') + '\n')
+        return ''.join(out), len(out)
+    records = [record for record in map(record_filter.match_line, lines) if record is not None]
+    return formatter.format_rows(records), len(records)
+
+
+def run_task(task):
+    """Process-pool worker: one file range, archive block group or Parquet file"""
+    kind, path, detail, record_filter, formatter = task
+    if kind == 'lines':
+        start, end = detail
+        return filter_lines(iter_lines(path, start, end), record_filter, formatter)
+
+    if kind == 'blocks':
+        codec, blocks = detail
+        lines = []
+        with open(path, 'rb') as f:
+            for offset, length in blocks:
+                f.seek(offset)
+                lines.extend(decompress_block(f.read(length), codec).decode('utf-8', errors='replace').splitlines())
+        return filter_lines(lines, record_filter, formatter)
+
+    event_type = detail
+    table = ds.dataset(path, format='parquet').to_table(filter=parquet_expression(record_filter, event_type))
+    records = table.to_pylist()
+    for record in records:
+        record['event_type'] = event_type
+        if isinstance(record.get('timestamp'), datetime):
+            record['timestamp'] = record['timestamp'].isoformat()
+    return formatter.format_rows(records), len(records)
+
+
+def parquet_column(event_type, field):
+    """Column holding a (possibly dotted) JSON field in an event type's Parquet table"""
+    return PARQUET_COLUMNS.get(event_type, {}).get(field, field)
+
+
+def parquet_expression(record_filter, event_type):
+    """The query as a pyarrow.dataset filter (time range and field predicates)"""
+    expression = None
+    terms = []
+    if record_filter.start is not None:
+        terms.append(ds.field('timestamp') >= pa.scalar(datetime.fromisoformat(record_filter.start.decode()), pa.timestamp('us')))
+    if record_filter.end is not None:
+        terms.append(ds.field('timestamp') < pa.scalar(datetime.fromisoformat(record_filter.end.decode()), pa.timestamp('us')))
+    for field, op, values in record_filter.predicates:
+        column = ds.field(parquet_column(event_type, field))
+        if op == '=':
+            terms.append(column.isin(values))
+        elif op == '!=':
+            terms.append(column != values[0])
+        elif op == '>':
+            terms.append(column > values[0])
+        elif op == '>=':
+            terms.append(column >= values[0])
+        elif op == '<':
+            terms.append(column < values[0])
+        else:
+            terms.append(column <= values[0])
+    for term in terms:
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def plan_log_tasks(paths, record_filter, formatter, chunk_bytes):
+    start_text = record_filter.start.decode() if record_filter.start else None
+    end_text = record_filter.end.decode() if record_filter.end else None
+    tasks = []
+    skipped = 0
+    for path in paths:
+        index = load_index(path)
+        if index is not None:
+            if not overlaps(index['first'], index['last'], start_text, end_text):
+                skipped += 1
+                continue
+            blocks = [
+                (offset, length) for offset, length, first, last, _ in index['blocks']
+                if (start_text is None and end_text is None) or overlaps(first, last, start_text, end_text)
+            ]
+            for i in range(0, len(blocks), BLOCKS_PER_TASK):
+                tasks.append(('blocks', path, (index['codec'], blocks[i:i + BLOCKS_PER_TASK]), record_filter, formatter))
+            continue
+
+        # An append-only log last written before the range starts holds nothing in it
+        if record_filter.start is not None:
+            modified = timestamp_key(datetime.fromtimestamp(os.path.getmtime(path)))
+            if modified < record_filter.start:
+                skipped += 1
+                continue
+        for start, end in split_byte_ranges(path, chunk_bytes):
+            tasks.append(('lines', path, (start, end), record_filter, formatter))
+    return tasks, skipped
+
+
+def plan_parquet_tasks(parquet_dir, record_filter, formatter):
+    """One task per Parquet file left after partition pruning"""
+    tasks = []
+    skipped = 0
+    for event_type in sorted(os.listdir(parquet_dir)):
+        table_dir = os.path.join(parquet_dir, event_type)
+        if not os.path.isdir(table_dir) or (record_filter.event_types and event_type not in record_filter.event_types):
+            continue
+        dataset = ds.dataset(table_dir, format='parquet', partitioning='hive')
+        columns = {parquet_column(event_type, field) for field, _, _ in record_filter.predicates}
+        if not columns <= set(dataset.schema.names):
+            skipped += 1
+            continue
+        fragments = dataset.get_fragments(filter=parquet_partition_expression(record_filter))
+        for fragment in fragments:
+            tasks.append(('parquet', fragment.path, event_type, record_filter, formatter))
+    return tasks, skipped
+
+
+def parquet_partition_expression(record_filter):
+    """Prune date=/hour= partitions outside the time range"""
+    terms = []
+    for key, op in ((record_filter.start, '>='), (record_filter.end, '<')):
+        if key is None:
+            continue
+        moment = datetime.fromisoformat(key.decode())
+        day = ds.field('date')
+        hour = ds.field('hour')
+        stamp = moment.strftime('%Y-%m-%d')
+        if op == '>=':
+            terms.append((day > stamp) | ((day == stamp) & (hour >= moment.hour)))
+        else:
+            terms.append((day < stamp) | ((day == stamp) & (hour <= moment.hour)))
+    expression = None
+    for term in terms:
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def run_query(tasks, out, formatter, workers=None):
+    """Run tasks in parallel and write results in task order; returns match count"""
+    out.write(formatter.header())
+    total = 0
+    if workers == 1 or len(tasks) <= 1:
+        results = map(run_task, tasks)
+        for text, count in results:
+            out.write(text)
+            total += count
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for text, count in executor.map(run_task, tasks):
+            out.write(text)
+            total += count
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query server logs, archives and Parquet exports')
+    parser.add_argument('inputs', nargs='*', help='Log files, archives, globs or directories')
+    parser.add_argument('--parquet', action='append', default=[],
+                        help='export_parquet.py output directory (repeatable)')
+    parser.add_argument('--start', help="Inclusive start, e.g. '2026-03-02 14:02'")
+    parser.add_argument('--end', help="Exclusive end, e.g. '2026-03-02 14:07'")
+    parser.add_argument('--event-type', action='append', default=[], help='Repeatable')
+    parser.add_argument('--where', type=parse_predicate, action='append', default=[],
+                        help='FIELD=V1,V2 | FIELD!=V | FIELD>V | FIELD>=V | FIELD<V | FIELD<=V (repeatable)')
+    parser.add_argument('--format', default='jsonl', choices=['jsonl', 'csv'])
+    parser.add_argument('--fields', help=f"CSV columns (default {','.join(DEFAULT_CSV_FIELDS)})")
+    parser.add_argument('--output', help='Output file (default stdout)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-mb', type=float, default=32)
+    args = parser.parse_args()
+    if not args.inputs and not args.parquet:
+        parser.error('give log inputs and/or --parquet')
+
+    record_filter = RecordFilter(
+        datetime.fromisoformat(args.start) if args.start else None,
+        datetime.fromisoformat(args.end) if args.end else None,
+        args.event_type,
+        args.where
+    )
+    formatter = OutputFormatter(args.format, args.fields.split(',') if args.fields else None)
+
+    started = datetime.now()
+    tasks, skipped = plan_log_tasks(
+        discover_log_files(args.inputs), record_filter, formatter, int(args.chunk_mb * 1024 * 1024)
+    )
+    for parquet_dir in args.parquet:
+        parquet_tasks, parquet_skipped = plan_parquet_tasks(parquet_dir, record_filter, formatter)
+        tasks += parquet_tasks
+        skipped += parquet_skipped
+
+    out = open(args.output, 'w', buffering=1024 * 1024) if args.output else sys.stdout
+    try:
+        total = run_query(tasks, out, formatter, args.workers)
+    finally:
+        if args.output:
+            out.close()
+
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"{total:,} matching records from {len(tasks)} tasks ({skipped} files/tables skipped) "
+          f"in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
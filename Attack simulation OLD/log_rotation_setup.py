@@ -2,17 +2,82 @@ import os
 import logging.handlers
 import json
 import time
+import argparse
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
 from datetime import datetime
-import shutil
-import gzip
 import glob
 
+import psutil
+
+from archive_index import DEFAULT_BLOCK_BYTES, write_index, write_indexed_archive
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# codec -> (file suffix, default level)
+CODECS = {
+    'gzip': ('.gz', 6),
+    'zstd': ('.zst', 3),
+}
+# zstd when the optional zstandard package is installed, gzip otherwise
+DEFAULT_CODEC = 'zstd' if zstandard is not None else 'gzip'
+COMPRESSED_SUFFIXES = tuple(suffix for suffix, _ in CODECS.values())
+STAGING_DIR = '.compacting'
+
+def lower_priority():
+    """Run a compaction worker at idle I/O priority and the lowest CPU priority"""
+    try:
+        process = psutil.Process()
+        if hasattr(psutil, 'IOPRIO_CLASS_IDLE'):
+            process.ionice(psutil.IOPRIO_CLASS_IDLE)
+        else:
+            process.ionice(psutil.IOPRIO_VERYLOW)
+        process.nice(19 if os.name == 'posix' else psutil.IDLE_PRIORITY_CLASS)
+    except (psutil.Error, OSError, AttributeError):
+        pass
+
+def compress_file(source, destination, codec=DEFAULT_CODEC, level=None, remove_source=True,
+                  block_bytes=DEFAULT_BLOCK_BYTES):
+    """Compress `source` into an indexed `destination` through a temp file and an atomic rename.
+    
+    Readers never see a partial archive: the output is written to
+    `destination.tmp`, fsynced, and only then renamed into place, followed
+    by its `.idx` time index (see archive_index.py).
+    Returns (source, destination, bytes_in, bytes_out, seconds).
+    """
+    started = time.perf_counter()
+    _, default_level = CODECS[codec]
+    level = default_level if level is None else level
+    temp_path = f"{destination}.tmp"
+    
+    try:
+        with open(source, 'rb') as f_in, open(temp_path, 'wb') as f_out:
+            index = write_indexed_archive(f_in, f_out, codec, level, block_bytes)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(temp_path, destination)
+        write_index(index, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    bytes_in = os.path.getsize(source)
+    if remove_source:
+        os.remove(source)
+    return source, destination, bytes_in, os.path.getsize(destination), time.perf_counter() - started
+
 class LogRotationManager:
     def __init__(self, base_log_dir='logs'):
         self.base_log_dir = base_log_dir
         self.archive_dir = os.path.join(base_log_dir, 'archives')
         os.makedirs(self.archive_dir, exist_ok=True)
-        
+    
     def setup_rotating_logger(self, name, filename, max_bytes=50*1024*1024, backup_count=10):
         """Setup rotating file handler for a logger"""
         logger = logging.getLogger(name)
@@ -38,20 +103,64 @@ class LogRotationManager:
         
         return logger
     
-    def compress_old_logs(self):
-        """Compress old log files to save space"""
-        log_files = glob.glob(os.path.join(self.base_log_dir, '*.log.*'))
+    def rotated_logs(self):
+        """Rotated backups (`name.log.1`, `name.jsonl.3`, ...) not yet compressed"""
+        files = glob.glob(os.path.join(self.base_log_dir, '*.log.*'))
+        files += glob.glob(os.path.join(self.base_log_dir, '*.jsonl.*'))
+        files = [
+            path for path in files
+            if not path.endswith(COMPRESSED_SUFFIXES) and not path.endswith('.tmp')
+        ]
+        # Oldest first, so archive names sort in the order the data was written
+        return sorted(files, key=os.path.getmtime)
+    
+    def claim_rotated_log(self, log_file):
+        """Move a rotated file out of the rotation's way before compressing it.
+        
+        RotatingFileHandler renames `.log.1` to `.log.2` on the next rollover,
+        so a backup is first renamed into a staging directory under a name
+        stamped with its last write time. Returns None if the rotation got
+        to the file first.
+        """
+        staging_dir = os.path.join(self.base_log_dir, STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        try:
+            modified = datetime.fromtimestamp(os.path.getmtime(log_file))
+        except FileNotFoundError:
+            return None
         
-        for log_file in log_files:
-            if not log_file.endswith('.gz'):
-                compressed_name = f"{log_file}.gz"
-                
-                with open(log_file, 'rb') as f_in:
-                    with gzip.open(compressed_name, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                
-                os.remove(log_file)
-                print(f"Compressed: {log_file} -> {compressed_name}")
+        base = os.path.basename(log_file).rsplit('.', 1)[0]
+        stamp = modified.strftime('%Y%m%d-%H%M%S-%f')
+        staged = os.path.join(staging_dir, f"{base}.{stamp}")
+        counter = 1
+        while os.path.exists(staged):
+            staged = os.path.join(staging_dir, f"{base}.{stamp}-{counter}")
+            counter += 1
+        try:
+            os.rename(log_file, staged)
+        except FileNotFoundError:
+            return None
+        return staged
+    
+    def archive_path(self, staged, suffix):
+        """Daily archive location for a staged file, named by its last write date"""
+        name = os.path.basename(staged)
+        day = datetime.fromtimestamp(os.path.getmtime(staged)).strftime('%Y-%m-%d')
+        daily_archive_dir = os.path.join(self.archive_dir, day)
+        os.makedirs(daily_archive_dir, exist_ok=True)
+        return os.path.join(daily_archive_dir, f"{name}{suffix}")
+    
+    def staged_logs(self):
+        """Files claimed by an earlier run that never finished compressing"""
+        return sorted(glob.glob(os.path.join(self.base_log_dir, STAGING_DIR, '*')))
+    
+    def compress_old_logs(self, codec=DEFAULT_CODEC, level=None, workers=None, block_bytes=DEFAULT_BLOCK_BYTES):
+        """Compress rotated logs in parallel straight into the daily archive"""
+        service = LogCompactionService(self, codec=codec, level=level, workers=workers, block_bytes=block_bytes)
+        try:
+            return service.run_once()
+        finally:
+            service.stop()
     
     def archive_daily_logs(self):
         """Archive logs daily with date stamps"""
@@ -59,13 +168,17 @@ class LogRotationManager:
         daily_archive_dir = os.path.join(self.archive_dir, today)
         os.makedirs(daily_archive_dir, exist_ok=True)
         
-        # Move compressed logs to daily archive
-        compressed_logs = glob.glob(os.path.join(self.base_log_dir, '*.log.*.gz'))
+        # compress_old_logs archives as it goes; this moves compressed logs
+        # left in the log directory by older versions or by hand
+        compressed_logs = [
+            path for path in glob.glob(os.path.join(self.base_log_dir, '*.log.*'))
+            if path.endswith(COMPRESSED_SUFFIXES)
+        ]
         
         for log_file in compressed_logs:
             filename = os.path.basename(log_file)
             archive_path = os.path.join(daily_archive_dir, filename)
-            shutil.move(log_file, archive_path)
+            os.replace(log_file, archive_path)
             print(f"Archived: {log_file} -> {archive_path}")
     
     def create_log_summary(self):
@@ -97,6 +210,104 @@ class LogRotationManager:
         print(f"Log summary saved: {summary_file}")
         return summary
 
+class LogCompactionService:
+    """Background compression of rotated logs into the daily archives.
+    
+    A scanner thread claims rotated backups and hands them to a process
+    pool whose workers run at idle I/O priority and nice 19, so compaction
+    only uses disk and CPU time the servers and bots leave unused. Each
+    archive is written to a temp file and renamed into place.
+    """
+    
+    def __init__(self, manager, codec=DEFAULT_CODEC, level=None, workers=None, interval=30.0, low_priority=True,
+                 block_bytes=DEFAULT_BLOCK_BYTES):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec} (choose from {', '.join(CODECS)})")
+        if codec == 'zstd' and zstandard is None:
+            raise RuntimeError("The zstd codec needs the zstandard package (pip install zstandard)")
+        self.manager = manager
+        self.codec = codec
+        self.suffix, default_level = CODECS[codec]
+        self.level = default_level if level is None else level
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.interval = interval
+        self.block_bytes = block_bytes
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=lower_priority if low_priority else None
+        )
+        self.pending = {}  # future -> staged path
+        self.stats = {'files': 0, 'bytes_in': 0, 'bytes_out': 0, 'failed': 0}
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def submit_pending(self):
+        """Claim every rotated log and queue it for compression"""
+        futures = []
+        in_flight = set(self.pending.values())
+        staged = [path for path in self.manager.staged_logs() if path not in in_flight]
+        for log_file in self.manager.rotated_logs():
+            claimed = self.manager.claim_rotated_log(log_file)
+            if claimed:
+                staged.append(claimed)
+        
+        for path in staged:
+            destination = self.manager.archive_path(path, self.suffix)
+            future = self.pool.submit(compress_file, path, destination, self.codec, self.level, True, self.block_bytes)
+            self.pending[future] = path
+            futures.append(future)
+        return futures
+    
+    def collect(self):
+        """Record the outcome of every finished compression"""
+        for future in [future for future in self.pending if future.done()]:
+            self._finished(self.pending.pop(future), future)
+    
+    def _finished(self, path, future):
+        try:
+            source, destination, bytes_in, bytes_out, seconds = future.result()
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"Compression failed: {path}: {e}")
+            return
+        
+        self.stats['files'] += 1
+        self.stats['bytes_in'] += bytes_in
+        self.stats['bytes_out'] += bytes_out
+        ratio = bytes_in / bytes_out if bytes_out else 0
+        print(f"Compressed: {source} -> {destination} "
+              f"({bytes_in / 1048576:.1f} MB, {ratio:.1f}x, {seconds:.1f}s)")
+    
+    def run_once(self):
+        """Compress everything currently rotated and wait for it"""
+        wait(self.submit_pending())
+        self.collect()
+        return dict(self.stats)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.submit_pending()
+            except OSError as e:
+                print(f"Compaction scan failed: {e}")
+            self._stop.wait(self.interval)
+            self.collect()
+    
+    def start(self):
+        """Scan for rotated logs every `interval` seconds in a daemon thread"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='log-compaction', daemon=True)
+        self._thread.start()
+    
+    def stop(self, wait=True):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.pool.shutdown(wait=wait)
+        self.collect()
+
 def setup_automated_rotation():
     """Setup automated log rotation"""
     manager = LogRotationManager()
@@ -113,14 +324,16 @@ def setup_automated_rotation():
     return manager, loggers
 
 # Cron-style automation script
-def daily_maintenance():
+def daily_maintenance(codec=DEFAULT_CODEC, level=None, workers=None, block_bytes=DEFAULT_BLOCK_BYTES):
     """Run daily log maintenance tasks"""
     manager = LogRotationManager()
     
     print(f"Starting daily maintenance: {datetime.now()}")
     
     # Compress old logs
-    manager.compress_old_logs()
+    stats = manager.compress_old_logs(codec=codec, level=level, workers=workers, block_bytes=block_bytes)
+    print(f"Compressed {stats['files']} files, {stats['bytes_in'] / 1048576:.1f} MB -> "
+          f"{stats['bytes_out'] / 1048576:.1f} MB ({stats['failed']} failed)")
     
     # Archive daily logs
     manager.archive_daily_logs()
@@ -129,9 +342,42 @@ def daily_maintenance():
     summary = manager.create_log_summary()
     print(f"Daily maintenance completed. Total log size: {summary['total_size_mb']} MB")
 
+def run_compaction_service(codec=DEFAULT_CODEC, level=None, workers=None, interval=30.0, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Compress rotated logs in the background until interrupted"""
+    manager = LogRotationManager()
+    service = LogCompactionService(manager, codec=codec, level=level, workers=workers, interval=interval,
+                                   block_bytes=block_bytes)
+    print(f"Log compaction running: {codec} level {service.level}, {service.workers} workers, "
+          f"scanning every {interval}s")
+    service.start()
+    # The collection orchestrator stops us with SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        print(f"Log compaction stopped: {service.stats}")
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Log rotation, compression and archiving')
+    parser.add_argument('--codec', default=DEFAULT_CODEC, choices=list(CODECS))
+    parser.add_argument('--level', type=int, default=None, help='Compression level (codec default if omitted)')
+    parser.add_argument('--workers', type=int, default=None, help='Compression processes')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep compressing rotated logs in the background instead of one maintenance pass')
+    parser.add_argument('--interval', type=float, default=30.0, help='Seconds between scans with --watch')
+    parser.add_argument('--block-kb', type=int, default=DEFAULT_BLOCK_BYTES // 1024,
+                        help='Uncompressed size of each independently readable archive block')
+    args = parser.parse_args()
+    
     # Setup rotation
     setup_automated_rotation()
     
-    # Run maintenance
-    daily_maintenance()
+    if args.watch:
+        run_compaction_service(args.codec, args.level, args.workers, args.interval, args.block_kb * 1024)
+    else:
+        # Run maintenance
+        daily_maintenance(args.codec, args.level, args.workers, args.block_kb * 1024)
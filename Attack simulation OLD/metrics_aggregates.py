@@ -0,0 +1,200 @@
+import time
+
+
+class RateCounter:
+    """Sliding-window event counter backed by a ring of per-second buckets.
+
+    Each bucket stores the event count and the sum of an optional value
+    (e.g. response time) for one second. Running totals are kept for the
+    whole window, so adding an event and reading the rate are O(1)
+    regardless of traffic volume.
+    """
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self.counts = [0] * window_seconds
+        self.sums = [0.0] * window_seconds
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.current_second = int(time.time())
+
+    def _advance(self, second):
+        """Expire buckets that fell out of the window since the last update"""
+        elapsed = second - self.current_second
+        if elapsed <= 0:
+            return
+        if elapsed >= self.window_seconds:
+            self.counts = [0] * self.window_seconds
+            self.sums = [0.0] * self.window_seconds
+            self.total_count = 0
+            self.total_sum = 0.0
+        else:
+            for s in range(self.current_second + 1, second + 1):
+                idx = s % self.window_seconds
+                self.total_count -= self.counts[idx]
+                self.total_sum -= self.sums[idx]
+                self.counts[idx] = 0
+                self.sums[idx] = 0.0
+        self.current_second = second
+
+    def add(self, value=0.0, now=None):
+        second = int(now if now is not None else time.time())
+        self._advance(second)
+        idx = second % self.window_seconds
+        self.counts[idx] += 1
+        self.sums[idx] += value
+        self.total_count += 1
+        self.total_sum += value
+
+    def count(self, now=None):
+        self._advance(int(now if now is not None else time.time()))
+        return self.total_count
+
+    def rate_per_second(self, now=None):
+        return self.count(now) / self.window_seconds
+
+    def mean(self, now=None):
+        count = self.count(now)
+        return self.total_sum / count if count else 0
+
+
+class LatencyHistogram:
+    """Fixed-memory, log-linear (HDR-style) histogram of latencies.
+
+    Values are recorded in microseconds. Below 2 * sub_buckets every
+    microsecond has its own bucket; above that each power of two is split
+    into `sub_buckets` linear buckets, so the relative error stays under
+    1 / sub_buckets. Bucket counts are also summed per power of two, which
+    lets percentile lookups skip whole groups and cost a small constant
+    number of steps. Histograms with the same layout merge by adding counts.
+    """
+
+    def __init__(self, sub_bucket_bits=5, max_value_bits=32):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_buckets = 1 << sub_bucket_bits
+        self.max_value = (1 << max_value_bits) - 1
+        self.group_count = max_value_bits - sub_bucket_bits + 1
+        self.counts = [0] * (self.group_count * self.sub_buckets + self.sub_buckets)
+        self.group_totals = [0] * self.group_count
+        self.total = 0
+        self.max_recorded = 0
+
+    def _index(self, value):
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - (self.sub_bucket_bits + 1)
+        return shift * self.sub_buckets + (value >> shift)
+
+    def _group(self, index):
+        if index < 2 * self.sub_buckets:
+            return 0
+        return index // self.sub_buckets - 1
+
+    def _lowest_value(self, index):
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return (index - shift * self.sub_buckets) << shift
+
+    def _group_range(self, group):
+        if group == 0:
+            return range(0, 2 * self.sub_buckets)
+        start = (group + 1) * self.sub_buckets
+        return range(start, start + self.sub_buckets)
+
+    def record(self, value_us):
+        value = min(max(int(value_us), 0), self.max_value)
+        index = self._index(value)
+        self.counts[index] += 1
+        self.group_totals[self._group(index)] += 1
+        self.total += 1
+        if value > self.max_recorded:
+            self.max_recorded = value
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different layouts")
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        for i, count in enumerate(other.group_totals):
+            self.group_totals[i] += count
+        self.total += other.total
+        self.max_recorded = max(self.max_recorded, other.max_recorded)
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.group_totals = [0] * self.group_count
+        self.total = 0
+        self.max_recorded = 0
+
+
+def value_at_percentiles(histograms, percentiles):
+    """Return {percentile: value_us} over one or more same-layout histograms"""
+    first = histograms[0]
+    total = sum(h.total for h in histograms)
+    if not total:
+        return {p: 0 for p in percentiles}
+
+    if len(histograms) == 1:
+        group_totals = first.group_totals
+    else:
+        group_totals = [sum(counts) for counts in zip(*(h.group_totals for h in histograms))]
+    bucket_counts = [h.counts for h in histograms]
+    max_recorded = max(h.max_recorded for h in histograms)
+    last_group = first.group_count - 1
+
+    results = {}
+    group = 0
+    seen = 0
+    for p in sorted(percentiles):
+        target = max(1, int(total * p / 100.0 + 0.5))
+
+        # Skip whole powers of two first, then walk the sub-buckets
+        while group < last_group and seen + group_totals[group] < target:
+            seen += group_totals[group]
+            group += 1
+
+        running = seen
+        value = first.max_value
+        for index in first._group_range(group):
+            for counts in bucket_counts:
+                running += counts[index]
+            if running >= target:
+                value = first._lowest_value(index)
+                break
+        results[p] = min(value, max_recorded)
+    return results
+
+
+class RollingLatencyHistogram:
+    """Latency percentiles over a sliding window using two rotating histograms.
+
+    The current histogram collects new samples; every `window_seconds` it
+    becomes the previous one and a cleared histogram takes its place.
+    Percentiles are read across both, so they cover between one and two
+    windows of traffic at a fixed memory and lookup cost.
+    """
+
+    def __init__(self, window_seconds=60, **histogram_options):
+        self.window_seconds = window_seconds
+        self.current = LatencyHistogram(**histogram_options)
+        self.previous = LatencyHistogram(**histogram_options)
+        self.rotated_at = time.time()
+
+    def _rotate(self, now):
+        if now - self.rotated_at < self.window_seconds:
+            return
+        self.previous, self.current = self.current, self.previous
+        self.current.reset()
+        if now - self.rotated_at >= 2 * self.window_seconds:
+            self.previous.reset()
+        self.rotated_at = now
+
+    def record(self, value_us, now=None):
+        self._rotate(now if now is not None else time.time())
+        self.current.record(value_us)
+
+    def percentiles(self, percentiles=(50, 95, 99), now=None):
+        self._rotate(now if now is not None else time.time())
+        return value_at_percentiles([self.current, self.previous], percentiles)
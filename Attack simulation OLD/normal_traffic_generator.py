@@ -1,12 +1,16 @@
+import argparse
 import asyncio
 import aiohttp
 import random
+import secrets
 import time
 import json
 import logging
 from datetime import datetime
 from typing import List
 
+from workload_profiles import NORMAL_ENDPOINT_WEIGHTS, NORMAL_ENDPOINTS, NORMAL_HEADERS, NORMAL_USER_AGENTS
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,25 +25,13 @@ logger = logging.getLogger(__name__)
 class NormalTrafficGenerator:
     def __init__(self, target_url='http://127.0.0.1:5000'):
         self.target_url = target_url
-        self.user_agents = [
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
-            'Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X)',
-            'Mozilla/5.0 (Android 11; Mobile; rv:91.0) Gecko/91.0'
-        ]
-        
-        self.endpoints = [
-            '/',
-            '/api/fast',
-            '/api/medium',
-            '/api/slow',
-            '/api/data/100',
-            '/api/data/500'
-        ]
+        self.user_agents = NORMAL_USER_AGENTS
+        self.endpoints = NORMAL_ENDPOINTS
+        self.endpoint_weights = NORMAL_ENDPOINT_WEIGHTS
         
-        # Realistic usage patterns
-        self.endpoint_weights = [0.3, 0.25, 0.2, 0.1, 0.1, 0.05]
+        # Trace ids (prefix + request id) let the server's request events be
+        # joined to ours; see Bots_Server servers/request_tracing.py
+        self.trace_prefix = secrets.token_hex(4)
         
     def generate_realistic_timing(self):
         """Generate realistic intervals between requests"""
@@ -53,26 +45,22 @@ class NormalTrafficGenerator:
         # Normal browsing pattern
         return base_interval
     
-    async def send_normal_request(self, session, request_id: int):
+    async def send_normal_request(self, session, request_id: int, scheduled_at: float = None):
         """Send a normal, realistic HTTP request"""
         endpoint = random.choices(self.endpoints, weights=self.endpoint_weights)[0]
         user_agent = random.choice(self.user_agents)
         url = f"{self.target_url}{endpoint}"
+        trace_id = f"{self.trace_prefix}{request_id:08x}"
         
-        headers = {
-            'User-Agent': user_agent,
-            'Accept': 'application/json,text/html,application/xhtml+xml',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Cache-Control': 'max-age=0'
-        }
+        headers = {'User-Agent': user_agent, **NORMAL_HEADERS, 'X-Trace-Id': trace_id}
         
         try:
             logger.debug(f"Normal request {request_id}: {endpoint}")
             
+            sent_at = time.time()
             async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
                 await response.text()
+                completed_at = time.time()
                 
                 # Log successful normal request
                 normal_request_log = {
@@ -81,8 +69,12 @@ class NormalTrafficGenerator:
                     'request_id': request_id,
                     'endpoint': endpoint,
                     'status_code': response.status,
-                    'response_time_ms': 0,  # Would need to measure this
-                    'user_agent': user_agent
+                    'response_time_ms': (completed_at - sent_at) * 1000,
+                    'user_agent': user_agent,
+                    'trace_id': trace_id,
+                    'scheduled_at': scheduled_at if scheduled_at is not None else sent_at,
+                    'sent_at': sent_at,
+                    'completed_at': completed_at
                 }
                 
                 with open('logs/ml_training_data.jsonl', 'a') as f:
@@ -118,14 +110,16 @@ class NormalTrafficGenerator:
             start_time = time.time()
             end_time = start_time + (duration_hours * 3600)
             request_count = 0
+            scheduled_at = start_time
             
             while time.time() < end_time:
                 # Send normal request
                 request_count += 1
-                await self.send_normal_request(session, request_count)
+                await self.send_normal_request(session, request_count, scheduled_at)
                 
                 # Wait realistic interval before next request
                 interval = self.generate_realistic_timing()
+                scheduled_at = time.time() + interval
                 await asyncio.sleep(interval)
                 
                 # Log progress
@@ -157,5 +151,19 @@ async def run_24_hour_baseline():
     await generator.generate_traffic_pattern(duration_hours=25.0)
 
 if __name__ == '__main__':
-    logger.info("Starting 24-hour normal traffic generation...")
-    asyncio.run(run_24_hour_baseline())
+    parser = argparse.ArgumentParser(description='Generate 24+ hours of baseline normal traffic')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Generate the baseline on a virtual clock (traffic_simulator) instead of sending requests')
+    parser.add_argument('--hours', type=float, default=25.0, help='Virtual hours to simulate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='logs/simulated/ml_training_data.jsonl')
+    args = parser.parse_args()
+
+    if args.simulate:
+        from traffic_simulator import simulate
+        logger.info(f"Simulating {args.hours} hours of normal traffic into {args.output}")
+        stats = simulate(args.output, hours=args.hours, seed=args.seed)
+        logger.info(f"Simulated {stats['server_requests']} requests")
+    else:
+        logger.info("Starting 24-hour normal traffic generation...")
+        asyncio.run(run_24_hour_baseline())
@@ -43,6 +43,15 @@ class LogCollectionOrchestrator:
         print("Setting up log rotation...")
         subprocess.run(['python3', 'log_rotation_setup.py'])
     
+    def start_log_compaction(self):
+        """Compress rotated logs in the background at idle I/O priority"""
+        print("Starting background log compaction...")
+        process = subprocess.Popen([
+            'python3', 'log_rotation_setup.py', '--watch'
+        ])
+        self.processes.append(('log_compaction', process))
+        return process
+    
     def monitor_processes(self):
         """Monitor all running processes"""
         while self.running:
@@ -81,6 +90,7 @@ class LogCollectionOrchestrator:
         
         # Setup log rotation
         self.setup_log_rotation()
+        self.start_log_compaction()
         
         # Start server
         self.start_server()
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import psutil
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Point-in-time system and process stats shared by request handlers"""
+    sampled_at: float
+    sample_timestamp: str
+    cpu_percent: float
+    memory_percent: float
+    memory_used_mb: float
+    process_cpu_percent: float
+    process_rss_mb: float
+    process_num_fds: int
+    process_num_threads: int
+
+
+class SystemSampler:
+    """Background thread that refreshes system stats on a fixed interval.
+
+    Flask handlers run on many threads; they read `sampler.snapshot`, which
+    is swapped as a whole on each refresh, instead of calling psutil per
+    request.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.process = psutil.Process(os.getpid())
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # The first cpu_percent() call only primes the counters
+        psutil.cpu_percent()
+        self.process.cpu_percent()
+        self.snapshot = self.sample()
+
+    def sample(self):
+        memory = psutil.virtual_memory()
+        with self.process.oneshot():
+            rss = self.process.memory_info().rss
+            process_cpu = self.process.cpu_percent()
+            num_fds = self.process.num_fds() if hasattr(self.process, 'num_fds') else 0
+            num_threads = self.process.num_threads()
+
+        now = time.time()
+        return SystemSnapshot(
+            sampled_at=now,
+            sample_timestamp=datetime.fromtimestamp(now).isoformat(),
+            cpu_percent=psutil.cpu_percent(),
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / 1024 / 1024,
+            process_cpu_percent=process_cpu,
+            process_rss_mb=rss / 1024 / 1024,
+            process_num_fds=num_fds,
+            process_num_threads=num_threads
+        )
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.snapshot = self.sample()
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
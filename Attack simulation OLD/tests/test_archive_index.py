@@ -0,0 +1,110 @@
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive_index import (
+    iter_archive_range, load_index, overlaps, timestamp_key, write_index, write_indexed_archive
+)
+
+START = datetime(2026, 3, 2, 14, 0, 0)
+
+
+def make_lines(count=500, step=timedelta(seconds=1)):
+    lines = []
+    for i in range(count):
+        moment = START + i * step
+        lines.append(json.dumps({'event_type': 'request_end', 'timestamp': moment.isoformat(), 'n': i}))
+        if i % 50 == 0:
+            # Lines without a timestamp are never returned by a range read
+            lines.append('no timestamp here')
+    return lines
+
+
+def build_archive(tmp_path, lines, codec='gzip', block_bytes=2048):
+    archive = str(tmp_path / f'ml_training_data.jsonl.1.{"gz" if codec == "gzip" else "zst"}')
+    data = ('\n'.join(lines) + '\n').encode()
+    with open(archive, 'wb') as f_out:
+        index = write_indexed_archive(io.BytesIO(data), f_out, codec=codec, level=1, block_bytes=block_bytes)
+    write_index(index, archive)
+    return archive, index
+
+
+def brute_force(lines, start, end):
+    result = []
+    for line in lines:
+        if not line.startswith('{'):
+            continue
+        key = timestamp_key(json.loads(line)['timestamp'])
+        if (start is None or key >= start) and (end is None or key < end):
+            result.append(line)
+    return result
+
+
+@pytest.mark.parametrize('overlap_cases', [
+    ('a', 'c', None, None, True),
+    ('b', 'c', 'a', 'b', False),   # end is exclusive
+    ('b', 'c', 'a', 'b0', True),
+    ('a', 'b', 'b', None, True),   # last == start is inside
+    ('a', 'b', 'b0', None, False),
+    (None, None, None, None, False),
+])
+def test_overlaps(overlap_cases):
+    first, last, start, end, expected = overlap_cases
+    assert overlaps(first, last, start, end) is expected
+
+
+def test_index_covers_every_line_in_order(tmp_path):
+    lines = make_lines()
+    archive, index = build_archive(tmp_path, lines)
+
+    assert len(index['blocks']) > 1
+    assert index['lines'] == len(lines)
+    assert sum(block[4] for block in index['blocks']) == len(lines)
+    offsets = [(offset, length) for offset, length, _, _, _ in index['blocks']]
+    assert offsets[0][0] == 0
+    assert all(o + n == next_o for (o, n), (next_o, _) in zip(offsets, offsets[1:]))
+    assert index['first'] == timestamp_key(START).decode()
+    assert list(iter_archive_range(archive)) == [line for line in lines if line.startswith('{')]
+
+
+@pytest.mark.parametrize('start_s, end_s', [
+    (0, 1), (10, 11), (99, 201), (123, 124), (0, 500), (499, None), (None, 37), (250, 250), (600, 700),
+])
+def test_range_read_matches_a_full_scan(tmp_path, start_s, end_s):
+    lines = make_lines()
+    archive, index = build_archive(tmp_path, lines)
+    start = timestamp_key(START + timedelta(seconds=start_s)) if start_s is not None else None
+    end = timestamp_key(START + timedelta(seconds=end_s)) if end_s is not None else None
+
+    assert list(iter_archive_range(archive, start, end, index)) == brute_force(lines, start, end)
+
+
+def test_fractional_boundaries(tmp_path):
+    lines = make_lines(count=200, step=timedelta(milliseconds=250))
+    archive, index = build_archive(tmp_path, lines, block_bytes=512)
+    start = timestamp_key(START + timedelta(milliseconds=10250))
+    end = timestamp_key(START + timedelta(milliseconds=12000))
+
+    result = list(iter_archive_range(archive, start, end, index))
+    assert [json.loads(line)['n'] for line in result] == list(range(41, 48))
+
+
+def test_zstd_archive_range_read(tmp_path):
+    pytest.importorskip('zstandard')
+    lines = make_lines()
+    archive, index = build_archive(tmp_path, lines, codec='zstd')
+    start, end = timestamp_key(START + timedelta(seconds=42)), timestamp_key(START + timedelta(seconds=77))
+    assert list(iter_archive_range(archive, start, end, index)) == brute_force(lines, start, end)
+
+
+def test_stale_index_is_ignored(tmp_path):
+    archive, _ = build_archive(tmp_path, make_lines(count=20))
+    assert load_index(archive) is not None
+
+    index_path = archive + '.idx'
+    modified = os.path.getmtime(archive)
+    os.utime(index_path, (modified - 10, modified - 10))
+    assert load_index(archive) is None
@@ -0,0 +1,66 @@
+import gzip
+
+import pytest
+
+from log_files import iter_lines, split_byte_ranges
+
+
+def write_lines(path, lines, trailing_newline=True):
+    text = '\n'.join(lines) + ('\n' if trailing_newline else '')
+    path.write_bytes(text.encode('utf-8'))
+    return str(path)
+
+
+def read_in_ranges(path, chunk_bytes):
+    lines = []
+    for start, end in split_byte_ranges(path, chunk_bytes):
+        lines.extend(iter_lines(path, start, end))
+    return lines
+
+
+LINES = [f'{{"n": {i}, "pad": "{"x" * (i % 17)}"}}' for i in range(200)]
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 2, 7, 31, 64, 100, 1000, 1 << 20])
+def test_ranges_yield_every_line_exactly_once(tmp_path, chunk_bytes):
+    path = write_lines(tmp_path / 'events.jsonl', LINES)
+    assert read_in_ranges(path, chunk_bytes) == [line + '\n' for line in LINES]
+
+
+def test_range_starting_right_after_a_newline_keeps_that_line(tmp_path):
+    path = write_lines(tmp_path / 'events.jsonl', ['aaa', 'bbb', 'ccc'])
+    # Byte 4 is the first byte of "bbb"
+    assert list(iter_lines(path, 0, 4)) == ['aaa\n']
+    assert list(iter_lines(path, 4, 8)) == ['bbb\n']
+    assert list(iter_lines(path, 4, None)) == ['bbb\n', 'ccc\n']
+
+
+def test_range_starting_mid_line_leaves_it_to_the_previous_range(tmp_path):
+    path = write_lines(tmp_path / 'events.jsonl', ['aaa', 'bbb', 'ccc'])
+    assert list(iter_lines(path, 0, 5)) == ['aaa\n', 'bbb\n']
+    assert list(iter_lines(path, 5, None)) == ['ccc\n']
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 3, 10])
+def test_last_line_without_newline_is_read_once(tmp_path, chunk_bytes):
+    path = write_lines(tmp_path / 'events.jsonl', ['one', 'two', 'three'], trailing_newline=False)
+    assert read_in_ranges(path, chunk_bytes) == ['one\n', 'two\n', 'three']
+
+
+def test_ranges_cover_the_file_without_gaps(tmp_path):
+    path = write_lines(tmp_path / 'events.jsonl', LINES)
+    ranges = split_byte_ranges(path, 100)
+    assert ranges[0][0] == 0
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert ranges[-1][1] == (tmp_path / 'events.jsonl').stat().st_size
+
+
+def test_small_and_compressed_files_are_one_range(tmp_path):
+    plain = write_lines(tmp_path / 'events.jsonl', ['a', 'b'])
+    assert split_byte_ranges(plain, 1 << 20) == [(0, None)]
+
+    compressed = tmp_path / 'events.jsonl.1.gz'
+    with gzip.open(compressed, 'wt') as f:
+        f.write('a\nb\n')
+    assert split_byte_ranges(str(compressed), 1) == [(0, None)]
+    assert list(iter_lines(str(compressed))) == ['a\n', 'b\n']
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from metrics_aggregates import LatencyHistogram, RollingLatencyHistogram, value_at_percentiles
+
+
+def exact_percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(1, int(len(ordered) * pct / 100.0 + 0.5)) - 1]
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    values = list(range(64))
+    for value in values:
+        histogram.record(value)
+
+    result = value_at_percentiles([histogram], (1, 50, 99, 100))
+    for pct, value in result.items():
+        assert value == exact_percentile(values, pct)
+
+
+def test_relative_error_is_bounded_by_sub_buckets():
+    rng = random.Random(3)
+    values = [int(rng.lognormvariate(9.0, 2.0)) for _ in range(20000)]
+    histogram = LatencyHistogram(sub_bucket_bits=5)
+    for value in values:
+        histogram.record(value)
+
+    result = value_at_percentiles([histogram], (50, 90, 99, 99.9))
+    for pct, reported in result.items():
+        exact = exact_percentile(values, pct)
+        # Lowest value of the bucket holding the exact percentile
+        assert exact * (1 - 1 / 32) <= reported <= exact
+
+
+def test_values_past_the_layout_are_clamped():
+    histogram = LatencyHistogram(max_value_bits=20)
+    histogram.record(-5)
+    histogram.record(1 << 30)
+    assert histogram.total == 2
+    assert histogram.max_recorded == (1 << 20) - 1
+    assert value_at_percentiles([histogram], (1,))[1] == 0
+
+
+def test_empty_histograms_report_zero():
+    assert value_at_percentiles([LatencyHistogram()], (50, 99)) == {50: 0, 99: 0}
+
+
+def test_merge_equals_reading_both_histograms():
+    rng = random.Random(5)
+    left, right, whole = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(5000):
+        value = rng.randrange(1, 5000000)
+        (left if i % 2 else right).record(value)
+        whole.record(value)
+
+    percentiles = (10, 50, 95, 99)
+    across = value_at_percentiles([left, right], percentiles)
+    left.merge(right)
+    assert left.counts == whole.counts
+    assert left.group_totals == whole.group_totals
+    assert left.total == whole.total
+    assert value_at_percentiles([left], percentiles) == across == value_at_percentiles([whole], percentiles)
+
+
+def test_merge_rejects_other_layouts():
+    with pytest.raises(ValueError):
+        LatencyHistogram(sub_bucket_bits=5).merge(LatencyHistogram(sub_bucket_bits=4))
+
+
+def test_rolling_histogram_forgets_samples_after_two_windows():
+    rolling = RollingLatencyHistogram(window_seconds=10)
+    rolling.rotated_at = 0.0
+    rolling.record(1024, now=1.0)
+    assert rolling.percentiles((50,), now=5.0)[50] == 1024
+    # One rotation keeps the previous window readable
+    rolling.record(10, now=11.0)
+    assert rolling.percentiles((100,), now=12.0)[100] == 1024
+    # Two windows without samples clear both halves
+    assert rolling.percentiles((50,), now=40.0)[50] == 0
@@ -0,0 +1,323 @@
+"""Replay recorded benign traffic at its original inter-arrival times.
+
+Usage:
+    python3 traffic_replay.py logs/ml_training_data.jsonl logs/archives \
+        --target http://127.0.0.1:5000 --speed 10 --report logs/replay_report.json
+
+    # Against a Bots_Server HTTP2Server, mapping the Flask routes onto its own
+    python3 traffic_replay.py logs/ml_training_data.jsonl --target http://127.0.0.1:8001 \
+        --map-path '/api/data/*=/api/data' --map-path '/api/*=/api/data'
+
+Records are streamed from disk (plain, rotated or gzipped files, in the
+order discover_log_files returns them), so memory does not grow with the
+capture size. By default `request_start` events are replayed with their
+method, path, query string and headers; `--source normal_request` replays
+the client-side events instead. Requests inside attack_start/attack_end
+windows are skipped unless --include-attacks is given.
+
+A record recorded `t` seconds after the first one is due `t / speed`
+seconds after the replay starts (`--speed 0` sends as fast as possible).
+Each request records its lag, which is how late it was actually sent
+compared to that schedule. Lag grows when the target or the replayer
+cannot keep up, so a capacity regression shows up as a rising lag on a
+real traffic shape. Lag and response-time percentiles are printed every
+`--report-interval` seconds and saved with the final summary.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+import aiohttp
+
+from log_files import discover_log_files, iter_lines
+from metrics_aggregates import LatencyHistogram, value_at_percentiles
+
+# Headers that describe the recorded connection rather than the request, and
+# recorded trace ids, which would collide with the original requests' ids
+SKIPPED_HEADERS = {'host', 'content-length', 'connection', 'transfer-encoding', 'keep-alive', 'x-trace-id'}
+
+
+def parse_path_map(value):
+    """'FROM=TO' (exact) or 'PREFIX*=TO' (prefix) -> (from, to)"""
+    source, sep, target = value.partition('=')
+    if not sep or not source or not target:
+        raise argparse.ArgumentTypeError(f"expected FROM=TO or PREFIX*=TO, got {value!r}")
+    return source, target
+
+
+class PathMapper:
+    """Rewrite recorded paths onto the routes of the replay target"""
+
+    def __init__(self, rules=()):
+        self.exact = {}
+        self.prefixes = []
+        for source, target in rules:
+            if source.endswith('*'):
+                self.prefixes.append((source[:-1], target))
+            else:
+                self.exact[source] = target
+        # Longest prefix wins
+        self.prefixes.sort(key=lambda rule: len(rule[0]), reverse=True)
+
+    def map(self, path):
+        if path in self.exact:
+            return self.exact[path]
+        for prefix, target in self.prefixes:
+            if path.startswith(prefix):
+                return target
+        return path
+
+
+def iter_replay_records(paths, source='request_start', include_attacks=False):
+    """Yield (timestamp_seconds, method, path, headers, body_size) lazily"""
+    in_attack = 0
+    for path in paths:
+        for line in iter_lines(path):
+            try:
+                record = json.loads(line)
+                event_type = record['event_type']
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            if event_type == 'attack_start':
+                in_attack += 1
+                continue
+            if event_type == 'attack_end':
+                in_attack = max(0, in_attack - 1)
+                continue
+            if event_type != source or (in_attack and not include_attacks):
+                continue
+
+            try:
+                timestamp = datetime.fromisoformat(record['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            if event_type == 'request_start':
+                request_path = record.get('path', '/')
+                if record.get('query_string'):
+                    request_path = f"{request_path}?{record['query_string']}"
+                headers = {
+                    name: value for name, value in (record.get('headers') or {}).items()
+                    if name.lower() not in SKIPPED_HEADERS
+                }
+                if 'User-Agent' not in headers and record.get('user_agent'):
+                    headers['User-Agent'] = record['user_agent']
+                yield timestamp, record.get('method', 'GET'), request_path, headers, record.get('content_length') or 0
+            else:
+                yield timestamp, 'GET', record.get('endpoint', '/'), {'User-Agent': record.get('user_agent', '')}, 0
+
+
+def percentiles_ms(histogram):
+    values = value_at_percentiles([histogram], (50, 95, 99))
+    return {
+        'p50_ms': values[50] / 1000,
+        'p95_ms': values[95] / 1000,
+        'p99_ms': values[99] / 1000,
+        'max_ms': histogram.max_recorded / 1000
+    }
+
+
+class TrafficReplayer:
+    """Reissue recorded requests on the recorded schedule and measure lag"""
+
+    def __init__(self, target, speed=1.0, max_in_flight=256, timeout=30.0, max_gap=None,
+                 path_mapper=None, report_interval=10.0):
+        self.target = target.rstrip('/')
+        self.speed = speed
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_gap = max_gap
+        self.path_mapper = path_mapper or PathMapper()
+        self.report_interval = report_interval
+
+        self.lag = LatencyHistogram()
+        self.interval_lag = LatencyHistogram()
+        self.response_time = LatencyHistogram()
+        self.sent = 0
+        self.completed = 0
+        self.status_codes = Counter()
+        self.errors = Counter()
+        self.first_record_time = None
+        self.last_record_time = None
+        self.started = None
+        self.intervals = []
+
+    async def _send(self, session, semaphore, due, method, path, headers, body_size):
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            sent_at = loop.time()
+            lag_us = max(0.0, sent_at - due) * 1000000
+            self.lag.record(lag_us)
+            self.interval_lag.record(lag_us)
+            self.sent += 1
+            try:
+                data = b'x' * body_size if body_size else None
+                async with session.request(method, f"{self.target}{path}", headers=headers, data=data) as response:
+                    await response.read()
+                    self.status_codes[response.status] += 1
+                    if response.status >= 500:
+                        self.errors[f"http_{response.status}"] += 1
+            except Exception as e:
+                self.errors[type(e).__name__] += 1
+            finally:
+                self.response_time.record((loop.time() - sent_at) * 1000000)
+                self.completed += 1
+
+    def interval_report(self):
+        elapsed = time.monotonic() - self.started
+        lag = percentiles_ms(self.interval_lag)
+        # How far into the recording the replay has got, in recorded seconds
+        recorded = (self.last_record_time or 0) - (self.first_record_time or 0)
+        report = {
+            'elapsed_seconds': round(elapsed, 3),
+            'recorded_seconds': round(recorded, 3),
+            'sent': self.sent,
+            'in_flight': self.sent - self.completed,
+            'errors': sum(self.errors.values()),
+            'lag': lag
+        }
+        self.interval_lag.reset()
+        self.intervals.append(report)
+        print(f"[{elapsed:8.1f}s] sent {self.sent:,} ({report['in_flight']} in flight), "
+              f"errors {report['errors']:,}, lag p50 {lag['p50_ms']:.1f}ms "
+              f"p99 {lag['p99_ms']:.1f}ms max {lag['max_ms']:.1f}ms")
+        return report
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.interval_report()
+
+    async def replay(self, records, limit=None, duration=None):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        tasks = set()
+        self.started = time.monotonic()
+        reporter = asyncio.create_task(self._report_loop())
+        start = loop.time()
+        offset = 0.0
+        previous = None
+        scheduled = 0
+
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                for timestamp, method, path, headers, body_size in records:
+                    if limit is not None and scheduled >= limit:
+                        break
+                    if self.first_record_time is None:
+                        self.first_record_time = timestamp
+                        previous = timestamp
+
+                    # Recorded gap, ignoring out-of-order writes and capping idle periods
+                    gap = max(0.0, timestamp - previous)
+                    if self.max_gap is not None:
+                        gap = min(gap, self.max_gap)
+                    offset += gap
+                    previous = max(previous, timestamp)
+                    self.last_record_time = previous
+
+                    due = start + (offset / self.speed if self.speed > 0 else 0.0)
+                    if duration is not None and due - start > duration:
+                        break
+                    delay = due - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    # Keep the reader from running far ahead of the senders
+                    while len(tasks) >= self.max_in_flight * 2:
+                        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                    task = asyncio.create_task(self._send(
+                        session, semaphore, due, method, self.path_mapper.map(path), headers, body_size
+                    ))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    scheduled += 1
+
+                if tasks:
+                    await asyncio.wait(tasks)
+        finally:
+            reporter.cancel()
+
+        return self.summary()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        recorded = (self.last_record_time or 0) - (self.first_record_time or 0)
+        return {
+            'event_type': 'replay_summary',
+            'timestamp': datetime.now().isoformat(),
+            'target': self.target,
+            'speed': self.speed,
+            'max_in_flight': self.max_in_flight,
+            'requests_sent': self.sent,
+            'recorded_seconds': recorded,
+            'elapsed_seconds': elapsed,
+            'achieved_speed': recorded / elapsed if elapsed > 0 else 0,
+            'average_rps': self.sent / elapsed if elapsed > 0 else 0,
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items())},
+            'errors': dict(self.errors),
+            'lag': percentiles_ms(self.lag),
+            'response_time': percentiles_ms(self.response_time),
+            'intervals': self.intervals
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded benign traffic against a server')
+    parser.add_argument('inputs', nargs='+',
+                        help='JSONL files (plain or .gz), globs or directories')
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help='Base URL to replay against')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Replay speed multiplier (0 = as fast as possible)')
+    parser.add_argument('--source', default='request_start', choices=['request_start', 'normal_request'],
+                        help='Which recorded events to replay')
+    parser.add_argument('--include-attacks', action='store_true',
+                        help='Also replay requests recorded inside attack windows')
+    parser.add_argument('--map-path', type=parse_path_map, action='append', default=[],
+                        help='Rewrite paths, FROM=TO or PREFIX*=TO (repeatable)')
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--max-gap', type=float, default=None,
+                        help='Cap recorded idle gaps to this many seconds')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many requests')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='Stop after this many seconds of replay schedule')
+    parser.add_argument('--report-interval', type=float, default=10.0)
+    parser.add_argument('--report', default='logs/replay_report.json', help='Summary output file')
+    args = parser.parse_args()
+
+    replayer = TrafficReplayer(
+        args.target,
+        speed=args.speed,
+        max_in_flight=args.max_in_flight,
+        timeout=args.timeout,
+        max_gap=args.max_gap,
+        path_mapper=PathMapper(args.map_path),
+        report_interval=args.report_interval
+    )
+    records = iter_replay_records(discover_log_files(args.inputs), args.source, args.include_attacks)
+    summary = asyncio.run(replayer.replay(records, limit=args.limit, duration=args.duration))
+
+    with open(args.report, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    lag = summary['lag']
+    response = summary['response_time']
+    print(f"Replayed {summary['requests_sent']:,} requests ({summary['recorded_seconds']:.1f}s recorded) "
+          f"in {summary['elapsed_seconds']:.1f}s, {summary['achieved_speed']:.1f}x")
+    print(f"  lag: p50 {lag['p50_ms']:.2f}ms p95 {lag['p95_ms']:.2f}ms "
+          f"p99 {lag['p99_ms']:.2f}ms max {lag['max_ms']:.2f}ms")
+    print(f"  response time: p50 {response['p50_ms']:.2f}ms p99 {response['p99_ms']:.2f}ms")
+    print(f"  status codes: {summary['status_codes']}, errors: {summary['errors'] or 'none'}")
+    print(f"Report saved to: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,571 @@
+"""Time-compressed synthetic traffic logs from a discrete-event server model.
+
+Usage:
+    python3 traffic_simulator.py --hours 24 --clients 20 --seed 7 \
+        --attack medium@3600 --attack heavy@43200 --random-attacks 6 \
+        --output logs/simulated/ml_training_data.jsonl \
+        --server-log logs/simulated/detailed_server.log
+
+Instead of sending real requests, the workload of normal_traffic_generator
+(endpoint mix, user agents, browsing intervals) and attack_simulation
+(ATTACK_CONFIGS batches with resets) is replayed against a queueing model
+of enhanced_http2_server on a virtual clock:
+
+- Flask runs one thread per request but Python code holds the GIL, so the
+  CPU part of every request (before/after_request logging plus the route
+  body) is served FIFO by `--cores` servers, while `time.sleep` in the
+  medium/slow routes is a pure delay that does not hold the CPU.
+- At most `--max-concurrency` requests are in flight; later arrivals wait
+  in an accept queue, which is what makes attacks visible as queueing in
+  the response times.
+- Rolling rate and percentile metrics use the same metrics_aggregates
+  classes as the server, fed with virtual time; system metrics come from
+  the modelled CPU busy time, sampled every `--sample-interval` seconds.
+- Header capture goes through the server's CapturePolicy: full headers
+  for sampled clients, allowlisted headers and a fingerprint for the rest.
+
+Events are written in the server's ml_training_data.jsonl schema
+(request_start, request_end, normal_request, normal_traffic_start/end,
+attack_start/end) with virtual timestamps starting at `--start`, so the
+output can go straight into export_parquet.py or data_quality_report.py.
+A 24 hour run with a few clients takes minutes on one core. Runs are
+deterministic for a given seed, `--start` and arguments.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+
+from capture_policy import FINGERPRINT_MODES, CapturePolicy
+from metrics_aggregates import RateCounter, RollingLatencyHistogram
+from workload_profiles import (ATTACK_CONFIGS, ATTACK_HEADERS, NORMAL_ENDPOINT_WEIGHTS, NORMAL_ENDPOINTS,
+                               NORMAL_HEADERS, NORMAL_USER_AGENTS)
+
+# aiohttp sends Host before the workload's own headers
+HOST_HEADER = '127.0.0.1:5000'
+
+# Route costs measured against enhanced_http2_server: CPU milliseconds
+# spent in the route body and seconds spent sleeping
+ROUTE_COSTS = {
+    '/': (0.15, 0.0),
+    '/api/fast': (0.05, 0.0),
+    '/api/medium': (0.05, 0.1),
+    '/api/slow': (0.05, 0.5),
+    '/api/heavy': (2.5, 0.0),
+}
+DATA_PREFIX = '/api/data/'
+DATA_CAP = 10000
+
+NORMAL_TIMEOUT = 30.0
+ATTACK_TIMEOUT = 5.0
+RESET_TIMEOUT = 0.05
+
+
+def realistic_interval(rng):
+    """Same distribution as NormalTrafficGenerator.generate_realistic_timing"""
+    base_interval = rng.uniform(1, 10)
+    if rng.random() < 0.1:
+        return rng.uniform(0.1, 0.5)
+    return base_interval
+
+
+def route_cost(path):
+    """(cpu_ms, delay_seconds) of a route, or None for a 404"""
+    if path in ROUTE_COSTS:
+        return ROUTE_COSTS[path]
+    if path.startswith(DATA_PREFIX) and path[len(DATA_PREFIX):].isdigit():
+        size = min(int(path[len(DATA_PREFIX):]), DATA_CAP)
+        return (0.05 + size * 0.00002, 0.0)
+    return None
+
+
+class SimulatedRequest:
+    __slots__ = ('request_id', 'path', 'user_agent', 'headers', 'client_ip',
+                 'arrival', 'admitted', 'captured', 'on_done')
+
+    def __init__(self, request_id, path, user_agent, headers, client_ip, arrival, on_done):
+        self.request_id = request_id
+        self.path = path
+        self.user_agent = user_agent
+        self.headers = headers
+        self.client_ip = client_ip
+        self.arrival = arrival
+        self.admitted = None
+        self.captured = False
+        self.on_done = on_done
+
+
+class Simulation:
+    """Virtual clock and event queue shared by the server model and clients"""
+
+    def __init__(self, start, writer, server_log=None):
+        self.start = start
+        self.now = 0.0
+        self.writer = writer
+        self.server_log = server_log
+        self.events = []
+        self.sequence = 0
+
+    def schedule(self, when, callback, *args):
+        # The sequence number keeps same-time events in scheduling order
+        self.sequence += 1
+        heapq.heappush(self.events, (when, self.sequence, callback, args))
+
+    def timestamp(self, offset=None):
+        return (self.start + timedelta(seconds=self.now if offset is None else offset)).isoformat()
+
+    def emit(self, event):
+        self.writer.write(json.dumps(event) + '\n')
+
+    def emit_server_log(self, level, message):
+        if self.server_log is None:
+            return
+        ts = self.start + timedelta(seconds=self.now)
+        self.server_log.write(f"{ts:%Y-%m-%d %H:%M:%S}.{ts.microsecond // 1000:03d}|{level}|http2_server|{message}\n")
+
+    def run(self, until=math.inf):
+        """Process events up to `until`, or until the queue drains"""
+        while self.events and self.events[0][0] <= until:
+            when, _, callback, args = heapq.heappop(self.events)
+            self.now = when
+            callback(*args)
+        if until != math.inf:
+            self.now = until
+
+
+class ServerModel:
+    """Queueing model of enhanced_http2_server that emits its ML log events"""
+
+    def __init__(self, simulation, rng, capture_policy, cores=1, max_concurrency=64, overhead_cpu_ms=0.4,
+                 cpu_jitter=0.25, window_seconds=60, sample_interval=1.0, host_cpus=4):
+        self.simulation = simulation
+        self.rng = rng
+        self.capture_policy = capture_policy
+        self.max_concurrency = max_concurrency
+        self.overhead_cpu_ms = overhead_cpu_ms
+        self.cpu_jitter = cpu_jitter
+        self.window_seconds = window_seconds
+        self.sample_interval = sample_interval
+        self.host_cpus = host_cpus
+        self.cores = cores
+
+        # Same aggregates as ServerMetrics, anchored at virtual time 0
+        self.request_rate = RateCounter(window_seconds)
+        self.request_rate.current_second = 0
+        self.latency_histogram = RollingLatencyHistogram(window_seconds)
+        self.latency_histogram.rotated_at = 0.0
+        self.request_count = 0
+        self.captured_requests = 0
+        self.concurrent_requests = 0
+        self.client_ips = {}
+        self.user_agents = {}
+
+        self.core_free_at = [0.0] * cores
+        self.accept_queue = []
+        self.accept_head = 0
+        self.cpu_seconds = 0.0
+        self.sampled_cpu_seconds = 0.0
+        self.sampled_at = 0.0
+        self.system = None
+        self._sample(0.0)
+
+    def _sample(self, sample_time):
+        """Recompute the system snapshot the sampler thread would have taken"""
+        interval = sample_time - self.sampled_at
+        busy = self.cpu_seconds - self.sampled_cpu_seconds
+        process_cpu = min(100.0 * self.cores, busy / interval * 100) if interval > 0 else 0.0
+        threads = 2 + self.concurrent_requests
+        self.sampled_at = sample_time
+        self.sampled_cpu_seconds = self.cpu_seconds
+        self.system = {
+            'cpu_percent': round(min(100.0, 1.0 + process_cpu / self.host_cpus), 1),
+            'memory_percent': 7.8,
+            'memory_used_mb': 468.0 + 0.05 * threads,
+            'process_cpu_percent': round(process_cpu, 1),
+            'process_rss_mb': 31.7 + 0.06 * threads,
+            'process_num_fds': 6 + self.concurrent_requests,
+            'process_num_threads': threads,
+            'system_sample_time': self.simulation.timestamp(sample_time)
+        }
+
+    def metrics_dict(self):
+        now = self.simulation.now
+        if now - self.sampled_at >= self.sample_interval:
+            self._sample(self.sampled_at + (now - self.sampled_at) // self.sample_interval * self.sample_interval)
+
+        window_requests = self.request_rate.count(now)
+        latency = self.latency_histogram.percentiles((50, 95, 99), now)
+        metrics = {
+            'timestamp': self.simulation.timestamp(),
+            'uptime_seconds': now,
+            'total_requests': self.request_count,
+            'requests_per_minute': window_requests * 60 / self.window_seconds,
+            'active_connections': 0,
+            'total_connections': 0,
+            'error_count': 0,
+            'reset_count': 0,
+            'concurrent_requests': self.concurrent_requests,
+            'unique_clients': len(self.client_ips),
+            'unique_user_agents': len(self.user_agents),
+            'captured_requests': self.captured_requests,
+            'header_fingerprints': self.capture_policy.fingerprint_count,
+            'avg_response_time': self.request_rate.mean(now),
+            'response_time_p50_ms': latency[50] / 1000,
+            'response_time_p95_ms': latency[95] / 1000,
+            'response_time_p99_ms': latency[99] / 1000,
+        }
+        metrics.update(self.system)
+        return metrics
+
+    def submit(self, request):
+        """A client request arrives; it starts now or waits for a free thread"""
+        if self.concurrent_requests < self.max_concurrency:
+            self._admit(request)
+            return
+        self.accept_queue.append(request)
+
+    def _admit(self, request):
+        simulation = self.simulation
+        now = simulation.now
+        request.admitted = now
+        self.concurrent_requests += 1
+        request.captured = self.capture_policy.sampled(request.client_ip)
+        headers, header_fingerprint = self.capture_policy.capture_headers(request.headers.items(), request.captured)
+
+        simulation.emit_server_log(
+            'INFO',
+            f"REQUEST_START|{request.request_id}|{request.client_ip}|GET|{request.path}|{request.user_agent}"
+        )
+        simulation.emit({
+            'event_type': 'request_start',
+            'timestamp': simulation.timestamp(),
+            'request_id': request.request_id,
+            'client_ip': request.client_ip,
+            'method': 'GET',
+            'path': request.path,
+            'query_string': '',
+            'user_agent': request.user_agent,
+            'protocol': 'HTTP/1.1',
+            'content_length': 0,
+            'connection_header': request.headers.get('Connection', ''),
+            'headers': headers,
+            'header_fingerprint': header_fingerprint,
+            'capture_sampled': request.captured,
+            'concurrent_requests': self.concurrent_requests,
+            'client_request_count': self.client_ips.get(request.client_ip, 0)
+        })
+
+        cost = route_cost(request.path)
+        cpu_ms, delay = cost if cost is not None else (0.05, 0.0)
+        cpu_seconds = (self.overhead_cpu_ms + cpu_ms) / 1000 * self.rng.lognormvariate(0.0, self.cpu_jitter)
+        self.cpu_seconds += cpu_seconds
+
+        # FIFO over the earliest free core; admission order is time order
+        core_start = heapq.heappop(self.core_free_at)
+        cpu_end = max(now, core_start) + cpu_seconds
+        heapq.heappush(self.core_free_at, cpu_end)
+        status = 200 if cost is not None else 404
+        simulation.schedule(cpu_end + delay, self._complete, request, status)
+
+    def _complete(self, request, status):
+        simulation = self.simulation
+        now = simulation.now
+        response_time = now - request.admitted
+
+        self.request_count += 1
+        if request.captured:
+            self.captured_requests += 1
+        self.request_rate.add(response_time, now)
+        self.latency_histogram.record(response_time * 1000000, now)
+        self.client_ips[request.client_ip] = self.client_ips.get(request.client_ip, 0) + 1
+        self.user_agents[request.user_agent] = self.user_agents.get(request.user_agent, 0) + 1
+        self.concurrent_requests -= 1
+
+        simulation.emit_server_log('INFO', f"REQUEST_END|{request.request_id}|{status}|{response_time:.3f}s")
+        simulation.emit({
+            'event_type': 'request_end',
+            'timestamp': simulation.timestamp(),
+            'request_id': request.request_id,
+            'status_code': status,
+            'response_time_ms': response_time * 1000,
+            'response_size': self.response_size(request.path, status),
+            'content_type': 'application/json' if status == 200 else 'text/html; charset=utf-8',
+            'server_metrics': self.metrics_dict()
+        })
+
+        if self.accept_head < len(self.accept_queue):
+            waiting = self.accept_queue[self.accept_head]
+            self.accept_queue[self.accept_head] = None
+            self.accept_head += 1
+            if self.accept_head > 4096:
+                del self.accept_queue[:self.accept_head]
+                self.accept_head = 0
+            self._admit(waiting)
+
+        request.on_done(now, status)
+
+    def response_size(self, path, status):
+        """Length of the compact JSON body the route would return"""
+        if status != 200:
+            return 207
+        timestamp = len(self.simulation.timestamp())
+        if path == '/':
+            body = {"service": "HTTP/2 Enhanced Logging Server", "timestamp": "", "metrics": self.metrics_dict()}
+            return len(json.dumps(body, separators=(',', ':'))) + timestamp + 1
+        if path.startswith(DATA_PREFIX):
+            size = min(int(path[len(DATA_PREFIX):]), DATA_CAP)
+            return len('{"data":"","size":,"timestamp":""}') + size + len(str(size)) + timestamp + 1
+        if path == '/api/heavy':
+            data = f"heavy computation result: {sum(i ** 2 for i in range(10000))}"
+        else:
+            data = f"{path.rsplit('/', 1)[-1]} response"
+        return len('{"data":"","timestamp":""}') + len(data) + timestamp + 1
+
+
+class NormalClient:
+    """One NormalTrafficGenerator loop: request, wait for it, pause, repeat"""
+
+    def __init__(self, simulation, server, rng, counter, client_ip, end_time):
+        self.simulation = simulation
+        self.server = server
+        self.rng = rng
+        self.counter = counter
+        self.client_ip = client_ip
+        self.end_time = end_time
+
+    def send(self):
+        if self.simulation.now >= self.end_time:
+            return
+        self.counter['requests'] += 1
+        sequence = self.counter['requests']
+        endpoint = self.rng.choices(NORMAL_ENDPOINTS, weights=NORMAL_ENDPOINT_WEIGHTS)[0]
+        user_agent = self.rng.choice(NORMAL_USER_AGENTS)
+        headers = {'Host': HOST_HEADER, 'User-Agent': user_agent}
+        headers.update(NORMAL_HEADERS)
+        sent_at = self.simulation.now
+
+        def done(now, status):
+            if now - sent_at <= NORMAL_TIMEOUT:
+                self.simulation.emit({
+                    'event_type': 'normal_request',
+                    'timestamp': self.simulation.timestamp(),
+                    'request_id': sequence,
+                    'endpoint': endpoint,
+                    'status_code': status,
+                    'response_time_ms': (now - sent_at) * 1000,
+                    'user_agent': user_agent
+                })
+            self.simulation.schedule(now + realistic_interval(self.rng), self.send)
+
+        self.server.submit(SimulatedRequest(
+            '%08x' % self.rng.getrandbits(32), endpoint, user_agent, headers,
+            self.client_ip, sent_at, done
+        ))
+
+
+class AttackClient:
+    """RapidResetSimulator.run_attack: concurrent batches paced to request_rate"""
+
+    def __init__(self, simulation, server, rng, config, client_ip):
+        self.simulation = simulation
+        self.server = server
+        self.rng = rng
+        self.config = config
+        self.client_ip = client_ip
+        self.started = None
+        self.total_requests = 0
+        self.pending = 0
+        self.batch_start = 0.0
+        self.batch_end = 0.0
+
+    def start(self):
+        self.started = self.simulation.now
+        self.simulation.emit({
+            'event_type': 'attack_start',
+            'timestamp': self.simulation.timestamp(),
+            'attack_name': self.config.name,
+            'config': self.config.__dict__
+        })
+        self.send_batch()
+
+    def send_batch(self):
+        config = self.config
+        now = self.simulation.now
+        if now - self.started >= config.duration_seconds:
+            self.simulation.emit({
+                'event_type': 'attack_end',
+                'timestamp': self.simulation.timestamp(),
+                'attack_name': config.name,
+                'total_requests': self.total_requests,
+                'duration_seconds': now - self.started
+            })
+            return
+
+        batch = min(config.concurrent_streams, config.request_rate)
+        self.batch_start = now
+        self.batch_end = now
+        self.pending = batch
+        for _ in range(batch):
+            self.total_requests += 1
+            endpoint = self.rng.choice(config.endpoints)
+            user_agent = self.rng.choice(config.user_agents)
+            # Resets are client-side timeouts; the server still serves them
+            timeout = RESET_TIMEOUT if self.rng.random() < config.reset_probability else ATTACK_TIMEOUT
+            headers = {'Host': HOST_HEADER, 'User-Agent': user_agent}
+            headers.update(ATTACK_HEADERS)
+            self.server.submit(SimulatedRequest(
+                '%08x' % self.rng.getrandbits(32), endpoint, user_agent, headers,
+                self.client_ip, now, self._request_done(now + timeout)
+            ))
+
+    def _request_done(self, gives_up_at):
+        def done(now, status):
+            self.batch_end = max(self.batch_end, min(now, gives_up_at))
+            self.pending -= 1
+            if self.pending == 0:
+                target = self.batch_start + min(self.config.concurrent_streams, self.config.request_rate) / self.config.request_rate
+                self.simulation.schedule(max(self.batch_end, target), self.send_batch)
+        return done
+
+
+def parse_attack(value):
+    """'name@offset_seconds' -> (offset, name)"""
+    name, _, offset = value.partition('@')
+    if name not in ATTACK_CONFIGS or not offset:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME@SECONDS with NAME in {', '.join(ATTACK_CONFIGS)}, got {value!r}"
+        )
+    return float(offset), name
+
+
+def simulate(output, hours=24.0, clients=1, seed=0, start=None, attacks=(), random_attacks=0,
+             server_log=None, cores=1, max_concurrency=64, sample_interval=1.0, window_seconds=60,
+             capture_sample_rate=0.1, capture_fingerprint='hash'):
+    """Generate `hours` of virtual traffic into `output`; returns run statistics"""
+    rng = random.Random(seed)
+    start = start or datetime.now().replace(microsecond=0)
+    duration = hours * 3600
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+    schedule = sorted(attacks)
+    for _ in range(random_attacks):
+        schedule.append((rng.uniform(0, duration), rng.choice(list(ATTACK_CONFIGS))))
+    schedule.sort()
+
+    server_log_file = None
+    if server_log:
+        os.makedirs(os.path.dirname(server_log) or '.', exist_ok=True)
+        server_log_file = open(server_log, 'w', buffering=1 << 20)
+
+    with open(output, 'w', buffering=1 << 20) as writer:
+        simulation = Simulation(start, writer, server_log_file)
+
+        def log_header_fingerprint(fingerprint, header_names):
+            simulation.emit({
+                'event_type': 'header_fingerprint',
+                'timestamp': simulation.timestamp(),
+                'header_fingerprint': fingerprint,
+                'header_names': header_names
+            })
+
+        # Same capture decisions as the server's CAPTURE_* settings
+        capture_policy = CapturePolicy(
+            sample_rate=capture_sample_rate, fingerprint=capture_fingerprint, seed=seed,
+            on_new_fingerprint=log_header_fingerprint
+        )
+        server = ServerModel(
+            simulation, random.Random(rng.getrandbits(64)), capture_policy, cores=cores,
+            max_concurrency=max_concurrency, sample_interval=sample_interval,
+            window_seconds=window_seconds
+        )
+        counter = {'requests': 0}
+
+        simulation.emit({
+            'event_type': 'normal_traffic_start',
+            'timestamp': simulation.timestamp(),
+            'duration_hours': hours
+        })
+        for i in range(clients):
+            client = NormalClient(
+                simulation, server, random.Random(rng.getrandbits(64)),
+                counter, '127.0.0.1', duration
+            )
+            # Spread client start-up over one browsing interval
+            simulation.schedule(rng.uniform(0, 10) if clients > 1 else 0.0, client.send)
+        for offset, name in schedule:
+            attacker = AttackClient(
+                simulation, server, random.Random(rng.getrandbits(64)), ATTACK_CONFIGS[name], '127.0.0.1'
+            )
+            simulation.schedule(offset, attacker.start)
+
+        simulation.run(duration)
+        simulation.emit({
+            'event_type': 'normal_traffic_end',
+            'timestamp': simulation.timestamp(),
+            'total_requests': counter['requests'],
+            'duration_seconds': duration,
+            'average_rps': counter['requests'] / duration if duration else 0
+        })
+        # Let in-flight requests and running attacks finish past the end
+        simulation.run()
+
+    if server_log_file is not None:
+        server_log_file.close()
+
+    return {
+        'virtual_seconds': simulation.now,
+        'server_requests': server.request_count,
+        'normal_requests': counter['requests'],
+        'attacks': [name for _, name in schedule]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic ML training logs on a virtual clock')
+    parser.add_argument('--hours', type=float, default=24.0, help='Virtual duration of normal traffic')
+    parser.add_argument('--clients', type=int, default=1,
+                        help='Concurrent normal traffic generator loops')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None,
+                        help='ISO timestamp of virtual time 0 (default: now)')
+    parser.add_argument('--attack', type=parse_attack, action='append', default=[],
+                        help='Attack from ATTACK_CONFIGS at an offset, e.g. medium@3600 (repeatable)')
+    parser.add_argument('--random-attacks', type=int, default=0,
+                        help='Additional attacks at seeded random offsets')
+    parser.add_argument('--output', default='logs/simulated/ml_training_data.jsonl')
+    parser.add_argument('--server-log', default=None,
+                        help='Also write detailed_server.log style lines here')
+    parser.add_argument('--cores', type=int, default=1,
+                        help='Requests that can hold the CPU at once (1 = GIL)')
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help='Requests in flight before arrivals queue')
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--window-seconds', type=int, default=60)
+    parser.add_argument('--capture-sample-rate', type=float, default=0.1,
+                        help='Share of clients logged with full headers (CAPTURE_SAMPLE_RATE)')
+    parser.add_argument('--capture-fingerprint', choices=FINGERPRINT_MODES, default='hash',
+                        help='Header fingerprint mode (CAPTURE_FINGERPRINT)')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    stats = simulate(
+        args.output, hours=args.hours, clients=args.clients, seed=args.seed, start=args.start,
+        attacks=args.attack, random_attacks=args.random_attacks, server_log=args.server_log,
+        cores=args.cores, max_concurrency=args.max_concurrency,
+        sample_interval=args.sample_interval, window_seconds=args.window_seconds,
+        capture_sample_rate=args.capture_sample_rate, capture_fingerprint=args.capture_fingerprint
+    )
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"Simulated {stats['virtual_seconds'] / 3600:.2f}h in {elapsed:.1f}s "
+          f"({stats['virtual_seconds'] / max(elapsed, 1e-9):,.0f}x real time)")
+    print(f"  server requests: {stats['server_requests']:,}")
+    print(f"  normal requests: {stats['normal_requests']:,}")
+    print(f"  attacks: {', '.join(stats['attacks']) or 'none'}")
+    print(f"Events written to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
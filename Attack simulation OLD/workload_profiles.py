@@ -0,0 +1,91 @@
+"""Workload tables shared by the live traffic generators and traffic_simulator.
+
+Kept free of logging setup and network imports so the offline simulator
+can use them without touching the live-run log files.
+"""
+from dataclasses import dataclass
+from typing import List
+
+@dataclass
+class AttackConfig:
+    name: str
+    concurrent_streams: int
+    request_rate: int  # requests per second
+    duration_seconds: int
+    reset_probability: float  # 0.0 to 1.0
+    endpoints: List[str]
+    user_agents: List[str]
+
+# Define different attack intensities
+ATTACK_CONFIGS = {
+    'light': AttackConfig(
+        name='Light Rapid Reset',
+        concurrent_streams=20,
+        request_rate=50,
+        duration_seconds=30,
+        reset_probability=0.8,
+        endpoints=['/api/fast', '/api/medium'],
+        user_agents=['LightAttacker/1.0', 'TestBot/1.0']
+    ),
+    'medium': AttackConfig(
+        name='Medium Rapid Reset',
+        concurrent_streams=50,
+        request_rate=150,
+        duration_seconds=60,
+        reset_probability=0.9,
+        endpoints=['/api/fast', '/api/medium', '/api/slow'],
+        user_agents=['MediumAttacker/1.0', 'LoadTester/2.0']
+    ),
+    'heavy': AttackConfig(
+        name='Heavy Rapid Reset',
+        concurrent_streams=100,
+        request_rate=300,
+        duration_seconds=45,
+        reset_probability=0.95,
+        endpoints=['/api/fast', '/api/medium', '/api/slow', '/api/heavy'],
+        user_agents=['HeavyAttacker/1.0', 'StressBot/3.0']
+    ),
+    'extreme': AttackConfig(
+        name='Extreme Rapid Reset',
+        concurrent_streams=200,
+        request_rate=500,
+        duration_seconds=30,
+        reset_probability=0.98,
+        endpoints=['/api/fast', '/api/medium', '/api/slow', '/api/heavy', '/api/data/1000'],
+        user_agents=['ExtremeAttacker/1.0', 'MaxStress/4.0']
+    )
+}
+
+# Headers attack_simulation sends besides User-Agent
+ATTACK_HEADERS = {
+    'Accept': 'application/json',
+    'Connection': 'keep-alive'
+}
+
+# normal_traffic_generator: browser user agents and the endpoint mix
+NORMAL_USER_AGENTS = [
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X)',
+    'Mozilla/5.0 (Android 11; Mobile; rv:91.0) Gecko/91.0'
+]
+NORMAL_ENDPOINTS = [
+    '/',
+    '/api/fast',
+    '/api/medium',
+    '/api/slow',
+    '/api/data/100',
+    '/api/data/500'
+]
+# Realistic usage patterns
+NORMAL_ENDPOINT_WEIGHTS = [0.3, 0.25, 0.2, 0.1, 0.1, 0.05]
+
+# Headers normal_traffic_generator sends besides User-Agent and the trace id
+NORMAL_HEADERS = {
+    'Accept': 'application/json,text/html,application/xhtml+xml',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Cache-Control': 'max-age=0'
+}
@@ -0,0 +1,178 @@
+"""Request-path cost of the online feature engine.
+
+Run from the Bots_Server directory:
+
+    python -m benchmarks.feature_stream_bench --output results/feature_stream.json
+
+Micro benchmarks time one request_started + request_finished pair (the
+work added to every request) with each publisher, one window close and
+publish, and count interpreter memory blocks across a run of requests to
+show the hot path does not allocate. Macro runs drive HTTP2Server over
+loopback HTTP/2 with the feature stream off and with each publisher.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+from benchmarks.harness import (
+    benchmark_metadata, enter_scratch_dir, free_port, run_http2_load, save_results,
+    start_server, stop_server
+)
+from servers.feature_stream import OnlineFeatureEngine, SharedMemoryRing, UnixSocketPublisher
+from servers.http2_server import HTTP2Server
+
+PATHS = ["/", "/api/data", "/api/heavy", "/health"]
+
+MACRO_VARIANTS = {
+    "off": {"enabled": False},
+    "unix": {"enabled": True, "publisher": "unix", "socket_path": "bench_{server}.sock"},
+    "shm": {"enabled": True, "publisher": "shm", "shm_name": "bench_{server}_features"},
+}
+
+
+def make_publisher(kind):
+    """Publisher plus a cleanup callable; the Unix socket gets a bound reader"""
+    if kind == "none":
+        return None, lambda: None
+    if kind == "shm":
+        ring = SharedMemoryRing(f"feature_bench_{os.getpid()}", slots=1024)
+        return ring, ring.close
+    path = os.path.abspath("feature_bench.sock")
+    if os.path.exists(path):
+        os.unlink(path)
+    reader = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    reader.bind(path)
+    publisher = UnixSocketPublisher(path)
+
+    def cleanup():
+        publisher.close()
+        reader.close()
+        os.unlink(path)
+    return publisher, cleanup
+
+
+def time_requests(engine, iterations, step):
+    """ns per started/finished pair, advancing a virtual clock by `step`"""
+    paths = PATHS
+    count = len(paths)
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(iterations):
+        engine.request_started(now, paths[i % count])
+        now += step
+        engine.request_finished(now, 5.0, i % 50 == 0, False)
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "ns_per_op": round(elapsed / iterations * 1e9, 1)}
+
+
+def run_micro(iterations):
+    results = {}
+    for kind in ("none", "unix", "shm"):
+        publisher, cleanup = make_publisher(kind)
+        try:
+            engine = OnlineFeatureEngine("bench", publisher=publisher)
+            # 10k requests per second of virtual time, so windows close as they would live
+            results[f"request_pair_{kind}"] = time_requests(engine, iterations, 0.0001)
+
+            engine.advance(time.time() + 120)
+            accumulator = engine.accumulators[0]
+            for _ in range(1000):
+                accumulator.record_start(accumulator.start, 1, 4)
+                accumulator.record_end(5.0, False, False)
+            start = time.perf_counter()
+            rounds = 2000
+            for _ in range(rounds):
+                vector = accumulator.close()
+                if publisher is not None:
+                    publisher.publish(accumulator.start, accumulator.window_seconds, vector)
+            elapsed = time.perf_counter() - start
+            results[f"window_close_{kind}"] = {
+                "iterations": rounds, "ns_per_op": round(elapsed / rounds * 1e9, 1)
+            }
+            if publisher is not None:
+                results[f"window_close_{kind}"]["dropped"] = publisher.dropped
+        finally:
+            cleanup()
+
+    # Within one window nothing on the request path should allocate
+    engine = OnlineFeatureEngine("bench", windows=(3600.0,))
+    now = engine.accumulators[0].start
+    time_requests(engine, 1000, 0.0)
+    before = sys.getallocatedblocks()
+    for i in range(iterations):
+        engine.request_started(now, PATHS[i % 4])
+        engine.request_finished(now, 5.0, False, False)
+    results["allocated_blocks_delta"] = {
+        "iterations": iterations, "blocks": sys.getallocatedblocks() - before
+    }
+    return results
+
+
+async def run_macro(name, options, duration, concurrency):
+    port = free_port()
+    server = HTTP2Server(
+        "127.0.0.1", port, f"bench_{name}", log_mode="batched",
+        processing_delay_scale=0.0, feature_stream_options=options
+    )
+    reader = None
+    if options.get("publisher") == "unix":
+        # Something has to be listening or every datagram is counted as dropped
+        reader = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        reader.bind(options["socket_path"].format(server=server.log_name))
+    task = await start_server(server)
+    try:
+        result = await run_http2_load(
+            f"http://127.0.0.1:{port}", PATHS[:2], concurrency=concurrency, duration=duration
+        )
+    finally:
+        await stop_server(task)
+        if reader is not None:
+            path = reader.getsockname()
+            reader.close()
+            os.unlink(path)
+    return result
+
+
+def print_results(results):
+    for name, result in results.get("micro", {}).items():
+        if "ns_per_op" in result:
+            print(f"micro {name:<24} {result['ns_per_op']:>10,.1f} ns/op")
+        else:
+            print(f"micro {name:<24} {result['blocks']:>10,} blocks over {result['iterations']:,} requests")
+    for name, result in results.get("macro", {}).items():
+        print(f"macro feature_stream={name:<6} {result['requests_per_second']:>10,.1f} req/s, "
+              f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms, "
+              f"errors {result['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', choices=['micro', 'macro'], help='Run one half of the suite')
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per macro variant')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--output', help='JSON file for the results')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    enter_scratch_dir('feature_stream_bench_')
+    results = {"meta": benchmark_metadata()}
+    if args.only in (None, 'micro'):
+        results["micro"] = run_micro(args.iterations)
+    if args.only in (None, 'macro'):
+        results["macro"] = {
+            name: asyncio.run(run_macro(name, options, args.duration, args.concurrency))
+            for name, options in MACRO_VARIANTS.items()
+        }
+
+    print_results(results)
+    if output:
+        save_results(results, output)
+        print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Shared helpers for running HTTP2Server in-process over loopback"""
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+
+def free_port(host="127.0.0.1"):
+    """Reserve an ephemeral port number for a server bound right after"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def enter_scratch_dir(prefix='bench_'):
+    """chdir into a temp dir with the logs/ layout the servers expect"""
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    for sub in ('server_logs', 'bot_logs', 'attack_logs'):
+        os.makedirs(os.path.join(workdir, 'logs', sub))
+    os.chdir(workdir)
+    return workdir
+
+
+async def wait_for_port(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"Server on {host}:{port} did not start")
+
+
+async def start_server(server):
+    """Run `server.run()` as a task and wait until it accepts connections"""
+    task = asyncio.create_task(server.run())
+    await wait_for_port(server.host, server.port)
+    return task
+
+
+async def stop_server(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100.0))
+    return sorted_values[index]
+
+
+async def run_http2_load(base_url, paths, concurrency=50, duration=5.0, connections=1):
+    """Closed-loop benign load: `concurrency` workers issue requests back to back.
+
+    Workers share `connections` prior-knowledge HTTP/2 clients, so requests
+    are multiplexed the way browsers do it. Hypercorn closes a connection
+    after `keep_alive_max_requests` (1000) requests; streams in flight at
+    that moment fail and show up under `error_types`.
+    """
+    clients = [
+        httpx.AsyncClient(http1=False, http2=True, base_url=base_url, timeout=30.0)
+        for _ in range(connections)
+    ]
+    latencies = []
+    errors = [0]
+    error_types = {}
+    deadline = time.monotonic() + duration
+
+    async def worker(worker_id):
+        client = clients[worker_id % len(clients)]
+        i = worker_id
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors[0] += 1
+            except httpx.HTTPError as e:
+                errors[0] += 1
+                error_types[type(e).__name__] = error_types.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.aclose()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "error_types": error_types,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def benchmark_metadata():
+    """Environment details stored with every result file"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit
+    }
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare_results(current, baseline, metrics, threshold_pct=10.0):
+    """Compare two result files section by section.
+
+    `metrics` maps a section name ("micro", "macro") to {metric: direction},
+    where direction is "lower" or "higher" for the better value. Returns a
+    list of rows; a row is a regression when the change is worse than
+    `threshold_pct`.
+    """
+    rows = []
+    for section, section_metrics in metrics.items():
+        for name, result in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            for metric, better in section_metrics.items():
+                if metric not in result or not base.get(metric):
+                    continue
+                change_pct = (result[metric] - base[metric]) / base[metric] * 100.0
+                worse = change_pct > threshold_pct if better == "lower" else change_pct < -threshold_pct
+                rows.append({
+                    "benchmark": f"{section}.{name}",
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "change_pct": round(change_pct, 1),
+                    "regression": worse
+                })
+    return rows
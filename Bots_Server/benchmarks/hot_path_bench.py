@@ -0,0 +1,209 @@
+"""Micro- and macro-benchmarks for the HTTP2Server request hot path.
+
+Run from the Bots_Server directory:
+
+    python -m benchmarks.hot_path_bench --output results/hot_path.json
+    python -m benchmarks.hot_path_bench --baseline results/hot_path.json
+
+Micro benchmarks time each piece of `handle_request` in isolation (record
+building, JSON encoding, psutil vs the sampler snapshot, sync vs batched
+logging, jsonify, route matching, a full in-process dispatch). Macro runs
+drive the Quart app over loopback HTTP/2 on an ephemeral port with fixed
+benign workloads. With --baseline, a metric that is worse by more than
+--threshold percent is reported as a regression and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import psutil
+from quart import jsonify
+
+from benchmarks.harness import (
+    benchmark_metadata, compare_results, enter_scratch_dir, free_port, load_results,
+    run_http2_load, save_results, start_server, stop_server
+)
+from servers.http2_server import HTTP2Server
+from servers.log_pipeline import BatchedLogWriter
+from servers.system_sampler import SystemSampler
+
+# Fixed benign workloads; keep them stable so results stay comparable
+WORKLOADS = {
+    "simulated_delay": {"paths": ["/", "/api/data"], "concurrency": 100, "delay_scale": 1.0},
+    "no_delay": {"paths": ["/", "/api/data"], "concurrency": 50, "delay_scale": 0.0},
+}
+
+COMPARED_METRICS = {
+    "micro": {"ns_per_op": "lower"},
+    "macro": {"requests_per_second": "higher", "latency_p50_ms": "lower", "latency_p99_ms": "lower"},
+}
+
+
+def time_sync(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "ns_per_op": round(elapsed / iterations * 1e9, 1)}
+
+
+async def time_async(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "ns_per_op": round(elapsed / iterations * 1e9, 1)}
+
+
+def build_record(server, system):
+    """Same record as `HTTP2Server.handle_request` logs"""
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "server_id": server.server_id,
+        "method": "GET",
+        "path": "/api/data",
+        "response_time_ms": 12.5,
+        "request_count": server.request_count,
+        "connection_count": server.connection_count,
+        "client_ip": "127.0.0.1"
+    }
+    record.update(system.as_log_fields())
+    return record
+
+
+def file_logger(path):
+    """FileHandler-only logger with the sync mode's format (no console echo)"""
+    logger = logging.getLogger('hot_path_bench_sync')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('[bench] %(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    return logger, handler
+
+
+async def run_micro(iterations):
+    sampler = SystemSampler()
+    server = HTTP2Server(
+        "127.0.0.1", 0, "bench_micro", log_mode="batched",
+        system_sampler=sampler, processing_delay_scale=0.0
+    )
+    record = build_record(server, sampler.snapshot)
+    results = {}
+
+    results["build_log_record"] = time_sync(lambda: build_record(server, sampler.snapshot), iterations)
+    results["json_encode"] = time_sync(lambda: json.dumps(record), iterations)
+    # What every request paid before the sampler existed
+    results["psutil_per_request"] = time_sync(
+        lambda: (psutil.cpu_percent(), psutil.virtual_memory()), max(1, iterations // 10)
+    )
+    results["sampler_snapshot"] = time_sync(lambda: sampler.snapshot.as_log_fields(), iterations)
+
+    logger, handler = file_logger('logs/server_logs/bench_sync.log')
+    results["log_sync_file"] = time_sync(lambda: logger.info(json.dumps(record)), iterations)
+    logger.removeHandler(handler)
+    handler.close()
+
+    writer = BatchedLogWriter('logs/server_logs/bench_batched.log', max_queue=iterations + 1)
+    writer.start()
+    results["log_batched_enqueue"] = time_sync(lambda: writer.write(record), iterations)
+    writer.close()
+
+    adapter = server.app.url_map.bind("localhost")
+    results["route_match"] = time_sync(lambda: adapter.match("/api/data"), iterations)
+
+    async with server.app.app_context():
+        results["jsonify"] = time_sync(lambda: jsonify({
+            "status": "success",
+            "server_id": server.server_id,
+            "timestamp": datetime.now().isoformat(),
+            "processing_time": 12.5,
+            "data": {"message": "Response from /api/data"}
+        }), iterations)
+
+    # Whole Quart dispatch without sockets: routing, handler, logging, jsonify
+    server.log_writer.start()
+    client = server.app.test_client()
+    results["quart_dispatch"] = await time_async(
+        lambda: client.get("/api/data"), max(1, iterations // 10)
+    )
+    server.log_writer.close()
+    return results
+
+
+async def run_macro(name, workload, duration):
+    port = free_port()
+    server = HTTP2Server(
+        "127.0.0.1", port, f"bench_{name}", log_mode="batched",
+        processing_delay_scale=workload["delay_scale"]
+    )
+    task = await start_server(server)
+    try:
+        result = await run_http2_load(
+            f"http://127.0.0.1:{port}", workload["paths"],
+            concurrency=workload["concurrency"], duration=duration
+        )
+    finally:
+        await stop_server(task)
+    result["workload"] = workload
+    return result
+
+
+def print_results(results):
+    for name, result in results.get("micro", {}).items():
+        print(f"micro {name:<22} {result['ns_per_op']:>12,.1f} ns/op")
+    for name, result in results.get("macro", {}).items():
+        print(f"macro {name:<22} {result['requests_per_second']:>10,.1f} req/s, "
+              f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms, "
+              f"errors {result['errors']}")
+
+
+def print_comparison(rows):
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:<32} {row['metric']:<20} {row['baseline']:>12} -> "
+              f"{row['current']:>12} ({row['change_pct']:+.1f}%) {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', choices=['micro', 'macro'], help='Run one half of the suite')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per macro workload')
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent change counted as a regression')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = load_results(args.baseline) if args.baseline else None
+
+    enter_scratch_dir('hot_path_bench_')
+    results = {"meta": benchmark_metadata()}
+    if args.only in (None, 'micro'):
+        results["micro"] = asyncio.run(run_micro(args.iterations))
+    if args.only in (None, 'macro'):
+        results["macro"] = {
+            name: asyncio.run(run_macro(name, workload, args.duration))
+            for name, workload in WORKLOADS.items()
+        }
+
+    print_results(results)
+    if output:
+        save_results(results, output)
+        print(f"Results written to {output}")
+
+    if baseline:
+        rows = compare_results(results, baseline, COMPARED_METRICS, args.threshold)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
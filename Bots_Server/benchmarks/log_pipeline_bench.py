@@ -0,0 +1,130 @@
+"""Micro-benchmark of HTTP2Server.log_event: sync handlers vs the batched writer.
+
+Run from the Bots_Server directory:
+
+    python -m benchmarks.log_pipeline_bench --events 200000 --concurrency 500
+
+Each iteration builds the same record as `HTTP2Server.handle_request` and
+logs it through `HTTP2Server.log_event`; no HTTP request is served, so the
+result is log events per second, not server throughput (use
+benchmarks.hot_path_bench for end-to-end requests per second). Console
+output of the sync path goes to /dev/null so the numbers understate its
+real cost.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from servers.http2_server import HTTP2Server
+
+
+async def measure_loop_stalls(stop_event, stalls, interval=0.001):
+    """Record how late the event loop wakes up a short periodic sleep"""
+    loop = asyncio.get_running_loop()
+    while not stop_event.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        stalls.append(max(0.0, loop.time() - expected))
+
+
+async def run_workload(server, total_events, concurrency):
+    remaining = [total_events]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            server.request_count += 1
+            server.log_event({
+                "timestamp": datetime.now().isoformat(),
+                "server_id": server.server_id,
+                "method": "GET",
+                "path": "/api/data",
+                "response_time_ms": 12.5,
+                "request_count": server.request_count,
+                "connection_count": server.connection_count,
+                "client_ip": "127.0.0.1"
+            })
+            # Yield like a real handler would between requests
+            await asyncio.sleep(0)
+
+    stop_event = asyncio.Event()
+    stalls = []
+    stall_task = asyncio.create_task(measure_loop_stalls(stop_event, stalls))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop_event.set()
+    await stall_task
+
+    stalls.sort()
+    return {
+        "log_events": total_events,
+        "elapsed_seconds": round(elapsed, 3),
+        "log_events_per_second": round(total_events / elapsed, 1),
+        "loop_stall_p99_ms": round(stalls[int(len(stalls) * 0.99)] * 1000, 3) if stalls else 0,
+        "loop_stall_max_ms": round(stalls[-1] * 1000, 3) if stalls else 0
+    }
+
+
+async def run_benchmark(mode, total_events, concurrency):
+    server = HTTP2Server("localhost", 0, f"bench_{mode}", log_mode=mode)
+    if server.log_writer:
+        server.log_writer.start()
+
+    result = await run_workload(server, total_events, concurrency)
+
+    if server.log_writer:
+        close_start = time.perf_counter()
+        server.log_writer.close()
+        result["drain_seconds"] = round(time.perf_counter() - close_start, 3)
+        result["writer_stats"] = server.log_writer.get_stats()
+    else:
+        for handler in server.logger.root.handlers:
+            handler.flush()
+
+    result["mode"] = mode
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp(prefix='log_pipeline_bench_')
+    os.makedirs(os.path.join(workdir, 'logs', 'server_logs'))
+    os.chdir(workdir)
+
+    # The sync path installs a StreamHandler on stderr; keep the terminal quiet
+    real_stderr = sys.stderr
+    sys.stderr = open(os.devnull, 'w')
+    try:
+        results = [
+            asyncio.run(run_benchmark(mode, args.events, args.concurrency))
+            for mode in ("sync", "batched")
+        ]
+    finally:
+        sys.stderr = real_stderr
+
+    for result in results:
+        print(f"{result['mode']:>8}: {result['log_events_per_second']:>10,.0f} log events/s, "
+              f"loop stall p99 {result['loop_stall_p99_ms']} ms, max {result['loop_stall_max_ms']} ms")
+    print(json.dumps(results, indent=2))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
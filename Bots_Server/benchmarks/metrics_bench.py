@@ -0,0 +1,161 @@
+"""Cost of the /metrics counters on the request path and of scraping them.
+
+Run from the Bots_Server directory:
+
+    python -m benchmarks.metrics_bench --output results/metrics.json
+
+Micro benchmarks time ServerMetrics.observe, one request through the ASGI
+middleware against a bare ASGI app, and render() after a large number of
+requests, which must not grow with traffic. Macro runs drive HTTP2Server
+over loopback HTTP/2 with metrics off, on, and on while /metrics is scraped
+every --scrape-interval seconds.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.harness import (
+    benchmark_metadata, enter_scratch_dir, free_port, run_http2_load, save_results,
+    start_server, stop_server
+)
+from servers.http2_server import HTTP2Server
+from servers.metrics import ServerMetrics
+
+ROUTES = ["/", "/api/data", "/heavy-task", "/streaming", "/upload", "/metrics"]
+
+MACRO_VARIANTS = {
+    "off": ({"enabled": False}, False),
+    "on": ({"enabled": True}, False),
+    "on_scraped": ({"enabled": True}, True),
+}
+
+
+def run_micro(iterations):
+    results = {}
+    metrics = ServerMetrics("bench", ROUTES)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        metrics.observe(i & 3, 200, 0.004)
+    elapsed = time.perf_counter() - start
+    results["observe"] = {"iterations": iterations, "ns_per_op": round(elapsed / iterations * 1e9, 1)}
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def drive(asgi_app, count):
+        scope = {"type": "http", "path": "/api/data"}
+        start = time.perf_counter()
+        for _ in range(count):
+            await asgi_app(scope, None, send)
+        return time.perf_counter() - start
+
+    bare = asyncio.run(drive(app, iterations))
+    wrapped = asyncio.run(drive(metrics.wrap_asgi(app), iterations))
+    results["asgi_bare"] = {"iterations": iterations, "ns_per_op": round(bare / iterations * 1e9, 1)}
+    results["asgi_with_metrics"] = {"iterations": iterations, "ns_per_op": round(wrapped / iterations * 1e9, 1)}
+
+    rounds = 1000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        text = metrics.render()
+    elapsed = time.perf_counter() - start
+    results["render"] = {
+        "iterations": rounds, "ns_per_op": round(elapsed / rounds * 1e9, 1),
+        "requests_counted": sum(map(sum, metrics.requests)), "bytes": len(text)
+    }
+    return results
+
+
+async def scrape(url, interval, stop):
+    """Poll /metrics until stopped; returns scrape latencies in ms"""
+    latencies = []
+    async with httpx.AsyncClient(http1=False, http2=True, timeout=10.0) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+    return latencies
+
+
+async def run_macro(name, options, scraped, duration, concurrency, scrape_interval):
+    port = free_port()
+    server = HTTP2Server(
+        "127.0.0.1", port, f"bench_{name}", log_mode="batched",
+        processing_delay_scale=0.0, metrics_options=options
+    )
+    task = await start_server(server)
+    stop = asyncio.Event()
+    scraper = None
+    if scraped:
+        scraper = asyncio.create_task(scrape(f"http://127.0.0.1:{port}/metrics", scrape_interval, stop))
+    try:
+        result = await run_http2_load(
+            f"http://127.0.0.1:{port}", ["/", "/api/data"], concurrency=concurrency, duration=duration
+        )
+    finally:
+        stop.set()
+        if scraper:
+            latencies = sorted(await scraper)
+            result["scrapes"] = len(latencies)
+            result["scrape_p50_ms"] = round(latencies[len(latencies) // 2], 3) if latencies else None
+            result["scrape_max_ms"] = round(latencies[-1], 3) if latencies else None
+        await stop_server(task)
+    return result
+
+
+def print_results(results):
+    for name, result in results.get("micro", {}).items():
+        print(f"micro {name:<20} {result['ns_per_op']:>12,.1f} ns/op")
+    for name, result in results.get("macro", {}).items():
+        line = (f"macro metrics={name:<10} {result['requests_per_second']:>10,.1f} req/s, "
+                f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms, "
+                f"errors {result['errors']}")
+        if "scrapes" in result:
+            line += f", {result['scrapes']} scrapes p50 {result['scrape_p50_ms']} ms max {result['scrape_max_ms']} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', choices=['micro', 'macro'], help='Run one half of the suite')
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per macro variant')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--scrape-interval', type=float, default=1.0)
+    parser.add_argument('--output', help='JSON file for the results')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    enter_scratch_dir('metrics_bench_')
+    results = {"meta": benchmark_metadata()}
+    if args.only in (None, 'micro'):
+        results["micro"] = run_micro(args.iterations)
+    if args.only in (None, 'macro'):
+        results["macro"] = {
+            name: asyncio.run(run_macro(
+                name, options, scraped, args.duration, args.concurrency, args.scrape_interval
+            ))
+            for name, (options, scraped) in MACRO_VARIANTS.items()
+        }
+
+    print_results(results)
+    if output:
+        save_results(results, output)
+        print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Overhead of the stream-reset mitigation on benign HTTP/2 traffic.
+
+Run from the Bots_Server directory:
+
+    python -m benchmarks.mitigation_bench --duration 10 --concurrency 100
+
+Reports the per-batch cost of the limiter check in isolation, then runs the
+same benign loopback workload against HTTP2Server with mitigation off and on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import h2.events
+
+from benchmarks.harness import enter_scratch_dir, free_port, run_http2_load, start_server, stop_server
+from servers.http2_server import HTTP2Server
+from servers.mitigation import ResetMitigationPolicy
+
+
+def benign_event_batch(stream_id):
+    """Events h2 reports for one ordinary GET request"""
+    return [
+        h2.events.RequestReceived(stream_id=stream_id),
+        h2.events.StreamEnded(stream_id=stream_id),
+        h2.events.WindowUpdated(stream_id=0),
+    ]
+
+
+def run_micro(iterations):
+    policy = ResetMitigationPolicy("bench")
+    limiter = policy.new_limiter()
+    batches = [benign_event_batch(2 * i + 1) for i in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        policy.check(limiter, batches[i % len(batches)])
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "ns_per_batch": round(elapsed / iterations * 1e9, 1)
+    }
+
+
+async def run_macro(mitigation, duration, concurrency):
+    port = free_port()
+    server = HTTP2Server(
+        "127.0.0.1", port, f"bench_mitigation_{'on' if mitigation else 'off'}",
+        log_mode="batched",
+        mitigation_options={"enabled": mitigation}
+    )
+    task = await start_server(server)
+    try:
+        result = await run_http2_load(
+            f"http://127.0.0.1:{port}", ["/", "/api/data"],
+            concurrency=concurrency, duration=duration
+        )
+    finally:
+        await stop_server(task)
+
+    result["mitigation"] = mitigation
+    if server.reset_mitigation:
+        result["mitigations_triggered"] = server.reset_mitigation.mitigations_triggered
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--output', help='Optional JSON file for the results')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    enter_scratch_dir('mitigation_bench_')
+    results = {
+        "micro": run_micro(args.iterations),
+        "macro": [
+            asyncio.run(run_macro(mitigation, args.duration, args.concurrency))
+            for mitigation in (False, True)
+        ]
+    }
+
+    print(f"limiter check: {results['micro']['ns_per_batch']} ns per benign request batch")
+    for result in results["macro"]:
+        print(f"mitigation {'on ' if result['mitigation'] else 'off'}: "
+              f"{result['requests_per_second']:>8,.1f} req/s, "
+              f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms")
+    print(json.dumps(results, indent=2))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
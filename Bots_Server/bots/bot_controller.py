@@ -7,16 +7,45 @@ import random
 from bots.normal_traffic_bots.web_browser_bot import WebBrowserBot
 from bots.normal_traffic_bots.streaming_bot import StreamingBot
 from bots.attack_bots.rapid_reset_bot import RapidResetBot
+from bots.bot_stats import BotStats
+from bots.client_pool import HTTPClientPool
+from bots.label_timeline import LabelTimeline
+from bots.scenario_engine import ATTACK, NORMAL, ScenarioEngine
+from bots.virtual_users import VirtualUserScheduler
 
 class BotController:
-    def __init__(self, config_file="config/bot_configs.yaml"):
-        with open(config_file, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_file="config/bot_configs.yaml", shard_index=0, shard_count=1):
+        self.config = self.load_config(config_file)
+        # A seeded engine also seeds bot creation so runs are reproducible;
+        # a private generator leaves the process-wide random module alone
+        self.engine_config = self.config.get('scenario_engine', {})
+        if self.engine_config.get('enabled', False):
+            self.random = random.Random(self.engine_config.get('seed', 0) + shard_index)
+        else:
+            self.random = random.Random()
         
         self.bots = []
         self.running = False
+        # With shard_count > 1 this controller runs only its share of the
+        # normal bots; see ShardedBotController
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.stats = BotStats()
+        # Normal-traffic bots borrow connections from here instead of
+        # opening a client per session
+        self.client_pool = HTTPClientPool(**self.config.get('client_pool', {}))
+        # Phases run in lockstep on every shard, so shard 0 records them for all
+        timeline_config = self.config.get('label_timeline', {})
+        self.label_timeline = None
+        if timeline_config.get('enabled', False) and shard_index == 0:
+            self.label_timeline = LabelTimeline(timeline_config.get('path', 'logs/label_timeline.jsonl'))
         self.setup_logging()
     
+    @staticmethod
+    def load_config(config_file="config/bot_configs.yaml"):
+        with open(config_file, 'r') as f:
+            return yaml.safe_load(f)
+    
     def setup_logging(self):
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger('bot_controller')
@@ -30,21 +59,39 @@ class BotController:
         servers = self.config['servers']
         
         # Create normal traffic bots
-        for i in range(self.config['normal_bots']['web_browser_count']):
+        for i in self.shard_range(self.config['normal_bots']['web_browser_count']):
             bot = WebBrowserBot(
                 bot_id=f"web_{i}",
                 target_servers=servers,
-                request_rate=random.uniform(0.5, 2.0)
+                request_rate=self.random.uniform(0.5, 2.0),
+                client_pool=self.client_pool,
+                stats=self.stats
             )
             self.bots.append(bot)
         
-        for i in range(self.config['normal_bots']['streaming_count']):
+        for i in self.shard_range(self.config['normal_bots']['streaming_count']):
             bot = StreamingBot(
                 bot_id=f"stream_{i}",
-                target_servers=servers
+                target_servers=servers,
+                client_pool=self.client_pool,
+                stats=self.stats
             )
             self.bots.append(bot)
         
+        # Large browsing populations run in one scheduler instead of one bot each
+        virtual_users = dict(self.config.get('virtual_users', {}))
+        if virtual_users.pop('enabled', False):
+            if self.engine_config.get('enabled', False):
+                virtual_users.setdefault('seed', self.engine_config.get('seed', 0) + self.shard_index)
+            if self.shard_count > 1:
+                virtual_users['user_count'] = len(self.shard_range(virtual_users.get('user_count', 10000)))
+                virtual_users['log_path'] = f'logs/bot_logs/virtual_users_{self.shard_index}.log'
+            self.bots.append(VirtualUserScheduler(servers, self.client_pool, stats=self.stats, **virtual_users))
+        
+        # Attack bots are not sharded; the first shard runs all of them
+        if self.shard_index != 0:
+            return
+        
         # Create attack bots
         for i, intensity in enumerate(self.config['attack_bots']['rapid_reset']['intensities']):
             for j in range(self.config['attack_bots']['rapid_reset']['count_per_intensity']):
@@ -56,22 +103,41 @@ class BotController:
                 )
                 self.bots.append(bot)
     
+    def bot_groups(self):
+        """Bots split into the normal and attack groups scenarios start"""
+        attack = [bot for bot in self.bots if isinstance(bot, RapidResetBot)]
+        normal = [bot for bot in self.bots if not isinstance(bot, RapidResetBot)]
+        return {NORMAL: normal, ATTACK: attack}
+    
+    def shard_range(self, count):
+        """Indices out of `count` bots that belong to this shard"""
+        return range(self.shard_index, count, self.shard_count)
+    
+    async def run_phase(self, scenario_name, group, bots, duration):
+        """Run one group's bots for `duration` and record the phase for labelling"""
+        phase = None
+        if self.label_timeline and bots:
+            phase = self.label_timeline.start(scenario_name, group, duration, len(bots))
+        try:
+            await asyncio.gather(*(bot.run(duration=duration) for bot in bots), return_exceptions=True)
+        finally:
+            if phase is not None:
+                self.label_timeline.end(phase)
+    
     async def run_scenario(self, scenario_name, duration=3600):
         """Run specific scenario"""
         scenario = self.config['scenarios'][scenario_name]
         self.logger.info(f"Starting scenario: {scenario_name}")
         
         tasks = []
+        groups = self.bot_groups()
         
         # Normal traffic phase
         if scenario.get('normal_traffic_duration', 0) > 0:
             self.logger.info("Starting normal traffic phase")
-            for bot in self.bots:
-                if 'attack' not in bot.__class__.__name__.lower():
-                    task = asyncio.create_task(
-                        bot.run(duration=scenario['normal_traffic_duration'])
-                    )
-                    tasks.append(task)
+            tasks.append(asyncio.create_task(
+                self.run_phase(scenario_name, NORMAL, groups[NORMAL], scenario['normal_traffic_duration'])
+            ))
         
         # Wait for normal traffic to establish baseline
         if scenario.get('baseline_duration', 0) > 0:
@@ -80,12 +146,9 @@ class BotController:
         # Attack phase
         if scenario.get('attack_duration', 0) > 0:
             self.logger.info("Starting attack phase")
-            for bot in self.bots:
-                if 'attack' in bot.__class__.__name__.lower():
-                    task = asyncio.create_task(
-                        bot.run(duration=scenario['attack_duration'])
-                    )
-                    tasks.append(task)
+            tasks.append(asyncio.create_task(
+                self.run_phase(scenario_name, ATTACK, groups[ATTACK], scenario['attack_duration'])
+            ))
         
         # Wait for all tasks to complete
         await asyncio.gather(*tasks, return_exceptions=True)
@@ -96,15 +159,35 @@ class BotController:
         self.running = True
         end_time = asyncio.get_event_loop().time() + duration
         
-        while asyncio.get_event_loop().time() < end_time and self.running:
-            # Randomly select scenario
-            scenario_name = random.choice(list(self.config['scenarios'].keys()))
-            scenario_duration = random.uniform(300, 900)  # 5-15 minutes
-            
-            await self.run_scenario(scenario_name, scenario_duration)
+        try:
+            if self.engine_config.get('enabled', False):
+                # Precomputed seeded timeline with call_at phase transitions
+                engine = ScenarioEngine(
+                    self,
+                    seed=self.engine_config.get('seed', 0),
+                    pause=self.engine_config.get('pause', (10.0, 60.0)),
+                    start_delay=self.engine_config.get('start_delay', 1.0),
+                    stop_grace=self.engine_config.get('stop_grace', 30.0)
+                )
+                await engine.run(duration)
+                return
             
-            # Brief pause between scenarios
-            await asyncio.sleep(random.uniform(10, 60))
+            while asyncio.get_event_loop().time() < end_time and self.running:
+                # Randomly select scenario
+                scenario_name = self.random.choice(list(self.config['scenarios'].keys()))
+                scenario_duration = self.random.uniform(300, 900)  # 5-15 minutes
+                
+                await self.run_scenario(scenario_name, scenario_duration)
+                
+                # Brief pause between scenarios
+                await asyncio.sleep(self.random.uniform(10, 60))
+        finally:
+            await self.client_pool.aclose()
+            self.close_label_timeline()
+    
+    def close_label_timeline(self):
+        if self.label_timeline:
+            self.label_timeline.close()
     
     def stop_all_bots(self):
         """Stop all running bots"""
@@ -0,0 +1,49 @@
+from servers.metrics import Histogram, log_bounds
+
+# Milliseconds, 5% apart from 0.1 ms to two minutes
+LATENCY_BOUNDS_MS = log_bounds(0.1, 120000.0, 1.05)
+
+
+class BotStats:
+    """Request, error and latency totals shared by the bots of one controller"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BOUNDS_MS)
+
+    def record(self, latency_ms):
+        self.requests += 1
+        self.latency.observe(latency_ms)
+
+    def record_error(self):
+        self.errors += 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.latency.merge(other.latency)
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency": self.latency.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.requests = data["requests"]
+        stats.errors = data["errors"]
+        stats.latency = Histogram.from_dict(LATENCY_BOUNDS_MS, data["latency"])
+        return stats
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_p50_ms": round(self.latency.percentile(50), 3),
+            "latency_p95_ms": round(self.latency.percentile(95), 3),
+            "latency_p99_ms": round(self.latency.percentile(99), 3)
+        }
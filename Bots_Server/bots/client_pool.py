@@ -0,0 +1,55 @@
+from contextlib import asynccontextmanager
+
+import httpx
+
+
+class HTTPClientPool:
+    """Long-lived HTTP/2 clients shared by the normal-traffic bots.
+
+    In "shared" mode every bot talking to a server borrows the same client,
+    so sessions multiplex their requests over a few warm connections. In
+    "per_user" mode each bot keeps its own client per server, which still
+    reuses connections across sessions the way one browser would.
+    """
+
+    MODES = ("shared", "per_user")
+
+    def __init__(self, mode="shared", max_connections=100, max_keepalive_connections=20,
+                 keepalive_expiry=60.0, timeout=30.0, http2=True):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown client pool mode: {mode}")
+        self.mode = mode
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2 = http2
+        self.clients = {}
+
+    def get(self, server_url, user_id=None):
+        key = server_url if self.mode == "shared" else (server_url, user_id)
+        client = self.clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, timeout=self.timeout
+            )
+            self.clients[key] = client
+        return client
+
+    async def aclose(self):
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def borrow_client(pool, server_url, user_id=None):
+    """Client from `pool`, or a throwaway one for bots running without a pool"""
+    if pool is not None:
+        yield pool.get(server_url, user_id)
+        return
+    async with httpx.AsyncClient(http2=True) as client:
+        yield client
@@ -0,0 +1,256 @@
+"""Ground-truth phase timeline and the labeller that joins it onto server logs.
+
+BotController appends a `label_phase_start` / `label_phase_end` pair to the
+timeline file for every normal or attack phase it runs. Label server logs
+from the Bots_Server directory with:
+
+    python -m bots.label_timeline logs/label_timeline.jsonl logs/server_logs/*.log \
+        --output logs/labelled_events.jsonl
+
+The timeline is turned into sorted segment edges once; every event is then
+placed with one vectorised `searchsorted` per chunk of lines, so labelling
+is a single streaming pass however many events there are. An instant is
+`attack` while any attack phase runs, otherwise `normal` while a normal
+phase runs, otherwise `idle`.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+LABELS = ("idle", "normal", "attack")
+IDLE, NORMAL_LABEL, ATTACK_LABEL = range(len(LABELS))
+GROUP_LABELS = {"normal": NORMAL_LABEL, "attack": ATTACK_LABEL}
+TIMESTAMP_KEY = '"timestamp": "'
+
+
+class LabelTimeline:
+    """Append-only JSONL record of when each bot group was running"""
+
+    def __init__(self, path="logs/label_timeline.jsonl"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', buffering=1)
+        self.next_phase = 0
+        self.open_phases = {}
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+
+    def start(self, scenario, group, planned_duration=None, bots=0):
+        """Record that `group` started running for `scenario`; returns the phase id"""
+        phase_id = f"{os.getpid()}-{self.next_phase}"
+        self.next_phase += 1
+        self.open_phases[phase_id] = (scenario, group)
+        self._write({
+            "event_type": "label_phase_start",
+            "timestamp": datetime.now().isoformat(),
+            "time": time.time(),
+            "phase_id": phase_id,
+            "scenario": scenario,
+            "group": group,
+            "label": LABELS[GROUP_LABELS[group]],
+            "planned_duration": planned_duration,
+            "bots": bots
+        })
+        return phase_id
+
+    def end(self, phase_id):
+        phase = self.open_phases.pop(phase_id, None)
+        if phase is None:
+            return
+        scenario, group = phase
+        self._write({
+            "event_type": "label_phase_end",
+            "timestamp": datetime.now().isoformat(),
+            "time": time.time(),
+            "phase_id": phase_id,
+            "scenario": scenario,
+            "group": group
+        })
+
+    def close(self):
+        """End every phase still open and close the file"""
+        for phase_id in list(self.open_phases):
+            self.end(phase_id)
+        if not self._file.closed:
+            self._file.close()
+
+
+def parse_timestamps(values):
+    """ISO timestamps -> int64 microseconds, vectorised by numpy"""
+    return np.array(values, dtype='datetime64[us]').astype(np.int64)
+
+
+class LabelIndex:
+    """Sorted segment edges with the label, scenario and phase of each segment"""
+
+    def __init__(self, phases):
+        # phases: (start_us, end_us, label, scenario, phase_id)
+        events = []
+        for index, (start, end, *_rest) in enumerate(phases):
+            events.append((start, 1, index))
+            events.append((end, -1, index))
+        events.sort()
+
+        edges = []
+        segments = [(IDLE, None, None)]  # before the first edge
+        active = set()
+        i = 0
+        while i < len(events):
+            at = events[i][0]
+            while i < len(events) and events[i][0] == at:
+                _, kind, index = events[i]
+                if kind > 0:
+                    active.add(index)
+                else:
+                    active.discard(index)
+                i += 1
+            edges.append(at)
+            if active:
+                # Attack beats normal; otherwise the most recently started phase wins
+                winner = max(active, key=lambda index: (phases[index][2], phases[index][0], index))
+                _, _, label, scenario, phase_id = phases[winner]
+                segments.append((label, scenario, phase_id))
+            else:
+                segments.append((IDLE, None, None))
+
+        self.edges = np.array(edges, dtype=np.int64)
+        self.segment_labels = np.array([segment[0] for segment in segments], dtype=np.int8)
+        self.segments = segments
+        # Text appended to each labelled JSON record, one per segment
+        self.suffixes = [
+            f', "label": "{LABELS[label]}", "scenario": {json.dumps(scenario)}, "phase_id": {json.dumps(phase_id)}}}'
+            for label, scenario, phase_id in segments
+        ]
+
+    @classmethod
+    def from_file(cls, path):
+        starts = {}
+        ends = {}
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    event_type = record['event_type']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if event_type == 'label_phase_start':
+                    starts[record['phase_id']] = record
+                elif event_type == 'label_phase_end':
+                    ends[record['phase_id']] = record['timestamp']
+
+        ids = list(starts)
+        start_us = parse_timestamps([starts[phase_id]['timestamp'] for phase_id in ids])
+        # A phase never ended (controller killed) runs to the end of time
+        end_us = parse_timestamps([ends.get(phase_id, '9999-12-31T00:00:00') for phase_id in ids])
+        phases = [
+            (int(start), int(end), GROUP_LABELS[starts[phase_id]['group']],
+             starts[phase_id]['scenario'], phase_id)
+            for phase_id, start, end in zip(ids, start_us, end_us)
+        ]
+        return cls(phases)
+
+    def lookup(self, timestamps_us):
+        """Segment index of each timestamp (int64 microseconds)"""
+        return np.searchsorted(self.edges, timestamps_us, side='right')
+
+    def label(self, timestamps_us):
+        return self.segment_labels[self.lookup(timestamps_us)]
+
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+
+def iter_event_chunks(paths, chunk_lines=100000):
+    """Yield (json_bodies, timestamps) for chunks of JSON log lines.
+
+    Accepts server logs (`[name] asctime - LEVEL - {json}`) and plain JSONL;
+    lines without a JSON record or a timestamp are skipped.
+    """
+    bodies = []
+    stamps = []
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                brace = line.find('{')
+                if brace < 0:
+                    continue
+                key = line.find(TIMESTAMP_KEY, brace)
+                if key < 0:
+                    continue
+                value = key + len(TIMESTAMP_KEY)
+                close = line.find('"', value)
+                body = line[brace:].rstrip()
+                if close < 0 or not body.endswith('}'):
+                    continue
+                bodies.append(body)
+                stamps.append(line[value:close])
+                if len(bodies) >= chunk_lines:
+                    yield bodies, stamps
+                    bodies = []
+                    stamps = []
+    if bodies:
+        yield bodies, stamps
+
+
+def label_events(index, paths, output, chunk_lines=100000):
+    """Append label, scenario and phase_id to every event; returns label counts"""
+    counts = Counter()
+    suffixes = index.suffixes
+    with open(output, 'w', buffering=1024 * 1024) as out:
+        for bodies, stamps in iter_event_chunks(paths, chunk_lines):
+            try:
+                segments = index.lookup(parse_timestamps(stamps))
+            except ValueError:
+                # A malformed timestamp somewhere in the chunk; fall back to row by row
+                segments = np.array([
+                    index.lookup(parse_timestamps([stamp]))[0] if _valid(stamp) else 0
+                    for stamp in stamps
+                ])
+            out.writelines([body[:-1] + suffixes[segment] + "\n" for body, segment in zip(bodies, segments.tolist())])
+            labels, label_counts = np.unique(index.segment_labels[segments], return_counts=True)
+            for label, count in zip(labels.tolist(), label_counts.tolist()):
+                counts[LABELS[label]] += count
+    return counts
+
+
+def _valid(stamp):
+    try:
+        np.datetime64(stamp, 'us')
+        return True
+    except ValueError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Label server log events from the bot phase timeline')
+    parser.add_argument('timeline', help='Timeline written by BotController (label_timeline.path)')
+    parser.add_argument('logs', nargs='+', help='Server log or JSONL files (plain or .gz)')
+    parser.add_argument('--output', default='logs/labelled_events.jsonl')
+    parser.add_argument('--chunk-lines', type=int, default=100000)
+    args = parser.parse_args()
+
+    index = LabelIndex.from_file(args.timeline)
+    started = time.perf_counter()
+    counts = label_events(index, args.logs, args.output, args.chunk_lines)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+
+    print(f"Labelled {total:,} events against {len(index.edges)} phase edges "
+          f"in {elapsed:.2f}s ({total / elapsed if elapsed > 0 else 0:,.0f} events/s)")
+    for label in LABELS:
+        print(f"  {label:<7} {counts.get(label, 0):>12,}")
+    print(f"Labelled events saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
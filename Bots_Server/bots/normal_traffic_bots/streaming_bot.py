@@ -1,14 +1,18 @@
 import asyncio
-import httpx
+import random
 import logging
 from datetime import datetime
 import json
 
+from bots.client_pool import borrow_client
+
 class StreamingBot:
-    def __init__(self, bot_id, target_servers):
+    def __init__(self, bot_id, target_servers, client_pool=None, stats=None):
         self.bot_id = bot_id
         self.target_servers = target_servers
         self.running = False
+        self.client_pool = client_pool  # Controller-owned; None opens a client per session
+        self.stats = stats  # Controller-wide BotStats, optional
         self.setup_logging()
         
     def setup_logging(self):
@@ -20,7 +24,7 @@ class StreamingBot:
     
     async def simulate_streaming_session(self, server_url):
         """Simulate long-running streaming connection"""
-        async with httpx.AsyncClient(http2=True) as client:
+        async with borrow_client(self.client_pool, server_url, self.bot_id) as client:
             try:
                 start_time = datetime.now()
                 
@@ -29,6 +33,9 @@ class StreamingBot:
                     chunk_count = 0
                     async for chunk in response.aiter_bytes():
                         chunk_count += 1
+                        if chunk_count == 1 and self.stats:
+                            # Time to first chunk stands in for the response time
+                            self.stats.record((datetime.now() - start_time).total_seconds() * 1000)
                         
                         if chunk_count % 10 == 0:  # Log every 10th chunk
                             log_data = {
@@ -46,6 +53,8 @@ class StreamingBot:
                             break
                             
             except Exception as e:
+                if self.stats:
+                    self.stats.record_error()
                 self.logger.error(f"Streaming session failed: {e}")
     
     async def run(self, duration=3600):
@@ -1,17 +1,23 @@
 import asyncio
 import random
-import httpx
+import time
 import logging
 from datetime import datetime
 import json
 
+from bots.client_pool import borrow_client
+from servers.request_tracing import TRACE_HEADER, TraceIdGenerator
+
 class WebBrowserBot:
-    def __init__(self, bot_id, target_servers, request_rate=1.0):
+    def __init__(self, bot_id, target_servers, request_rate=1.0, client_pool=None, stats=None):
         self.bot_id = bot_id
         self.target_servers = target_servers
         self.request_rate = request_rate  # requests per second
         self.running = False
         self.total_requests = 0
+        self.client_pool = client_pool  # Controller-owned; None opens a client per session
+        self.stats = stats  # Controller-wide BotStats, optional
+        self.trace_ids = TraceIdGenerator()
         self.setup_logging()
         
     def setup_logging(self):
@@ -39,12 +45,14 @@ class WebBrowserBot:
             "/api/notifications"
         ]
         
-        async with httpx.AsyncClient(http2=True) as client:
+        async with borrow_client(self.client_pool, server_url, self.bot_id) as client:
             # Simulate user session
             session_duration = random.uniform(30, 180)  # 30s to 3min
             session_start = asyncio.get_event_loop().time()
             
-            headers = {"User-Agent": random.choice(user_agents)}
+            user_agent = random.choice(user_agents)
+            # When the next request is due; the think time sleeps until then
+            scheduled_at = time.time()
             
             while (asyncio.get_event_loop().time() - session_start) < session_duration and self.running:
                 try:
@@ -52,11 +60,18 @@ class WebBrowserBot:
                     endpoint = random.choice(session_requests)
                     url = f"{server_url}{endpoint}"
                     
+                    trace_id = self.trace_ids.next()
+                    headers = {"User-Agent": user_agent, TRACE_HEADER: trace_id}
+                    
                     start_time = datetime.now()
+                    sent_at = time.time()
                     response = await client.get(url, headers=headers, timeout=10.0)
+                    completed_at = time.time()
                     end_time = datetime.now()
                     
                     self.total_requests += 1
+                    if self.stats:
+                        self.stats.record((end_time - start_time).total_seconds() * 1000)
                     
                     # Log request details
                     log_data = {
@@ -67,16 +82,25 @@ class WebBrowserBot:
                         "status_code": response.status_code,
                         "response_time_ms": (end_time - start_time).total_seconds() * 1000,
                         "request_number": self.total_requests,
-                        "session_time": asyncio.get_event_loop().time() - session_start
+                        "session_time": asyncio.get_event_loop().time() - session_start,
+                        "trace_id": trace_id,
+                        "scheduled_at": scheduled_at,
+                        "sent_at": sent_at,
+                        "completed_at": completed_at
                     }
                     
                     self.logger.info(json.dumps(log_data))
                     
                     # Realistic wait between requests
-                    await asyncio.sleep(random.uniform(1, 5))
+                    think_time = random.uniform(1, 5)
+                    scheduled_at = time.time() + think_time
+                    await asyncio.sleep(think_time)
                     
                 except Exception as e:
+                    if self.stats:
+                        self.stats.record_error()
                     self.logger.error(f"Request failed: {e}")
+                    scheduled_at = time.time() + 1
                     await asyncio.sleep(1)
     
     async def run(self, duration=3600):
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime
+
+# Bot groups a transition applies to
+NORMAL, ATTACK, SCENARIO = "normal", "attack", "scenario"
+
+
+@dataclass(frozen=True)
+class Transition:
+    """One planned change of the simulation, `at` seconds after the start"""
+    at: float
+    action: str          # start | stop | end
+    group: str           # normal | attack | scenario
+    scenario: str
+    phase_duration: float = 0.0
+    ramp: float = 0.0    # starts of the group's bots are spread over this many seconds
+
+
+def build_timeline(scenarios, duration, seed, pause=(10.0, 60.0)):
+    """Seeded list of transitions covering `duration` seconds.
+
+    Scenarios follow `BotController.run_scenario`: normal traffic starts
+    with the scenario, the attack starts after the baseline, and the next
+    scenario begins a random pause after both phases have ended. The same
+    seed and config always give the same timeline.
+    """
+    rng = random.Random(seed)
+    names = list(scenarios)
+    transitions = []
+    t = 0.0
+
+    while t < duration:
+        name = rng.choice(names)
+        scenario = scenarios[name]
+        normal = scenario.get('normal_traffic_duration', 0)
+        baseline = scenario.get('baseline_duration', 0)
+        attack = scenario.get('attack_duration', 0)
+
+        if normal > 0:
+            transitions.append(Transition(t, "start", NORMAL, name, normal, scenario.get('normal_ramp', 0.0)))
+            transitions.append(Transition(t + normal, "stop", NORMAL, name))
+        end = t + max(normal, baseline)
+        if attack > 0:
+            attack_start = t + baseline
+            transitions.append(Transition(attack_start, "start", ATTACK, name, attack, scenario.get('attack_ramp', 0.0)))
+            transitions.append(Transition(attack_start + attack, "stop", ATTACK, name))
+            end = max(end, attack_start + attack)
+        transitions.append(Transition(end, "end", SCENARIO, name))
+
+        t = end + rng.uniform(*pause)
+
+    # Stable sort keeps stop-before-start order for transitions at the same time
+    return sorted(transitions, key=lambda transition: transition.at)
+
+
+class ScenarioEngine:
+    """Replay a precomputed timeline against a BotController.
+
+    Every transition (and every ramped bot start) is scheduled up front
+    with `loop.call_at` on the loop's monotonic clock, relative to one
+    start instant, so phase boundaries do not depend on when bot tasks
+    return. Each firing records how late it ran as drift; drifts are
+    logged per transition and summarised at the end.
+    """
+
+    def __init__(self, controller, seed=0, pause=(10.0, 60.0), start_delay=1.0, stop_grace=30.0):
+        self.controller = controller
+        self.logger = controller.logger
+        self.seed = seed
+        self.pause = pause
+        self.start_delay = start_delay
+        self.stop_grace = stop_grace
+        self.timeline = []
+        self.drifts_ms = []
+        # Running bot tasks per group, and the task each group's next
+        # transition must wait for (a drain or an earlier deferred transition)
+        self.bot_tasks = {NORMAL: set(), ATTACK: set()}
+        self.gates = {}
+        self.handles = []
+        self.phases = {}
+        self.finished = None
+
+    def _fire(self, scheduled_at, callback, *args):
+        loop = asyncio.get_running_loop()
+        drift_ms = (loop.time() - scheduled_at) * 1000
+        self.drifts_ms.append(drift_ms)
+        callback(drift_ms, *args)
+
+    def _schedule(self, when, callback, *args):
+        loop = asyncio.get_running_loop()
+        self.handles.append(loop.call_at(when, self._fire, when, callback, *args))
+
+    def _log_transition(self, transition, drift_ms, **extra):
+        event = {
+            "event_type": "scenario_transition",
+            "timestamp": datetime.now().isoformat(),
+            "seed": self.seed,
+            "scenario": transition.scenario,
+            "group": transition.group,
+            "action": transition.action,
+            "scheduled_offset_seconds": transition.at,
+            "drift_ms": round(drift_ms, 3)
+        }
+        event.update(extra)
+        self.logger.info(json.dumps(event))
+
+    def _start_bot(self, drift_ms, transition, bot, stop_at):
+        loop = asyncio.get_running_loop()
+        # Bots stop themselves near the phase end; the stop transition is exact
+        remaining = max(0.0, stop_at - loop.time())
+        tasks = self.bot_tasks[transition.group]
+        task = asyncio.create_task(bot.run(duration=remaining))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        if transition.ramp:
+            self._log_transition(transition, drift_ms, bot=type(bot).__name__)
+
+    def _transition(self, drift_ms, transition, start_time):
+        self._log_transition(transition, drift_ms)
+        if transition.action == "end":
+            if transition is self.timeline[-1]:
+                self.finished.set()
+            return
+
+        group = transition.group
+        gate = self.gates.get(group)
+        if gate and not gate.done():
+            # The same bot objects run again, so earlier transitions of this
+            # group (and the drain of its last phase) must be over first
+            self.gates[group] = asyncio.create_task(self._apply_after(gate, transition, start_time))
+            return
+        drain = self._apply(transition, start_time)
+        if drain:
+            self.gates[group] = drain
+
+    async def _apply_after(self, gate, transition, start_time):
+        loop = asyncio.get_running_loop()
+        waited = loop.time()
+        await gate
+        self._log_transition(transition, 0.0, gate_wait_ms=round((loop.time() - waited) * 1000, 3))
+        drain = self._apply(transition, start_time)
+        if drain:
+            await drain
+
+    def _apply(self, transition, start_time):
+        """Start or stop a group; a stop returns the task draining its bots"""
+        bots = self.controller.bot_groups()[transition.group]
+        if transition.action == "start":
+            self._start_group(transition, bots, start_time)
+            return None
+
+        for bot in bots:
+            if hasattr(bot, 'stop'):
+                bot.stop()
+            else:
+                bot.running = False
+        timeline = self.controller.label_timeline
+        if timeline and transition.group in self.phases:
+            timeline.end(self.phases.pop(transition.group))
+        tasks = self.bot_tasks[transition.group]
+        return asyncio.create_task(self._drain(list(tasks))) if tasks else None
+
+    async def _drain(self, tasks):
+        """Wait up to stop_grace for a stopped group's bots, then cancel the rest"""
+        done, pending = await asyncio.wait(tasks, timeout=self.stop_grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def _start_group(self, transition, bots, start_time):
+        timeline = self.controller.label_timeline
+        if timeline and bots:
+            self.phases[transition.group] = timeline.start(
+                transition.scenario, transition.group, transition.phase_duration, len(bots)
+            )
+
+        stop_at = start_time + transition.at + transition.phase_duration
+        if not transition.ramp:
+            for bot in bots:
+                self._start_bot(0.0, transition, bot, stop_at)
+            return
+        # Ramped starts get their own call_at and drift measurement
+        step = transition.ramp / max(1, len(bots))
+        for i, bot in enumerate(bots):
+            self._schedule(start_time + transition.at + i * step, self._start_bot, transition, bot, stop_at)
+
+    def drift_summary(self):
+        drifts = sorted(self.drifts_ms)
+        if not drifts:
+            return {"transitions": 0}
+        return {
+            "transitions": len(drifts),
+            "drift_p50_ms": round(drifts[len(drifts) // 2], 3),
+            "drift_p99_ms": round(drifts[min(len(drifts) - 1, int(len(drifts) * 0.99))], 3),
+            "drift_max_ms": round(drifts[-1], 3)
+        }
+
+    async def run(self, duration):
+        loop = asyncio.get_running_loop()
+        self.timeline = build_timeline(self.controller.config['scenarios'], duration, self.seed, self.pause)
+        self.finished = asyncio.Event()
+        start_time = loop.time() + self.start_delay
+        self.logger.info(json.dumps({
+            "event_type": "scenario_timeline",
+            "timestamp": datetime.now().isoformat(),
+            "seed": self.seed,
+            "transitions": [vars(transition) for transition in self.timeline]
+        }))
+
+        for transition in self.timeline:
+            self._schedule(start_time + transition.at, self._transition, transition, start_time)
+
+        try:
+            await self.finished.wait()
+        finally:
+            for handle in self.handles:
+                handle.cancel()
+            self.controller.stop_all_bots()
+            tasks = [task for group in self.bot_tasks.values() for task in group]
+            for gate in self.gates.values():
+                gate.cancel()
+            if tasks:
+                await self._drain(tasks)
+            summary = {"event_type": "scenario_timeline_summary", "seed": self.seed}
+            summary.update(self.drift_summary())
+            self.logger.info(json.dumps(summary))
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import random
+import time
+from datetime import datetime
+
+from bots.bot_controller import BotController
+from bots.bot_stats import BotStats
+
+
+def pipe_messages(conn):
+    """Queue of the messages arriving on `conn`, read on the event loop thread.
+
+    The loop thread also does every send, so a Connection is never used
+    from two threads at once. None is queued once the other end closes.
+    """
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    fileno = conn.fileno()
+
+    def on_readable():
+        try:
+            while conn.poll():
+                messages.put_nowait(conn.recv())
+        except (EOFError, OSError):
+            loop.remove_reader(fileno)
+            messages.put_nowait(None)
+
+    loop.add_reader(fileno, on_readable)
+    return messages
+
+
+def shard_main(config_file, shard_index, shard_count, conn):
+    """Entry point of one shard process"""
+    try:
+        asyncio.run(_serve_shard(config_file, shard_index, shard_count, conn))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve_shard(config_file, shard_index, shard_count, conn):
+    controller = BotController(config_file, shard_index=shard_index, shard_count=shard_count)
+    controller.create_bots()
+    loop = asyncio.get_running_loop()
+    commands = pipe_messages(conn)
+    scenario_task = None
+
+    def reply(message):
+        try:
+            conn.send(message)
+        except OSError:
+            # The parent is gone; nothing is left to report to
+            pass
+
+    async def run_scenario(name, duration, start_at):
+        # Every shard was given the same wall-clock start time
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        try:
+            await controller.run_scenario(name, duration)
+        finally:
+            reply(("scenario_done", name))
+
+    try:
+        while True:
+            message = await commands.get()
+            if message is None:
+                break
+            command, *args = message
+            if command == "scenario":
+                scenario_task = asyncio.create_task(run_scenario(*args))
+            elif command == "stats":
+                reply(("stats", controller.stats.to_dict()))
+            elif command == "stop":
+                break
+    finally:
+        loop.remove_reader(conn.fileno())
+        controller.stop_all_bots()
+        if scenario_task:
+            scenario_task.cancel()
+            await asyncio.gather(scenario_task, return_exceptions=True)
+        await controller.client_pool.aclose()
+        controller.close_label_timeline()
+        reply(("stopped", controller.stats.to_dict()))
+        conn.close()
+
+
+class ShardedBotController:
+    """Run the configured normal bots across N processes as one controller.
+
+    Each shard is a BotController in its own process (own event loop and
+    client pool) that creates every Nth normal bot; shard 0 also runs the
+    attack bots. The parent starts each scenario on all shards at the same
+    wall-clock time, waits for all of them to finish it, and periodically
+    merges the shards' request/error counts and latency histograms into
+    one `bot_shard_stats` event.
+    """
+
+    def __init__(self, config_file="config/bot_configs.yaml", shards=2, report_interval=10.0):
+        self.config = BotController.load_config(config_file)
+        if self.config.get('scenario_engine', {}).get('enabled', False):
+            # Shards only take one scenario at a time from the parent, which
+            # picks them unseeded; a seeded timeline cannot be replayed here
+            raise ValueError("scenario_engine.enabled is not supported with sharding.shards > 1; "
+                             "disable one of them in bot_configs.yaml")
+        self.config_file = config_file
+        self.shard_count = shards
+        self.report_interval = report_interval
+        self.running = False
+        self.processes = []
+        self.connections = []
+        self.dead_shards = set()
+        self.shard_stats = [BotStats() for _ in range(shards)]
+        self.scenario_done = []
+        self.setup_logging()
+
+    def setup_logging(self):
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger('sharded_bot_controller')
+        handler = logging.FileHandler('logs/bot_controller.log')
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+        self.logger.addHandler(handler)
+
+    def start_shards(self):
+        context = multiprocessing.get_context('spawn')
+        for shard_index in range(self.shard_count):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=shard_main,
+                args=(self.config_file, shard_index, self.shard_count, child_conn),
+                name=f"bot-shard-{shard_index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self.processes.append(process)
+            self.connections.append(parent_conn)
+
+    async def _read_shard(self, shard_index):
+        """Handle messages from one shard until it stops or exits"""
+        loop = asyncio.get_running_loop()
+        conn = self.connections[shard_index]
+        messages = pipe_messages(conn)
+        try:
+            while True:
+                received = await messages.get()
+                if received is None:
+                    self.mark_dead(shard_index)
+                    return
+                message, payload = received
+                if message in ("stats", "stopped"):
+                    self.shard_stats[shard_index] = BotStats.from_dict(payload)
+                    if message == "stopped":
+                        return
+                elif message == "scenario_done":
+                    self.scenario_done[shard_index].set()
+        finally:
+            loop.remove_reader(conn.fileno())
+
+    def mark_dead(self, shard_index):
+        if shard_index in self.dead_shards:
+            return
+        self.dead_shards.add(shard_index)
+        self.logger.warning(f"Bot shard {shard_index} exited")
+        # Do not let a dead shard hold up the running scenario
+        if self.scenario_done:
+            self.scenario_done[shard_index].set()
+
+    def send_to_shards(self, message):
+        """Send to every live shard; a broken pipe marks that shard dead"""
+        for shard_index, conn in enumerate(self.connections):
+            if shard_index in self.dead_shards:
+                continue
+            try:
+                conn.send(message)
+            except OSError:
+                self.mark_dead(shard_index)
+
+    def merged_stats(self):
+        merged = BotStats()
+        for stats in self.shard_stats:
+            merged.merge(stats)
+        return merged
+
+    def stats_event(self):
+        event = {
+            "event_type": "bot_shard_stats",
+            "timestamp": datetime.now().isoformat(),
+            "shards": self.shard_count,
+            "shards_alive": sum(1 for p in self.processes if p.is_alive()),
+            "requests_per_shard": [stats.requests for stats in self.shard_stats],
+            "errors_per_shard": [stats.errors for stats in self.shard_stats]
+        }
+        event.update(self.merged_stats().summary())
+        return event
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.send_to_shards(("stats",))
+            # Replies arrive through the readers; log what has come back
+            await asyncio.sleep(min(1.0, self.report_interval / 2))
+            self.logger.info(json.dumps(self.stats_event()))
+
+    async def run_scenario(self, scenario_name, duration=3600):
+        """Start a scenario on every shard at once and wait for all of them"""
+        self.logger.info(f"Starting scenario on {self.shard_count} shards: {scenario_name}")
+        self.scenario_done = [asyncio.Event() for _ in range(self.shard_count)]
+        for shard_index in self.dead_shards:
+            self.scenario_done[shard_index].set()
+        start_at = time.time() + 1.0
+        self.send_to_shards(("scenario", scenario_name, duration, start_at))
+        await asyncio.gather(*(event.wait() for event in self.scenario_done))
+        self.logger.info(f"Scenario {scenario_name} completed on all shards")
+
+    async def run_continuous_simulation(self, duration=3600):
+        """Same schedule as BotController, driven across all shards"""
+        self.running = True
+        self.start_shards()
+        readers = [asyncio.create_task(self._read_shard(i)) for i in range(self.shard_count)]
+        reporter = asyncio.create_task(self._report())
+        end_time = asyncio.get_event_loop().time() + duration
+
+        try:
+            while asyncio.get_event_loop().time() < end_time and self.running:
+                scenario_name = random.choice(list(self.config['scenarios'].keys()))
+                scenario_duration = random.uniform(300, 900)  # 5-15 minutes
+
+                await self.run_scenario(scenario_name, scenario_duration)
+
+                # Brief pause between scenarios
+                await asyncio.sleep(random.uniform(10, 60))
+        finally:
+            reporter.cancel()
+            await self.shutdown(readers)
+
+    async def shutdown(self, readers):
+        self.send_to_shards(("stop",))
+        await asyncio.wait(readers, timeout=30)
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self.logger.info(json.dumps(self.stats_event()))
+
+    def stop_all_bots(self):
+        self.running = False
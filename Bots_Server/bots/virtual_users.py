@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import random
+import sys
+import time
+from array import array
+from datetime import datetime
+
+from servers.log_pipeline import BatchedLogWriter
+from servers.request_tracing import TRACE_HEADER, TraceIdGenerator
+
+# Heap entries pack the due time (ms since start) and the user id into one
+# int, so the heap holds a single small object per user
+USER_BITS = 24
+USER_MASK = (1 << USER_BITS) - 1
+MAX_USERS = 1 << USER_BITS
+
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+)
+
+SESSION_PATHS = (
+    "/",
+    "/api/data",
+    "/static/styles.css",
+    "/static/script.js",
+    "/api/user/profile",
+    "/api/notifications"
+)
+
+
+class VirtualUserScheduler:
+    """Event-driven population of simulated browser users.
+
+    Users are not objects or tasks: their state lives in typed arrays
+    indexed by user id and their next action time in a heap. A dispatcher
+    pops due users in batches onto a bounded queue served by a fixed set of
+    worker coroutines, which issue the request and push the user back with
+    its next think time. Browsing follows WebBrowserBot: sessions of
+    several page requests separated by think times, with a pause between
+    sessions.
+    """
+
+    def __init__(self, target_servers, client_pool, user_count=10000, workers=256,
+                 batch_size=512, think_time=(1.0, 5.0), session_requests=(10, 60),
+                 session_pause=(10.0, 30.0), ramp_up=10.0, request_timeout=10.0,
+                 log_requests=True, report_interval=10.0, seed=None,
+                 log_path='logs/bot_logs/virtual_users.log', stats=None):
+        if user_count > MAX_USERS:
+            raise ValueError(f"At most {MAX_USERS} virtual users per scheduler")
+        if not 1 <= session_requests[0] <= session_requests[1] <= 0xFFFF:
+            raise ValueError(f"session_requests must be 1 <= min <= max <= 65535, got {session_requests}")
+        self.target_servers = list(target_servers)
+        self.client_pool = client_pool
+        self.user_count = user_count
+        self.workers = workers
+        self.batch_size = batch_size
+        self.think_time = think_time
+        self.session_requests = session_requests
+        self.session_pause = session_pause
+        self.ramp_up = ramp_up
+        self.request_timeout = request_timeout
+        self.log_requests = log_requests
+        self.report_interval = report_interval
+        self.random = random.Random(seed)
+        self.stats = stats
+        self.trace_ids = TraceIdGenerator()
+        self.running = False
+
+        # Per-user state, a few bytes each
+        self.server_index = array('B', bytes(user_count))
+        self.agent_index = array('B', bytes(user_count))
+        self.remaining = array('H', [0]) * user_count
+        self.request_number = array('I', [0]) * user_count
+        self.heap = []
+        self.start_time = None
+        self.start_wall_time = None
+
+        self.log_writer = BatchedLogWriter(log_path, source='virtual_users')
+
+        self.requests_sent = 0
+        self.errors = 0
+        self.sessions_started = 0
+        self.max_dispatch_lag_ms = 0
+
+    def memory_bytes(self):
+        """Approximate memory held for per-user state"""
+        arrays = (self.server_index, self.agent_index, self.remaining, self.request_number)
+        total = sum(a.itemsize * len(a) for a in arrays)
+        total += sys.getsizeof(self.heap) + sum(sys.getsizeof(key) for key in self.heap)
+        return total
+
+    def _now_ms(self):
+        return int((time.monotonic() - self.start_time) * 1000)
+
+    def _schedule(self, user_id, delay):
+        heapq.heappush(self.heap, (self._now_ms() + int(delay * 1000)) << USER_BITS | user_id)
+
+    def _start_session(self, user_id):
+        self.server_index[user_id] = self.random.randrange(len(self.target_servers))
+        self.agent_index[user_id] = self.random.randrange(len(USER_AGENTS))
+        self.remaining[user_id] = self.random.randint(*self.session_requests)
+        self.sessions_started += 1
+
+    def populate(self):
+        """Give every user a first session, spread over the ramp-up window"""
+        self.start_time = time.monotonic()
+        self.start_wall_time = time.time()
+        self.heap = []
+        ramp_ms = int(self.ramp_up * 1000)
+        for user_id in range(self.user_count):
+            self._start_session(user_id)
+            self.heap.append(self.random.randint(0, ramp_ms) << USER_BITS | user_id)
+        heapq.heapify(self.heap)
+
+    async def _dispatch(self, queue):
+        heap = self.heap
+        while self.running:
+            now_ms = self._now_ms()
+            dispatched = 0
+            while heap and heap[0] >> USER_BITS <= now_ms and dispatched < self.batch_size:
+                key = heapq.heappop(heap)
+                lag = now_ms - (key >> USER_BITS)
+                if lag > self.max_dispatch_lag_ms:
+                    self.max_dispatch_lag_ms = lag
+                # Blocks while every worker is busy; the backlog shows up as lag.
+                # Workers get the whole key so requests can log their due time
+                await queue.put(key)
+                dispatched += 1
+
+            if dispatched == self.batch_size:
+                await asyncio.sleep(0)
+            elif heap:
+                await asyncio.sleep(min(0.05, max(0, (heap[0] >> USER_BITS) - self._now_ms()) / 1000))
+            else:
+                await asyncio.sleep(0.05)
+
+    async def _worker(self, queue):
+        while True:
+            key = await queue.get()
+            if key is None:
+                return
+            # Users still queued at shutdown are drained without a request
+            if self.running:
+                await self._perform(key & USER_MASK, key >> USER_BITS)
+
+    async def _perform(self, user_id, due_ms):
+        server_url = self.target_servers[self.server_index[user_id]]
+        url = f"{server_url}{self.random.choice(SESSION_PATHS)}"
+        # Integer ids never collide with the string bot ids other bots use
+        client = self.client_pool.get(server_url, user_id)
+        trace_id = self.trace_ids.next()
+        headers = {"User-Agent": USER_AGENTS[self.agent_index[user_id]], TRACE_HEADER: trace_id}
+
+        start_time = datetime.now()
+        sent_at = time.time()
+        try:
+            response = await client.get(url, headers=headers, timeout=self.request_timeout)
+            status_code = response.status_code
+        except Exception as e:
+            self.errors += 1
+            if self.stats:
+                self.stats.record_error()
+            status_code = None
+            if self.log_requests:
+                self.log_writer.write(f"vu_{user_id} request failed: {e}", level="ERROR")
+        completed_at = time.time()
+        end_time = datetime.now()
+
+        self.requests_sent += 1
+        self.request_number[user_id] += 1
+        if status_code is not None and self.stats:
+            self.stats.record((end_time - start_time).total_seconds() * 1000)
+        if status_code is not None and self.log_requests:
+            self.log_writer.write({
+                "bot_id": f"vu_{user_id}",
+                "bot_type": "web_browser",
+                "timestamp": start_time.isoformat(),
+                "url": url,
+                "status_code": status_code,
+                "response_time_ms": (end_time - start_time).total_seconds() * 1000,
+                "request_number": self.request_number[user_id],
+                "trace_id": trace_id,
+                "scheduled_at": self.start_wall_time + due_ms / 1000,
+                "sent_at": sent_at,
+                "completed_at": completed_at
+            })
+
+        self.remaining[user_id] -= 1
+        if self.remaining[user_id] > 0:
+            self._schedule(user_id, self.random.uniform(*self.think_time))
+        else:
+            self._start_session(user_id)
+            self._schedule(user_id, self.random.uniform(*self.session_pause))
+
+    def stats_event(self, interval_requests, interval_seconds, queue):
+        return {
+            "event_type": "virtual_user_stats",
+            "timestamp": datetime.now().isoformat(),
+            "users": self.user_count,
+            "workers": self.workers,
+            "requests_sent": self.requests_sent,
+            "errors": self.errors,
+            "sessions_started": self.sessions_started,
+            "requests_per_second": interval_requests / interval_seconds if interval_seconds else 0.0,
+            "max_dispatch_lag_ms": self.max_dispatch_lag_ms,
+            "queued_users": queue.qsize(),
+            "scheduled_users": len(self.heap),
+            "state_bytes_per_user": self.memory_bytes() / self.user_count if self.user_count else 0
+        }
+
+    async def _report(self, queue):
+        last_requests = self.requests_sent
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            self.log_writer.write(self.stats_event(self.requests_sent - last_requests, now - last_time, queue))
+            last_requests, last_time = self.requests_sent, now
+            self.max_dispatch_lag_ms = 0
+
+    async def run(self, duration=3600):
+        self.running = True
+        self.log_writer.start()
+        self.populate()
+        self.log_writer.write(f"Starting {self.user_count} virtual users on {self.workers} workers")
+
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        reporter = asyncio.create_task(self._report(queue))
+        dispatcher = asyncio.create_task(self._dispatch(queue))
+        try:
+            await asyncio.wait_for(asyncio.shield(dispatcher), timeout=duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.running = False
+            dispatcher.cancel()
+            reporter.cancel()
+            await asyncio.gather(dispatcher, reporter, return_exceptions=True)
+            # httpx can swallow a cancellation that lands mid-request, so
+            # workers are stopped with sentinels once their request finishes
+            for _ in workers:
+                await queue.put(None)
+            done, pending = await asyncio.wait(workers, timeout=self.request_timeout + 5)
+            for task in pending:
+                task.cancel()
+            self.log_writer.write(f"Virtual users completed. Total requests: {self.requests_sent}")
+            self.log_writer.close()
+
+    def stop(self):
+        self.running = False
@@ -1,14 +1,51 @@
 import asyncio
 import logging
 import sys
+import yaml
 from servers.http2_server import HTTP2Server
+from servers.system_sampler import SystemSampler
+from servers.worker_pool import run_worker_servers
+
+def load_server_config(config_file="config/server_configs.yaml"):
+    with open(config_file, 'r') as f:
+        return yaml.safe_load(f)
 
 async def run_servers():
     """Start multiple HTTP/2 servers"""
+    config = load_server_config()
+    log_options = dict(config.get('logging', {}))
+    log_mode = log_options.pop('mode', 'sync')
+    sampler_config = config.get('system_sampler', {})
+    server_options = {
+        "log_mode": log_mode,
+        "log_options": log_options,
+        "sampler_interval": sampler_config.get('interval', 1.0),
+        "frame_stats_options": config.get('h2_frame_stats'),
+        "mitigation_options": config.get('reset_mitigation'),
+        "feature_stream_options": config.get('feature_stream'),
+        "metrics_options": config.get('metrics'),
+        "adaptive_logging_options": config.get('adaptive_logging')
+    }
+    
+    worker_config = config.get('workers', {})
+    if worker_config.get('count', 1) > 1:
+        # N processes per logical server sharing its port via SO_REUSEPORT
+        await run_worker_servers(
+            config['servers'], worker_config['count'], server_options,
+            aggregate_interval=worker_config.get('aggregate_interval', 5.0)
+        )
+        return
+    
+    # One sampler per process; every server reads the same snapshot
+    system_sampler = SystemSampler(server_options.pop('sampler_interval'))
+    
     servers = [
-        HTTP2Server("localhost", 8000, "server_1"),
-        HTTP2Server("localhost", 8001, "server_2"),
-        HTTP2Server("localhost", 8002, "server_3")
+        HTTP2Server(
+            server['host'], server['port'], server['id'],
+            system_sampler=system_sampler,
+            **server_options
+        )
+        for server in config['servers']
     ]
     
     tasks = [asyncio.create_task(server.run()) for server in servers]
@@ -18,9 +55,18 @@ async def run_bots():
     """Run bot simulation"""
     # Import only when needed
     from bots.bot_controller import BotController
+    from bots.sharded_controller import ShardedBotController
     
-    controller = BotController()
-    controller.create_bots()
+    sharding = BotController.load_config().get('sharding', {})
+    if sharding.get('shards', 1) > 1:
+        # Normal bots spread over several processes, stats merged here
+        controller = ShardedBotController(
+            shards=sharding['shards'],
+            report_interval=sharding.get('report_interval', 10.0)
+        )
+    else:
+        controller = BotController()
+        controller.create_bots()
     
     # Run continuous simulation for 2 hours
     await controller.run_continuous_simulation(duration=7200)
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from datetime import datetime
+
+from servers.metrics import Histogram
+
+DETAILED, AGGREGATE = "detailed", "aggregate"
+
+# Upper bounds in milliseconds; the last bucket is everything above
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+OTHER_PATH = "other"
+
+
+class PathAggregate:
+    """Per-second request counts and latency histogram of one path"""
+    __slots__ = ('requests', 'statuses', 'latency', 'latency_max')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.latency_max = 0.0
+
+    def add(self, status, latency_ms):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latency.observe(latency_ms)
+        if latency_ms > self.latency_max:
+            self.latency_max = latency_ms
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "status": {str(status): count for status, count in self.statuses.items()},
+            "latency_histogram": self.latency.buckets,
+            "latency_sum_ms": self.latency.sum,
+            "latency_max_ms": self.latency_max
+        }
+
+
+class AdaptiveRequestLog:
+    """Switches request logging between per-request and per-second events.
+
+    In `detailed` mode every request is logged as its own event. When the
+    request rate over the last second or the log writer's backlog crosses
+    its threshold, the log switches to `aggregate` mode: requests are only
+    counted into a `request_aggregate` event per second with counts by
+    path and status and per-path latency histograms. It switches back once
+    both have stayed below `exit_ratio` of their thresholds for
+    `hold_seconds`. Every switch is logged as a `log_mode_switch` event.
+
+    Each request is decided once, so it appears either as its own event or
+    in exactly one aggregate and totals stay exact. State is only touched
+    from the event loop, so there are no locks.
+    """
+
+    def __init__(self, source, emit, rate_threshold=2000.0, backlog_threshold=None,
+                 backlog=None, exit_ratio=0.5, hold_seconds=5.0, max_paths=256):
+        self.source = source
+        self.emit = emit
+        self.rate_threshold = rate_threshold
+        self.backlog_threshold = backlog_threshold
+        self.backlog = backlog  # callable returning the writer's queued records
+        self.exit_ratio = exit_ratio
+        self.hold_seconds = hold_seconds
+        self.max_paths = max_paths
+
+        self.mode = DETAILED
+        self.second = None
+        self.second_requests = 0
+        self.calm_since = None
+        self.paths = {}
+
+        self.detailed_requests = 0
+        self.aggregated_requests = 0
+        self.switches = 0
+
+    def detailed(self, now=None):
+        """Count one request; True if it should be logged as its own event"""
+        second = int(time.time() if now is None else now)
+        if second != self.second:
+            self._roll(second)
+        self.second_requests += 1
+        if self.mode == DETAILED:
+            self.detailed_requests += 1
+            return True
+        return False
+
+    def aggregate(self, path, status, latency_ms):
+        """Fold a request that detailed() turned down into the current second"""
+        entry = self.paths.get(path)
+        if entry is None:
+            if len(self.paths) >= self.max_paths:
+                path = OTHER_PATH
+                entry = self.paths.get(path)
+            if entry is None:
+                entry = self.paths[path] = PathAggregate()
+        entry.add(status, latency_ms)
+        self.aggregated_requests += 1
+
+    def tick(self, now=None):
+        """Close the current second even when no request arrives"""
+        second = int(time.time() if now is None else now)
+        if self.second is not None and second != self.second:
+            self._roll(second)
+
+    async def run(self, interval=1.0):
+        while True:
+            await asyncio.sleep(interval)
+            self.tick()
+
+    def close(self):
+        """Flush the aggregate of the second still open"""
+        self._flush()
+
+    def _roll(self, second):
+        if self.second is not None:
+            self._flush()
+            self._evaluate(self.second_requests, self.second + 1)
+            if second > self.second + 1:
+                # Seconds without any request count as calm
+                self._evaluate(0, second)
+        self.second = second
+        self.second_requests = 0
+
+    def _flush(self):
+        if not self.paths:
+            return
+        paths = self.paths
+        self.paths = {}
+        self.emit({
+            "event_type": "request_aggregate",
+            "timestamp": datetime.fromtimestamp(self.second).isoformat(),
+            "source": self.source,
+            "seconds": 1,
+            "requests": sum(entry.requests for entry in paths.values()),
+            "latency_buckets_ms": LATENCY_BUCKETS_MS,
+            "paths": {path: entry.as_dict() for path, entry in paths.items()},
+            "detailed_requests": self.detailed_requests,
+            "aggregated_requests": self.aggregated_requests
+        })
+
+    def _evaluate(self, rate, at):
+        backlog = self.backlog() if self.backlog else 0
+        over_rate = rate > self.rate_threshold
+        over_backlog = self.backlog_threshold is not None and backlog > self.backlog_threshold
+
+        if self.mode == DETAILED:
+            if over_rate or over_backlog:
+                self._switch(AGGREGATE, "request_rate" if over_rate else "backlog", rate, backlog)
+            return
+
+        calm = rate <= self.rate_threshold * self.exit_ratio and (
+            self.backlog_threshold is None or backlog <= self.backlog_threshold * self.exit_ratio
+        )
+        if not calm:
+            self.calm_since = None
+        elif self.calm_since is None:
+            self.calm_since = at
+        elif at - self.calm_since >= self.hold_seconds:
+            self._switch(DETAILED, "load_normal", rate, backlog)
+
+    def _switch(self, mode, reason, rate, backlog):
+        previous = self.mode
+        self.mode = mode
+        self.calm_since = None
+        self.switches += 1
+        self.emit({
+            "event_type": "log_mode_switch",
+            "timestamp": datetime.now().isoformat(),
+            "source": self.source,
+            "mode": mode,
+            "previous_mode": previous,
+            "reason": reason,
+            "request_rate": rate,
+            "backlog": backlog,
+            "rate_threshold": self.rate_threshold,
+            "backlog_threshold": self.backlog_threshold,
+            "detailed_requests": self.detailed_requests,
+            "aggregated_requests": self.aggregated_requests
+        })
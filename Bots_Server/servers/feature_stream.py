@@ -0,0 +1,386 @@
+"""Live window features computed inside HTTP2Server.
+
+Publishes the columns of the offline pipeline
+(`Attack simulation OLD/feature_extraction.py`, group-by global) once per
+window, for every configured window size, while the server runs. Work on
+the request path is a few additions into preallocated accumulators; the
+vector is only built, packed and published when a window closes.
+
+Two attribution rules differ from the offline join, which sees the whole
+log at once:
+- arrivals, inter-arrival gaps, path entropy and concurrency belong to the
+  window in which the request started
+- latency, errors and resets belong to the window in which it finished
+
+Consumers can print the stream with:
+
+    python -m servers.feature_stream --unix /tmp/bots_server_server_1.features.sock
+    python -m servers.feature_stream --shm bots_server_server_1_features
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import struct
+import time
+from array import array
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+
+FEATURE_COLUMNS = (
+    'request_count', 'request_rate', 'reset_ratio', 'error_ratio',
+    'interarrival_mean_ms', 'interarrival_std_ms', 'interarrival_min_ms', 'interarrival_cv',
+    'path_entropy', 'unique_paths',
+    'latency_mean_ms', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+    'concurrent_mean', 'concurrent_max'
+)
+(REQUEST_COUNT, REQUEST_RATE, RESET_RATIO, ERROR_RATIO,
+ INTERARRIVAL_MEAN, INTERARRIVAL_STD, INTERARRIVAL_MIN, INTERARRIVAL_CV,
+ PATH_ENTROPY, UNIQUE_PATHS,
+ LATENCY_MEAN, LATENCY_P50, LATENCY_P95, LATENCY_P99,
+ CONCURRENT_MEAN, CONCURRENT_MAX) = range(len(FEATURE_COLUMNS))
+
+# One published vector: sequence, window start (epoch seconds), window
+# length in seconds, then the features in FEATURE_COLUMNS order
+RECORD = struct.Struct(f'<Qdd{len(FEATURE_COLUMNS)}d')
+
+NAN = float('nan')
+
+
+class WindowAccumulator:
+    """Running sums for the current window of one size.
+
+    Latencies go into a fixed ring of `ring_size` samples; windows with
+    more completions than that compute percentiles over the most recent
+    ones. Paths are counted in a fixed array indexed by the engine.
+    """
+    __slots__ = (
+        'window_seconds', 'start', 'end', 'arrivals', 'completions', 'resets', 'errors',
+        'last_arrival', 'gap_count', 'gap_sum', 'gap_sq', 'gap_min',
+        'latency_sum', 'latencies', 'ring_size', 'ring_pos', 'path_counts', 'paths_seen',
+        'concurrent_sum', 'concurrent_max', 'vector'
+    )
+
+    def __init__(self, window_seconds, ring_size, max_paths, now):
+        self.window_seconds = window_seconds
+        self.ring_size = ring_size
+        self.latencies = array('d', bytes(8 * ring_size))
+        self.path_counts = array('q', bytes(8 * max_paths))
+        self.vector = array('d', bytes(8 * len(FEATURE_COLUMNS)))
+        self.paths_seen = 0
+        self.reset(math.floor(now / window_seconds) * window_seconds)
+
+    def reset(self, start):
+        self.start = start
+        self.end = start + self.window_seconds
+        self.arrivals = 0
+        self.completions = 0
+        self.resets = 0
+        self.errors = 0
+        self.last_arrival = None
+        self.gap_count = 0
+        self.gap_sum = 0.0
+        self.gap_sq = 0.0
+        self.gap_min = math.inf
+        self.latency_sum = 0.0
+        self.ring_pos = 0
+        self.concurrent_sum = 0
+        self.concurrent_max = 0
+        counts = self.path_counts
+        for i in range(self.paths_seen):
+            counts[i] = 0
+        self.paths_seen = 0
+
+    def record_start(self, now, path_index, concurrent):
+        self.arrivals += 1
+        if self.last_arrival is not None:
+            gap = (now - self.last_arrival) * 1000.0
+            self.gap_count += 1
+            self.gap_sum += gap
+            self.gap_sq += gap * gap
+            if gap < self.gap_min:
+                self.gap_min = gap
+        self.last_arrival = now
+        self.path_counts[path_index] += 1
+        if path_index >= self.paths_seen:
+            self.paths_seen = path_index + 1
+        self.concurrent_sum += concurrent
+        if concurrent > self.concurrent_max:
+            self.concurrent_max = concurrent
+
+    def record_end(self, latency_ms, error, reset):
+        self.completions += 1
+        if reset:
+            self.resets += 1
+            return
+        if error:
+            self.errors += 1
+        self.latency_sum += latency_ms
+        self.latencies[self.ring_pos % self.ring_size] = latency_ms
+        self.ring_pos += 1
+
+    def close(self):
+        """Fill and return the feature vector of the finished window"""
+        v = self.vector
+        arrivals = self.arrivals
+        v[REQUEST_COUNT] = arrivals
+        v[REQUEST_RATE] = arrivals / self.window_seconds
+        v[RESET_RATIO] = self.resets / self.completions if self.completions else NAN
+        v[ERROR_RATIO] = self.errors / self.completions if self.completions else NAN
+
+        if self.gap_count:
+            mean = self.gap_sum / self.gap_count
+            std = math.sqrt(max(self.gap_sq / self.gap_count - mean * mean, 0.0))
+            v[INTERARRIVAL_MEAN] = mean
+            v[INTERARRIVAL_STD] = std
+            v[INTERARRIVAL_MIN] = self.gap_min
+            v[INTERARRIVAL_CV] = std / mean if mean > 0 else NAN
+        else:
+            v[INTERARRIVAL_MEAN] = v[INTERARRIVAL_STD] = v[INTERARRIVAL_MIN] = v[INTERARRIVAL_CV] = NAN
+
+        entropy = 0.0
+        unique = 0
+        if arrivals:
+            counts = self.path_counts
+            for i in range(self.paths_seen):
+                if counts[i]:
+                    unique += 1
+                    share = counts[i] / arrivals
+                    entropy -= share * math.log2(share)
+        v[PATH_ENTROPY] = entropy if arrivals else NAN
+        v[UNIQUE_PATHS] = unique
+
+        answered = self.completions - self.resets
+        if answered:
+            v[LATENCY_MEAN] = self.latency_sum / answered
+            samples = sorted(self.latencies[:min(self.ring_pos, self.ring_size)])
+            last = len(samples) - 1
+            v[LATENCY_P50] = samples[int(0.50 * last)]
+            v[LATENCY_P95] = samples[int(0.95 * last)]
+            v[LATENCY_P99] = samples[int(0.99 * last)]
+        else:
+            v[LATENCY_MEAN] = v[LATENCY_P50] = v[LATENCY_P95] = v[LATENCY_P99] = NAN
+
+        v[CONCURRENT_MEAN] = self.concurrent_sum / arrivals if arrivals else NAN
+        v[CONCURRENT_MAX] = self.concurrent_max if arrivals else NAN
+        return v
+
+
+class UnixSocketPublisher:
+    """Send each vector as one datagram to a local Unix socket.
+
+    Sends never block: with no listener, or a listener that is not keeping
+    up, the datagram is dropped and counted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.buffer = bytearray(RECORD.size)
+        self.sequence = 0
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, window_start, window_seconds, vector):
+        self.sequence += 1
+        RECORD.pack_into(self.buffer, 0, self.sequence, window_start, window_seconds, *vector)
+        try:
+            self.sock.sendto(self.buffer, self.path)
+            self.published += 1
+        except OSError:
+            self.dropped += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class SharedMemoryRing:
+    """Fixed-size ring of feature records in POSIX shared memory.
+
+    The header holds the sequence number of the last record written; record
+    `seq` lives in slot `(seq - 1) % slots` and starts with its own sequence
+    number, so a reader can tell a record it read from one that was
+    overwritten while it was behind.
+    """
+    HEADER = struct.Struct('<QII')
+
+    def __init__(self, name, slots=1024, create=True):
+        self.name = name
+        self.owner = create
+        if create:
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=self.HEADER.size + slots * RECORD.size
+            )
+            self.slots = slots
+            self.HEADER.pack_into(self.shm.buf, 0, 0, slots, RECORD.size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the server's ring when they exit
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+            _, self.slots, record_size = self.HEADER.unpack_from(self.shm.buf, 0)
+            if record_size != RECORD.size:
+                raise ValueError(f"Ring {name} holds {record_size} byte records, expected {RECORD.size}")
+        self.sequence = self.HEADER.unpack_from(self.shm.buf, 0)[0]
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, window_start, window_seconds, vector):
+        self.sequence += 1
+        offset = self.HEADER.size + ((self.sequence - 1) % self.slots) * RECORD.size
+        RECORD.pack_into(self.shm.buf, offset, self.sequence, window_start, window_seconds, *vector)
+        # Advance the header last so readers never see a half-written record
+        self.HEADER.pack_into(self.shm.buf, 0, self.sequence, self.slots, RECORD.size)
+        self.published += 1
+
+    def read(self, after=0):
+        """Records with a sequence number above `after` that are still in the ring"""
+        latest = self.HEADER.unpack_from(self.shm.buf, 0)[0]
+        records = []
+        for sequence in range(max(after + 1, latest - self.slots + 1), latest + 1):
+            offset = self.HEADER.size + ((sequence - 1) % self.slots) * RECORD.size
+            record = RECORD.unpack_from(self.shm.buf, offset)
+            if record[0] == sequence:
+                records.append(record)
+        return records
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def record_to_dict(record):
+    sequence, window_start, window_seconds = record[:3]
+    event = {"sequence": sequence, "window_start": window_start, "window_seconds": window_seconds}
+    event.update(zip(FEATURE_COLUMNS, (None if math.isnan(value) else value for value in record[3:])))
+    return event
+
+
+class OnlineFeatureEngine:
+    """Per-window feature accumulators for every configured window size"""
+
+    def __init__(self, server_id, windows=(1.0, 10.0, 60.0), ring_size=4096, max_paths=64,
+                 publisher=None):
+        self.server_id = server_id
+        self.publisher = publisher
+        self.max_paths = max_paths
+        now = time.time()
+        self.accumulators = [
+            WindowAccumulator(float(window), ring_size, max_paths, now) for window in sorted(windows)
+        ]
+        self.next_close = min(acc.end for acc in self.accumulators)
+        self.path_indexes = {}
+        self.in_flight = 0
+        self.windows_closed = 0
+
+    def path_index(self, path):
+        index = self.path_indexes.get(path)
+        if index is None:
+            # Paths past the table size share the last slot
+            index = min(len(self.path_indexes), self.max_paths - 1)
+            if len(self.path_indexes) < self.max_paths:
+                self.path_indexes[path] = index
+        return index
+
+    def request_started(self, now, path):
+        if now >= self.next_close:
+            self.advance(now)
+        self.in_flight += 1
+        index = self.path_index(path)
+        concurrent = self.in_flight
+        for acc in self.accumulators:
+            acc.record_start(now, index, concurrent)
+
+    def request_finished(self, now, latency_ms, error=False, reset=False):
+        if now >= self.next_close:
+            self.advance(now)
+        self.in_flight -= 1
+        for acc in self.accumulators:
+            acc.record_end(latency_ms, error, reset)
+
+    def advance(self, now):
+        """Close and publish every window that ended before `now`"""
+        for acc in self.accumulators:
+            while now >= acc.end:
+                vector = acc.close()
+                if self.publisher is not None:
+                    self.publisher.publish(acc.start, acc.window_seconds, vector)
+                self.windows_closed += 1
+                acc.reset(acc.end)
+        self.next_close = min(acc.end for acc in self.accumulators)
+
+    async def run(self):
+        """Close windows on time even when no requests arrive"""
+        while True:
+            await asyncio.sleep(max(0.0, self.next_close - time.time()))
+            self.advance(time.time())
+
+    def stats_event(self):
+        publisher = self.publisher
+        return {
+            "event_type": "feature_stream_stats",
+            "timestamp": datetime.now().isoformat(),
+            "server_id": self.server_id,
+            "windows": [acc.window_seconds for acc in self.accumulators],
+            "windows_closed": self.windows_closed,
+            "published": publisher.published if publisher else 0,
+            "dropped": publisher.dropped if publisher else 0
+        }
+
+    def close(self):
+        if self.publisher is not None:
+            self.publisher.close()
+
+
+def create_publisher(options, name):
+    """Publisher from the feature_stream config; {server} expands to `name`"""
+    kind = options.get('publisher', 'unix')
+    if kind == 'unix':
+        return UnixSocketPublisher(options.get('socket_path', '/tmp/bots_server_{server}.features.sock').format(server=name))
+    if kind == 'shm':
+        return SharedMemoryRing(
+            options.get('shm_name', 'bots_server_{server}_features').format(server=name),
+            slots=options.get('shm_slots', 1024)
+        )
+    if kind == 'none':
+        return None
+    raise ValueError(f"Unknown feature_stream publisher: {kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print live feature vectors published by a server')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--unix', help='Unix datagram socket path to bind and read')
+    source.add_argument('--shm', help='Shared-memory ring name to poll')
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.unlink(args.unix)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(args.unix)
+        try:
+            while True:
+                print(json.dumps(record_to_dict(RECORD.unpack(sock.recv(RECORD.size)))), flush=True)
+        finally:
+            sock.close()
+            os.unlink(args.unix)
+
+    ring = SharedMemoryRing(args.shm, create=False)
+    last = ring.sequence
+    try:
+        while True:
+            for record in ring.read(last):
+                print(json.dumps(record_to_dict(record)), flush=True)
+                last = record[0]
+            time.sleep(args.poll_interval)
+    finally:
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import time
+from datetime import datetime
+
+import h2.errors
+import h2.events
+import hypercorn.protocol
+from hypercorn.events import Closed
+from hypercorn.protocol.events import Response, StreamClosed
+from hypercorn.protocol.h2 import H2Protocol
+
+# Inbound frame counters, indexed by position
+FRAME_FIELDS = (
+    'headers', 'data', 'rst_stream', 'settings', 'window_update',
+    'ping', 'goaway', 'priority'
+)
+HEADERS, DATA, RST_STREAM, SETTINGS, WINDOW_UPDATE, PING, GOAWAY, PRIORITY = range(len(FRAME_FIELDS))
+STREAM_FIELDS = ('streams_opened', 'streams_reset', 'streams_reset_before_response')
+STREAMS_OPENED, STREAMS_RESET, STREAMS_RESET_BEFORE_RESPONSE = range(
+    len(FRAME_FIELDS), len(FRAME_FIELDS) + len(STREAM_FIELDS)
+)
+COUNTER_FIELDS = FRAME_FIELDS + STREAM_FIELDS
+
+# h2 reports received frames as events; map each event type to its frame
+EVENT_COUNTER_INDEX = {
+    h2.events.RequestReceived: HEADERS,
+    h2.events.TrailersReceived: HEADERS,
+    h2.events.DataReceived: DATA,
+    h2.events.StreamReset: RST_STREAM,
+    h2.events.RemoteSettingsChanged: SETTINGS,
+    h2.events.SettingsAcknowledged: SETTINGS,
+    h2.events.WindowUpdated: WINDOW_UPDATE,
+    h2.events.PingReceived: PING,
+    h2.events.PingAckReceived: PING,
+    h2.events.ConnectionTerminated: GOAWAY,
+    h2.events.PriorityUpdated: PRIORITY,
+}
+
+
+class ConnectionFrameCounters:
+    """Counters for a single HTTP/2 connection, updated once per received frame"""
+    __slots__ = ('client', 'opened_at', 'counts', 'open_streams', 'responded', 'peak_streams')
+
+    def __init__(self, client):
+        self.client = client
+        self.opened_at = time.time()
+        self.counts = [0] * len(COUNTER_FIELDS)
+        self.open_streams = set()
+        self.responded = set()
+        self.peak_streams = 0
+
+    def as_dict(self):
+        return dict(zip(COUNTER_FIELDS, self.counts))
+
+
+class H2FrameStats:
+    """Per-server aggregation of HTTP/2 frame counters.
+
+    Connections update their own counters on the protocol path; the server
+    periodically calls `snapshot_event()` to log interval deltas, running
+    totals and the peak concurrency seen since the previous snapshot.
+    """
+
+    def __init__(self, server_id, on_connection_closed=None):
+        self.server_id = server_id
+        self.on_connection_closed = on_connection_closed
+        self.connections = set()
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.closed_totals = [0] * len(COUNTER_FIELDS)
+        self.last_totals = [0] * len(COUNTER_FIELDS)
+        self.open_streams = 0
+        self.peak_open_streams = 0
+        self.peak_streams_per_connection = 0
+        self.last_snapshot = time.time()
+
+    def connection_opened(self, client):
+        counters = ConnectionFrameCounters(client)
+        self.connections.add(counters)
+        self.connections_opened += 1
+        return counters
+
+    def connection_closed(self, counters):
+        if counters not in self.connections:
+            return
+        self.connections.discard(counters)
+        self.connections_closed += 1
+        self.open_streams -= len(counters.open_streams)
+        counters.open_streams.clear()
+        for i, count in enumerate(counters.counts):
+            self.closed_totals[i] += count
+
+        if self.on_connection_closed:
+            event = {
+                "event_type": "h2_connection_closed",
+                "timestamp": datetime.now().isoformat(),
+                "server_id": self.server_id,
+                "client_ip": counters.client[0] if counters.client else "unknown",
+                "duration_seconds": time.time() - counters.opened_at,
+                "peak_concurrent_streams": counters.peak_streams
+            }
+            event.update(counters.as_dict())
+            self.on_connection_closed(event)
+
+    def record_events(self, counters, events):
+        counts = counters.counts
+        for event in events:
+            index = EVENT_COUNTER_INDEX.get(type(event))
+            if index is None:
+                continue
+
+            if index == RST_STREAM:
+                if not event.remote_reset:
+                    continue
+                counts[RST_STREAM] += 1
+                counts[STREAMS_RESET] += 1
+                if event.stream_id in counters.open_streams:
+                    if event.stream_id not in counters.responded:
+                        counts[STREAMS_RESET_BEFORE_RESPONSE] += 1
+                    self.stream_closed(counters, event.stream_id)
+                continue
+
+            counts[index] += 1
+            if index == HEADERS and type(event) is h2.events.RequestReceived:
+                counts[STREAMS_OPENED] += 1
+                counters.open_streams.add(event.stream_id)
+                self.open_streams += 1
+                if len(counters.open_streams) > counters.peak_streams:
+                    counters.peak_streams = len(counters.open_streams)
+                    if counters.peak_streams > self.peak_streams_per_connection:
+                        self.peak_streams_per_connection = counters.peak_streams
+                if self.open_streams > self.peak_open_streams:
+                    self.peak_open_streams = self.open_streams
+
+    def stream_closed(self, counters, stream_id):
+        if stream_id in counters.open_streams:
+            counters.open_streams.discard(stream_id)
+            self.open_streams -= 1
+        counters.responded.discard(stream_id)
+
+    def totals(self):
+        totals = list(self.closed_totals)
+        for counters in self.connections:
+            for i, count in enumerate(counters.counts):
+                totals[i] += count
+        return totals
+
+    def snapshot_event(self):
+        """Aggregate event covering the interval since the previous snapshot"""
+        now = time.time()
+        totals = self.totals()
+        interval = now - self.last_snapshot
+
+        event = {
+            "event_type": "h2_frame_stats",
+            "timestamp": datetime.now().isoformat(),
+            "server_id": self.server_id,
+            "interval_seconds": interval,
+            "active_connections": len(self.connections),
+            "connections_opened": self.connections_opened,
+            "connections_closed": self.connections_closed,
+            "open_streams": self.open_streams,
+            "peak_open_streams": self.peak_open_streams,
+            "peak_streams_per_connection": self.peak_streams_per_connection
+        }
+        for name, total, last in zip(COUNTER_FIELDS, totals, self.last_totals):
+            event[name] = total - last
+            event[f"{name}_total"] = total
+
+        self.last_totals = totals
+        self.last_snapshot = now
+        self.peak_open_streams = self.open_streams
+        self.peak_streams_per_connection = max(
+            (len(counters.open_streams) for counters in self.connections), default=0
+        )
+        return event
+
+
+class InstrumentedH2Protocol(H2Protocol):
+    """Hypercorn H2 protocol with optional frame counters and reset mitigation.
+
+    Both features are opt-in per server through attributes on the hypercorn
+    config (`frame_stats`, `reset_mitigation`); without them the protocol
+    behaves exactly like hypercorn's own.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frame_stats = getattr(self.config, 'frame_stats', None)
+        self.frame_counters = None
+        if self.frame_stats is not None:
+            self.frame_counters = self.frame_stats.connection_opened(self.client)
+
+        self.reset_policy = getattr(self.config, 'reset_mitigation', None)
+        self.reset_limiter = None
+        if self.reset_policy is not None:
+            self.reset_limiter = self.reset_policy.new_limiter()
+        self.mitigated = False
+
+    async def handle(self, event):
+        await super().handle(event)
+        if self.frame_counters is not None and isinstance(event, Closed):
+            self.frame_stats.connection_closed(self.frame_counters)
+
+    async def stream_send(self, event):
+        if self.frame_counters is not None:
+            if isinstance(event, Response):
+                self.frame_counters.responded.add(event.stream_id)
+            elif isinstance(event, StreamClosed):
+                self.frame_stats.stream_closed(self.frame_counters, event.stream_id)
+        await super().stream_send(event)
+
+    async def _handle_events(self, events):
+        if self.mitigated:
+            return
+        if self.frame_counters is not None:
+            self.frame_stats.record_events(self.frame_counters, events)
+
+        # Check the whole batch before any stream in it reaches the app
+        if self.reset_limiter is not None:
+            reason = self.reset_policy.check(self.reset_limiter, events)
+            if reason:
+                await self._mitigate(reason)
+                return
+        await super()._handle_events(events)
+
+    async def _mitigate(self, reason):
+        """Send GOAWAY (ENHANCE_YOUR_CALM) and close the connection"""
+        self.mitigated = True
+        self.connection.close_connection(error_code=h2.errors.ErrorCodes.ENHANCE_YOUR_CALM)
+        await self._flush()
+        self.reset_policy.triggered(self.client, self.reset_limiter, reason)
+        await self.send(Closed())
+
+
+def install_frame_instrumentation():
+    """Make hypercorn create instrumented H2 connections (idempotent).
+
+    Hypercorn has no hook for protocol events, so the H2Protocol used by its
+    ProtocolWrapper is swapped for the subclass above. Servers opt in by
+    setting `config.frame_stats` or `config.reset_mitigation`; other configs
+    behave exactly as before.
+    """
+    hypercorn.protocol.H2Protocol = InstrumentedH2Protocol
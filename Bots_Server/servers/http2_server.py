@@ -3,14 +3,30 @@ import logging
 import time
 import json
 import random
+import socket
 from hypercorn.config import Config
 from hypercorn.asyncio import serve
-from quart import Quart, request, jsonify, Response
-import psutil
+from quart import Quart, g, request, jsonify, Response
 from datetime import datetime
 
+from servers.adaptive_logging import AdaptiveRequestLog
+from servers.feature_stream import OnlineFeatureEngine, create_publisher
+from servers.h2_instrumentation import H2FrameStats, install_frame_instrumentation
+from servers.log_pipeline import BatchedLogWriter
+from servers.metrics import ServerMetrics
+from servers.mitigation import ResetMitigationPolicy
+from servers.request_tracing import RECEIVED_AT, TRACE_HEADER, parse_trace_id, stamp_arrivals
+from servers.system_sampler import SystemSampler
+from servers.worker_pool import CONNECTION_COUNT, REQUEST_COUNT
+
 class HTTP2Server:
-    def __init__(self, host="localhost", port=8000, server_id="server_1"):
+    def __init__(self, host="localhost", port=8000, server_id="server_1",
+                 log_mode="sync", log_options=None, system_sampler=None,
+                 sampler_interval=1.0, frame_stats_options=None,
+                 mitigation_options=None, worker_index=None,
+                 shared_counters=None, reuse_port=False,
+                 processing_delay_scale=1.0, feature_stream_options=None,
+                 metrics_options=None, adaptive_logging_options=None):
         self.app = Quart(__name__)
         self.host = host
         self.port = port
@@ -18,19 +34,76 @@ class HTTP2Server:
         self.request_count = 0
         self.connection_count = 0
         self.start_time = time.time()
+        self.log_mode = log_mode  # sync or batched
+        self.log_options = log_options or {}
+        self.log_writer = None
+        # May be shared by several servers in the same process
+        self.system_sampler = system_sampler or SystemSampler(sampler_interval)
+        self.frame_stats_options = frame_stats_options or {}
+        self.frame_stats = None
+        self.mitigation_options = mitigation_options or {}
+        self.reset_mitigation = None
+        self.feature_stream_options = feature_stream_options or {}
+        self.feature_engine = None
+        self.metrics_options = metrics_options or {}
+        self.metrics = None
+        self.adaptive_logging_options = adaptive_logging_options or {}
+        self.request_log = None
+        # Worker mode: several processes share the port via SO_REUSEPORT and
+        # publish their counters to shared memory so logged totals stay global
+        self.worker_index = worker_index
+        self.shared_counters = shared_counters
+        self.reuse_port = reuse_port
+        self.log_name = self.server_id if worker_index is None else f"{self.server_id}-w{worker_index}"
+        # Multiplier for the simulated processing time; 0 benchmarks the bare path
+        self.processing_delay_scale = processing_delay_scale
         self.setup_routes()
+        self.setup_metrics()
+        self.setup_tracing()
         self.setup_logging()
         
     def setup_logging(self):
+        self.logger = logging.getLogger(f'server_{self.server_id}')
+        
+        if self.log_mode == "batched":
+            # Request records are only enqueued on the event loop and written
+            # in batches by a background thread
+            self.log_writer = BatchedLogWriter(
+                f'logs/server_logs/{self.log_name}.log',
+                prefix=f'[{self.log_name}] ',
+                source=self.log_name,
+                **self.log_options
+            )
+            return
+        
         logging.basicConfig(
             level=logging.INFO,
-            format=f'[{self.server_id}] %(asctime)s - %(levelname)s - %(message)s',
+            format=f'[{self.log_name}] %(asctime)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler(f'logs/server_logs/{self.server_id}.log'),
+                logging.FileHandler(f'logs/server_logs/{self.log_name}.log'),
                 logging.StreamHandler()
             ]
         )
-        self.logger = logging.getLogger(f'server_{self.server_id}')
+    
+    def log_event(self, message):
+        """Log a string or JSON-serialisable dict through the configured path"""
+        if self.log_writer:
+            self.log_writer.write(message)
+        elif isinstance(message, str):
+            self.logger.info(message)
+        else:
+            self.logger.info(json.dumps(message))
+    
+    def update_counter(self, field, value):
+        if self.shared_counters is not None:
+            self.shared_counters.set(self.worker_index, field, value)
+    
+    def global_counts(self):
+        """request_count and connection_count across all workers of this server"""
+        if self.shared_counters is None:
+            return self.request_count, self.connection_count
+        return (self.shared_counters.total(REQUEST_COUNT),
+                self.shared_counters.total(CONNECTION_COUNT))
     
     def setup_routes(self):
         @self.app.route('/')
@@ -55,38 +128,113 @@ class HTTP2Server:
         async def upload():
             return await self.handle_request("POST", "/upload")
         
+    def setup_metrics(self):
+        """Serve Prometheus metrics on /metrics, counted by ASGI middleware"""
+        options = self.metrics_options
+        if not options.get('enabled', False):
+            return
+        
+        @self.app.route(options.get('path', '/metrics'))
+        async def metrics():
+            return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+        
+        routes = [rule.rule for rule in self.app.url_map.iter_rules() if rule.endpoint != 'static']
+        self.metrics = ServerMetrics(
+            self.server_id, routes,
+            worker_index=self.worker_index,
+            system_sampler=self.system_sampler,
+            loop_lag_interval=options.get('loop_lag_interval', 0.1)
+        )
+        self.app.asgi_app = self.metrics.wrap_asgi(self.app.asgi_app)
+    
+    def setup_tracing(self):
+        """Honour bot trace ids: stamp arrival in ASGI, handler start before routing"""
+        @self.app.before_request
+        async def start_trace():
+            trace_id = parse_trace_id(request.headers.get(TRACE_HEADER))
+            if trace_id:
+                g.trace = (trace_id, request.scope.get(RECEIVED_AT), time.time())
+        
+        # Outermost, so arrival is taken before the metrics middleware runs
+        self.app.asgi_app = stamp_arrivals(self.app.asgi_app)
+    
     async def handle_request(self, method, path, extra_data=None):
         self.request_count += 1
+        self.update_counter(REQUEST_COUNT, self.request_count)
         start_time = time.time()
+        features = self.feature_engine
+        if features:
+            features.request_started(start_time, path)
         
         # Simulate realistic processing time
         processing_delay = random.uniform(0.01, 0.1)
         if "heavy" in path:
             processing_delay = random.uniform(0.5, 2.0)
         
-        await asyncio.sleep(processing_delay)
+        try:
+            await asyncio.sleep(processing_delay * self.processing_delay_scale)
+        except asyncio.CancelledError:
+            # The client reset the stream before we answered
+            if features:
+                features.request_finished(time.time(), 0.0, reset=True)
+            raise
         
-        response_time = (time.time() - start_time) * 1000
+        end_time = time.time()
+        response_time = (end_time - start_time) * 1000
+        try:
+            response = self.finish_request(method, path, extra_data, end_time, response_time)
+        except Exception:
+            # Quart answers an unhandled exception with a 500, which the
+            # offline features count as an error
+            if features:
+                features.request_finished(end_time, response_time, error=True)
+            raise
+        if features:
+            features.request_finished(end_time, response_time)
+        return response
+    
+    def finish_request(self, method, path, extra_data, end_time, response_time):
+        """Log a served request (or fold it into an aggregate) and build its response"""
+        request_log = self.request_log
+        if request_log and not request_log.detailed(end_time):
+            # Under load the request is only counted in a per-second aggregate
+            request_log.aggregate(path, 200, response_time)
+            return self.build_response(path, response_time, extra_data)
         
-        # Log detailed request information
+        # Log detailed request information; system stats come from the
+        # sampler's latest snapshot rather than per-request psutil calls
+        system = self.system_sampler.snapshot
+        request_count, connection_count = self.global_counts()
         log_data = {
             "timestamp": datetime.now().isoformat(),
             "server_id": self.server_id,
             "method": method,
             "path": path,
             "response_time_ms": response_time,
-            "request_count": self.request_count,
-            "connection_count": self.connection_count,
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
+            "request_count": request_count,
+            "connection_count": connection_count,
             "client_ip": request.remote_addr if hasattr(request, 'remote_addr') else "unknown"
         }
+        log_data.update(system.as_log_fields())
+        if self.worker_index is not None:
+            log_data["worker_index"] = self.worker_index
+        
+        trace = g.get('trace')
+        if trace:
+            trace_id, received_at, handler_start = trace
+            log_data["trace_id"] = trace_id
+            log_data["received_at"] = received_at if received_at is not None else handler_start
+            log_data["handler_start"] = handler_start
+            log_data["handler_end"] = end_time
         
         if extra_data:
             log_data.update(extra_data)
             
-        self.logger.info(json.dumps(log_data))
+        self.log_event(log_data)
         
+        return self.build_response(path, response_time, extra_data)
+    
+    def build_response(self, path, response_time, extra_data):
         return jsonify({
             "status": "success",
             "server_id": self.server_id,
@@ -110,10 +258,139 @@ class HTTP2Server:
             return n
         return await self.fibonacci_task(n-1) + await self.fibonacci_task(n-2) if n < 35 else n
     
+    def setup_frame_stats(self, config):
+        """Count HTTP/2 frames per connection in the hypercorn protocol layer"""
+        options = self.frame_stats_options
+        if not options.get('enabled', False):
+            return None
+        
+        install_frame_instrumentation()
+        self.frame_stats = H2FrameStats(
+            self.server_id,
+            on_connection_closed=self.log_event if options.get('log_connections', True) else None
+        )
+        config.frame_stats = self.frame_stats
+        return asyncio.create_task(self.emit_frame_stats(options.get('interval', 5.0)))
+    
+    def setup_mitigation(self, config):
+        """Close connections whose clients reset streams too fast or too often"""
+        options = dict(self.mitigation_options)
+        if not options.pop('enabled', False):
+            return
+        
+        install_frame_instrumentation()
+        self.reset_mitigation = ResetMitigationPolicy(
+            self.server_id, on_trigger=self.log_event, **options
+        )
+        config.reset_mitigation = self.reset_mitigation
+    
+    def setup_feature_stream(self):
+        """Live window features published over a Unix socket or shared memory"""
+        options = self.feature_stream_options
+        if not options.get('enabled', False):
+            return None
+        
+        self.feature_engine = OnlineFeatureEngine(
+            self.server_id,
+            windows=options.get('windows', (1.0, 10.0, 60.0)),
+            ring_size=options.get('ring_size', 4096),
+            max_paths=options.get('max_paths', 64),
+            publisher=create_publisher(options, self.log_name)
+        )
+        return asyncio.create_task(self.feature_engine.run())
+    
+    def setup_adaptive_logging(self):
+        """Fall back to per-second aggregate events while request load is high"""
+        options = dict(self.adaptive_logging_options)
+        if not options.pop('enabled', False):
+            return None
+        
+        self.request_log = AdaptiveRequestLog(
+            self.log_name, self.log_event,
+            backlog=self.log_writer.pending if self.log_writer else None,
+            **options
+        )
+        return asyncio.create_task(self.request_log.run())
+    
+    def start_metrics(self, config):
+        """Connection gauges and the event-loop lag probe behind /metrics"""
+        if not self.metrics:
+            return None
+        
+        if self.frame_stats is None:
+            # Connection and stream gauges come from the frame counters
+            install_frame_instrumentation()
+            self.frame_stats = H2FrameStats(self.server_id)
+            config.frame_stats = self.frame_stats
+        self.metrics.frame_stats = self.frame_stats
+        return asyncio.create_task(self.metrics.monitor_loop_lag())
+    
+    def worker_metrics_port(self):
+        """Port on which only this worker answers /metrics, if configured"""
+        offset = self.metrics_options.get('worker_port_offset')
+        if not self.metrics or self.worker_index is None or not offset:
+            return None
+        return self.port + offset * (self.worker_index + 1)
+    
+    async def emit_frame_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            self.connection_count = len(self.frame_stats.connections)
+            self.update_counter(CONNECTION_COUNT, self.connection_count)
+            self.log_event(self.frame_stats.snapshot_event())
+    
+    def reuse_port_socket(self):
+        """Listening socket that other worker processes can bind as well"""
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.setblocking(False)
+        return sock
+    
     async def run(self):
         config = Config()
-        config.bind = [f"{self.host}:{self.port}"]
         config.alpn_protocols = ['h2', 'http/1.1']
+        if self.reuse_port:
+            # Hypercorn only sets SO_REUSEPORT for its own worker processes,
+            # so bind here and hand it the file descriptor (it closes it)
+            config.bind = [f"fd://{self.reuse_port_socket().detach()}"]
+            metrics_port = self.worker_metrics_port()
+            if metrics_port:
+                # The kernel spreads scrapes of the shared port over the
+                # workers, so each one also listens on a port of its own
+                config.bind.append(f"{self.host}:{metrics_port}")
+        else:
+            config.bind = [f"{self.host}:{self.port}"]
+        
+        if self.log_writer:
+            self.log_writer.start()
+        self.system_sampler.start()
+        frame_stats_task = self.setup_frame_stats(config)
+        self.setup_mitigation(config)
+        feature_task = self.setup_feature_stream()
+        metrics_task = self.start_metrics(config)
+        adaptive_task = self.setup_adaptive_logging()
         
-        self.logger.info(f"Starting HTTP/2 server on {self.host}:{self.port}")
-        await serve(self.app, config)
+        worker = f" (worker {self.worker_index})" if self.worker_index is not None else ""
+        self.log_event(f"Starting HTTP/2 server on {self.host}:{self.port}{worker}")
+        if len(config.bind) > 1:
+            self.log_event(f"Worker metrics on {config.bind[1]}{self.metrics_options.get('path', '/metrics')}")
+        try:
+            await serve(self.app, config)
+        finally:
+            if frame_stats_task:
+                frame_stats_task.cancel()
+            if metrics_task:
+                metrics_task.cancel()
+            if adaptive_task:
+                adaptive_task.cancel()
+                self.request_log.close()
+            if feature_task:
+                feature_task.cancel()
+                self.log_event(self.feature_engine.stats_event())
+                self.feature_engine.close()
+            self.system_sampler.stop()
+            if self.log_writer:
+                self.log_writer.close()
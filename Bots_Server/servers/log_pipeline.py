@@ -0,0 +1,162 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+
+class BatchedLogWriter:
+    """Queue-based log writer for the server hot path.
+
+    The event loop only appends records to an in-memory queue. A daemon
+    thread drains the queue, formats the lines and writes them in large
+    buffered batches, flushing when a batch fills up or the flush interval
+    expires. Dropped records and backlog episodes are counted and written
+    to the same log as `log_pipeline_stats` events.
+    """
+
+    def __init__(self, path, prefix="", source="server", max_queue=100000,
+                 batch_size=1000, flush_interval=0.5, buffer_size=1024 * 1024,
+                 backlog_threshold=None, report_interval=10.0, echo=False):
+        self.path = path
+        self.prefix = prefix
+        self.source = source
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.backlog_threshold = backlog_threshold or max_queue // 2
+        self.report_interval = report_interval
+        self.echo = echo
+
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._file = None
+
+        # Written only by the enqueuing thread
+        self.enqueued = 0
+        self.dropped = 0
+        # Written only by the writer thread
+        self.written = 0
+        self.batches = 0
+        self.max_backlog = 0
+        self.backlog_events = 0
+        self._in_backlog = False
+        self._last_reported = None
+
+    def start(self):
+        if self._thread:
+            return
+        # A writer may be restarted after close(), e.g. once per scenario phase
+        self._stopping = False
+        self._file = open(self.path, 'a', buffering=self.buffer_size)
+        self._thread = threading.Thread(
+            target=self._run, name=f'log-writer-{self.source}', daemon=True
+        )
+        self._thread.start()
+
+    def write(self, record, level="INFO"):
+        """Enqueue a record (str or JSON-serialisable dict) without blocking"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+
+        self._queue.append((time.time(), level, record))
+        self.enqueued += 1
+
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def pending(self):
+        """Records queued but not yet written"""
+        return len(self._queue)
+
+    def close(self, timeout=5.0):
+        """Flush everything still queued and stop the writer thread"""
+        if not self._thread:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self):
+        return {
+            'event_type': 'log_pipeline_stats',
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'source': self.source,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'backlog': len(self._queue),
+            'max_backlog': self.max_backlog,
+            'backlog_events': self.backlog_events,
+            'batches': self.batches
+        }
+
+    def _format(self, created, level, record):
+        if not isinstance(record, str):
+            record = json.dumps(record)
+        msecs = int((created - int(created)) * 1000)
+        asctime = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))
+        return f"{self.prefix}{asctime},{msecs:03d} - {level} - {record}\n"
+
+    def _drain(self):
+        backlog = len(self._queue)
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+        if backlog >= self.backlog_threshold:
+            if not self._in_backlog:
+                self.backlog_events += 1
+                self._in_backlog = True
+        else:
+            self._in_backlog = False
+
+        if not backlog:
+            return
+
+        queue = self._queue
+        while queue:
+            lines = []
+            for _ in range(min(self.batch_size, len(queue))):
+                lines.append(self._format(*queue.popleft()))
+            chunk = ''.join(lines)
+            self._file.write(chunk)
+            if self.echo:
+                sys.stdout.write(chunk)
+            self.written += len(lines)
+            self.batches += 1
+
+        self._file.flush()
+        if self.echo:
+            sys.stdout.flush()
+
+    def _report(self, force=False):
+        """Log pipeline stats whenever drops or backlog episodes changed"""
+        current = (self.dropped, self.backlog_events)
+        if not force and current == self._last_reported:
+            return
+        if not force and current == (0, 0) and self._last_reported is None:
+            return
+        self._last_reported = current
+
+        self._file.write(self._format(time.time(), "INFO", self.get_stats()))
+        self._file.flush()
+
+    def _run(self):
+        next_report = time.monotonic() + self.report_interval
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+            if time.monotonic() >= next_report:
+                self._report()
+                next_report = time.monotonic() + self.report_interval
+
+        self._drain()
+        self._report(force=True)
+        self._file.close()
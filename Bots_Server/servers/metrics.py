@@ -0,0 +1,238 @@
+import asyncio
+import math
+import time
+from bisect import bisect_left
+
+# Response statuses with their own series; anything else is counted as "other".
+# "cancelled" is a request that ended before a response started (client reset).
+STATUS_CODES = (200, 201, 204, 301, 302, 304, 400, 401, 403, 404, 405, 408, 413,
+                429, 500, 502, 503, 504)
+STATUS_LABELS = ("cancelled",) + tuple(str(code) for code in STATUS_CODES) + ("other",)
+CANCELLED, OTHER = 0, len(STATUS_LABELS) - 1
+STATUS_INDEX = {code: i + 1 for i, code in enumerate(STATUS_CODES)}
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+OTHER_ROUTE = "other"
+
+
+def format_bound(bound):
+    return "+Inf" if bound is None else repr(bound)
+
+
+def log_bounds(low, high, growth):
+    """Bucket upper bounds growing by `growth` from `low` until they pass `high`.
+
+    A percentile read from such buckets is off by at most a factor of `growth`.
+    """
+    bounds = [low]
+    while bounds[-1] < high:
+        bounds.append(bounds[-1] * growth)
+    return tuple(bounds)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() only bumps two slots and a sum"""
+    __slots__ = ('bounds', 'buckets', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different bucket bounds")
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (the last bound for +Inf)"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                break
+        return self.bounds[min(index, len(self.bounds) - 1)]
+
+    def to_dict(self):
+        # Sparse: most buckets are empty, and this crosses process pipes
+        return {
+            "sum": self.sum,
+            "buckets": {index: count for index, count in enumerate(self.buckets) if count}
+        }
+
+    @classmethod
+    def from_dict(cls, bounds, data):
+        histogram = cls(bounds)
+        for index, count in data["buckets"].items():
+            histogram.buckets[int(index)] = count
+        histogram.sum = data["sum"]
+        histogram.count = sum(histogram.buckets)
+        return histogram
+
+    def render(self, name, labels, lines):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (None,), self.buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{format_bound(bound)}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum!r}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+
+
+class ServerMetrics:
+    """Prometheus metrics for one HTTP2Server, backed by preallocated counters.
+
+    Routes are fixed when the server is built, so every (route, status)
+    counter and per-route latency histogram exists up front and the request
+    path only increments slots. `render()` formats those counters plus a
+    few gauges read from the frame stats and the system sampler snapshot;
+    its cost depends on the number of routes, never on traffic.
+    """
+
+    def __init__(self, server_id, routes, worker_index=None, system_sampler=None,
+                 frame_stats=None, loop_lag_interval=0.1):
+        self.server_id = server_id
+        self.routes = tuple(routes) + (OTHER_ROUTE,)
+        self.route_indexes = {route: i for i, route in enumerate(self.routes)}
+        self.other_route = len(self.routes) - 1
+        self.system_sampler = system_sampler
+        self.frame_stats = frame_stats
+        self.loop_lag_interval = loop_lag_interval
+
+        self.requests = [[0] * len(STATUS_LABELS) for _ in self.routes]
+        self.latency = [Histogram(LATENCY_BUCKETS) for _ in self.routes]
+        self.in_flight = 0
+        self.loop_lag = Histogram(LOOP_LAG_BUCKETS)
+        self.last_loop_lag = 0.0
+        self.started_at = time.time()
+
+        labels = f'server_id="{server_id}"'
+        if worker_index is not None:
+            labels += f',worker="{worker_index}"'
+        self.labels = labels
+        self.route_labels = [f'{labels},route="{route}"' for route in self.routes]
+
+    def route_index(self, path):
+        return self.route_indexes.get(path, self.other_route)
+
+    def observe(self, route, status, seconds):
+        """Count one finished request; status 0 means no response was started"""
+        self.requests[route][STATUS_INDEX.get(status, OTHER) if status else CANCELLED] += 1
+        self.latency[route].observe(seconds)
+
+    def wrap_asgi(self, asgi_app):
+        """ASGI middleware that counts every HTTP request, including 404s and resets"""
+        metrics = self
+
+        async def instrumented(scope, receive, send):
+            if scope["type"] != "http":
+                return await asgi_app(scope, receive, send)
+
+            route = metrics.route_index(scope["path"])
+            status = 0
+            started = time.perf_counter()
+            metrics.in_flight += 1
+
+            async def send_and_record(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+
+            try:
+                await asgi_app(scope, receive, send_and_record)
+            finally:
+                metrics.in_flight -= 1
+                metrics.observe(route, status, time.perf_counter() - started)
+
+        return instrumented
+
+    async def monitor_loop_lag(self):
+        """Measure how late the event loop wakes a timer, every loop_lag_interval"""
+        loop = asyncio.get_running_loop()
+        interval = self.loop_lag_interval
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_loop_lag = lag
+            self.loop_lag.observe(lag)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP http_requests_total HTTP requests by route and response status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for route_labels, counts in zip(self.route_labels, self.requests):
+            for status, count in zip(STATUS_LABELS, counts):
+                if count:
+                    lines.append(f'http_requests_total{{{route_labels},status="{status}"}} {count}')
+
+        lines.append("# HELP http_request_duration_seconds Time from request start to handler completion.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for route_labels, histogram in zip(self.route_labels, self.latency):
+            if histogram.count:
+                histogram.render("http_request_duration_seconds", route_labels, lines)
+
+        labels = self.labels
+        lines.append("# HELP http_requests_in_flight Requests being handled (open HTTP/2 streams in the app).")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight{{{labels}}} {self.in_flight}")
+
+        frame_stats = self.frame_stats
+        if frame_stats is not None:
+            lines.append("# HELP h2_active_connections Open HTTP/2 connections.")
+            lines.append("# TYPE h2_active_connections gauge")
+            lines.append(f"h2_active_connections{{{labels}}} {len(frame_stats.connections)}")
+            lines.append("# HELP h2_open_streams Open HTTP/2 streams across all connections.")
+            lines.append("# TYPE h2_open_streams gauge")
+            lines.append(f"h2_open_streams{{{labels}}} {frame_stats.open_streams}")
+            lines.append("# HELP h2_connections_opened_total HTTP/2 connections accepted.")
+            lines.append("# TYPE h2_connections_opened_total counter")
+            lines.append(f"h2_connections_opened_total{{{labels}}} {frame_stats.connections_opened}")
+
+        lines.append("# HELP event_loop_lag_seconds Lateness of the last event-loop timer probe.")
+        lines.append("# TYPE event_loop_lag_seconds gauge")
+        lines.append(f"event_loop_lag_seconds{{{labels}}} {self.last_loop_lag!r}")
+        lines.append("# HELP event_loop_lag_observed_seconds Event-loop timer lateness.")
+        lines.append("# TYPE event_loop_lag_observed_seconds histogram")
+        self.loop_lag.render("event_loop_lag_observed_seconds", labels, lines)
+
+        lines.append("# HELP process_cpu_seconds_total CPU time used by this process.")
+        lines.append("# TYPE process_cpu_seconds_total counter")
+        lines.append(f"process_cpu_seconds_total{{{labels}}} {time.process_time()!r}")
+        if self.system_sampler is not None:
+            system = self.system_sampler.snapshot
+            lines.append("# HELP process_cpu_percent Process CPU from the latest system sample.")
+            lines.append("# TYPE process_cpu_percent gauge")
+            lines.append(f"process_cpu_percent{{{labels}}} {system.process_cpu_percent}")
+            lines.append("# HELP process_resident_memory_bytes Resident memory from the latest system sample.")
+            lines.append("# TYPE process_resident_memory_bytes gauge")
+            lines.append(f"process_resident_memory_bytes{{{labels}}} {int(system.process_rss_mb * 1048576)}")
+            lines.append("# HELP process_open_fds Open file descriptors from the latest system sample.")
+            lines.append("# TYPE process_open_fds gauge")
+            lines.append(f"process_open_fds{{{labels}}} {system.process_num_fds}")
+            lines.append("# HELP system_cpu_percent Host CPU from the latest system sample.")
+            lines.append("# TYPE system_cpu_percent gauge")
+            lines.append(f"system_cpu_percent{{{labels}}} {system.cpu_percent}")
+
+        lines.append("# HELP process_start_time_seconds Server start time since the epoch.")
+        lines.append("# TYPE process_start_time_seconds gauge")
+        lines.append(f"process_start_time_seconds{{{labels}}} {self.started_at!r}")
+        lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime
+
+import h2.events
+
+
+class ResetRateLimiter:
+    """Token bucket and reset ratio for one HTTP/2 connection.
+
+    Every stream the client resets takes a token; tokens refill at
+    `reset_rate` per second up to `reset_burst`. A connection trips when
+    the bucket runs dry or, once it has opened `min_streams` streams, when
+    more than `max_reset_ratio` of them were reset by the client.
+    """
+    __slots__ = ('tokens', 'updated', 'opened_at', 'streams_opened', 'streams_reset')
+
+    def __init__(self, burst):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.opened_at = self.updated
+        self.streams_opened = 0
+        self.streams_reset = 0
+
+    @property
+    def reset_ratio(self):
+        return self.streams_reset / self.streams_opened if self.streams_opened else 0.0
+
+
+class ResetMitigationPolicy:
+    """Per-server settings for closing connections that abuse stream resets"""
+
+    def __init__(self, server_id, reset_rate=50.0, reset_burst=200, max_reset_ratio=0.8,
+                 min_streams=100, on_trigger=None):
+        self.server_id = server_id
+        self.reset_rate = reset_rate
+        self.reset_burst = reset_burst
+        self.max_reset_ratio = max_reset_ratio
+        self.min_streams = min_streams
+        self.on_trigger = on_trigger
+        self.connections_checked = 0
+        self.mitigations_triggered = 0
+
+    def new_limiter(self):
+        self.connections_checked += 1
+        return ResetRateLimiter(self.reset_burst)
+
+    def check(self, limiter, events):
+        """Update the limiter with a batch of h2 events; return a trip reason or None"""
+        opened = 0
+        resets = 0
+        for event in events:
+            event_type = type(event)
+            if event_type is h2.events.RequestReceived:
+                opened += 1
+            elif event_type is h2.events.StreamReset and event.remote_reset:
+                resets += 1
+
+        if not opened and not resets:
+            return None
+        limiter.streams_opened += opened
+        if not resets:
+            return None
+        limiter.streams_reset += resets
+
+        now = time.monotonic()
+        limiter.tokens = min(
+            self.reset_burst, limiter.tokens + (now - limiter.updated) * self.reset_rate
+        )
+        limiter.updated = now
+        limiter.tokens -= resets
+
+        if limiter.tokens < 0:
+            return "reset_rate_exceeded"
+        if (limiter.streams_opened >= self.min_streams
+                and limiter.reset_ratio > self.max_reset_ratio):
+            return "reset_ratio_exceeded"
+        return None
+
+    def triggered(self, client, limiter, reason):
+        self.mitigations_triggered += 1
+        if not self.on_trigger:
+            return
+        self.on_trigger({
+            "event_type": "mitigation_triggered",
+            "timestamp": datetime.now().isoformat(),
+            "server_id": self.server_id,
+            "client_ip": client[0] if client else "unknown",
+            "client_port": client[1] if client else None,
+            "reason": reason,
+            "action": "goaway",
+            "streams_opened": limiter.streams_opened,
+            "streams_reset": limiter.streams_reset,
+            "reset_ratio": limiter.reset_ratio,
+            "tokens_remaining": limiter.tokens,
+            "connection_age_seconds": time.monotonic() - limiter.opened_at,
+            "mitigations_triggered": self.mitigations_triggered
+        })
@@ -0,0 +1,260 @@
+"""Request trace ids shared by the benign bots and the servers.
+
+Benign bots send every request with an `x-trace-id` header and log the
+id with three wall-clock times: when the request was due (`scheduled_at`),
+when it was handed to the HTTP client (`sent_at`) and when the response
+arrived (`completed_at`). HTTP2Server and the enhanced Flask server log
+the same id with the time the request reached the app (`received_at`) and
+when its handler started and finished (`handler_start`, `handler_end`).
+
+The joiner streams client and server logs in time order, pairs records by
+trace id and writes one latency breakdown per request:
+
+    python -m servers.request_tracing logs/bot_logs/*.log logs/server_logs/*.log \
+        "../Attack simulation OLD/logs/ml_training_data.jsonl" --output logs/request_traces.jsonl
+
+- client_queue_ms: due -> sent (bot scheduling and event-loop lag)
+- network_wait_ms: sent -> received (connection pool wait, connect, request transfer)
+- server_queue_ms: received -> handler start (server dispatch)
+- handler_ms: handler start -> handler end
+- response_ms: handler end -> response received by the bot
+
+Times are compared across processes, so bots and servers must share a
+clock (the same host, or hosts kept in sync with NTP).
+"""
+import argparse
+import gzip
+import heapq
+import itertools
+import json
+import re
+import secrets
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+
+# Mirrored in "Attack simulation OLD"/enhanced_http2_server.py (WSGI, and a
+# separate tree that cannot import this module); change both together
+TRACE_HEADER = "x-trace-id"
+RECEIVED_AT = "trace.received_at"  # ASGI scope key set by stamp_arrivals
+TRACE_ID = re.compile(r'[0-9A-Za-z_-]{1,32}\Z')
+
+COMPONENTS = ('client_queue_ms', 'network_wait_ms', 'server_queue_ms', 'handler_ms',
+              'response_ms', 'total_ms')
+
+# First timestamp on a log line (the asctime prefix, or the JSON timestamp of
+# a plain JSONL event) orders the merge of several files
+LINE_TIMESTAMP = re.compile(r'(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d:\d\d)(?:[.,](\d{1,6}))?')
+TRACE_KEY = '"trace_id"'
+
+
+class TraceIdGenerator:
+    """Compact unique ids: a random per-generator prefix and a counter.
+
+    One generator per bot keeps ids unique across bots and shard processes
+    without coordination; ids are 16 hex characters until the counter
+    passes 2**32.
+    """
+
+    def __init__(self):
+        self.prefix = secrets.token_hex(4)
+        self.counter = itertools.count()
+
+    def next(self):
+        return f"{self.prefix}{next(self.counter):08x}"
+
+
+def parse_trace_id(value):
+    """The header value if it is a well-formed trace id, else None"""
+    if value and TRACE_ID.match(value):
+        return value
+    return None
+
+
+def stamp_arrivals(asgi_app):
+    """ASGI middleware recording when each HTTP request reached the app"""
+
+    async def stamped(scope, receive, send):
+        if scope["type"] == "http":
+            scope[RECEIVED_AT] = time.time()
+        return await asgi_app(scope, receive, send)
+
+    return stamped
+
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    return open(path, errors='replace')
+
+
+def iter_trace_records(path):
+    """(line time, record) for every JSON record on a log line that carries a trace id"""
+    with open_log(path) as f:
+        for line in f:
+            if TRACE_KEY not in line:
+                continue
+            brace = line.find('{')
+            match = LINE_TIMESTAMP.search(line)
+            if brace < 0 or match is None:
+                continue
+            try:
+                record = json.loads(line[brace:])
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or not record.get('trace_id'):
+                continue
+            date, clock, fraction = match.groups()
+            yield f"{date} {clock}.{(fraction or '').ljust(6, '0')}", record
+
+
+def record_time(record):
+    """Wall-clock time of a traced record, for evicting unmatched halves"""
+    for key in ('sent_at', 'received_at', 'handler_start', 'handler_end'):
+        value = record.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _ms(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start) * 1000
+
+
+class TraceJoiner:
+    """Pairs client and server halves of each request by trace id.
+
+    HTTP2Server logs one record per request; the enhanced server logs a
+    `request_start` and a `request_end` event, which are merged into the
+    server half. Halves still unpaired `max_wait` seconds (of log time)
+    after they were seen are dropped and counted as unmatched, so memory
+    stays bounded by the requests in flight during that window.
+    """
+
+    def __init__(self, max_wait=60.0):
+        self.max_wait = max_wait
+        self.pending = {}  # trace_id -> [seen_at, client, server], oldest first
+        self.counts = Counter()
+        self.components = {name: array('d') for name in COMPONENTS}
+
+    def add(self, record):
+        """Feed one traced record; returns the joined breakdown once both halves are in"""
+        trace_id = record['trace_id']
+        seen_at = record_time(record)
+        if seen_at is None:
+            return None
+        self.evict(seen_at)
+
+        entry = self.pending.get(trace_id)
+        if entry is None:
+            entry = self.pending[trace_id] = [seen_at, None, {}]
+        if 'sent_at' in record:
+            entry[1] = record
+        else:
+            entry[2].update(record)
+
+        client, server = entry[1], entry[2]
+        if client is None or 'handler_end' not in server or 'received_at' not in server:
+            return None
+        del self.pending[trace_id]
+        return self.join(client, server)
+
+    def evict(self, now):
+        pending = self.pending
+        horizon = now - self.max_wait
+        while pending:
+            trace_id = next(iter(pending))
+            seen_at, client, _ = pending[trace_id]
+            if seen_at >= horizon:
+                break
+            del pending[trace_id]
+            self.counts['unmatched_client' if client is not None else 'unmatched_server'] += 1
+
+    def join(self, client, server):
+        scheduled = client.get('scheduled_at', client['sent_at'])
+        breakdown = {
+            'client_queue_ms': _ms(scheduled, client['sent_at']),
+            'network_wait_ms': _ms(client['sent_at'], server['received_at']),
+            'server_queue_ms': _ms(server['received_at'], server.get('handler_start')),
+            'handler_ms': _ms(server.get('handler_start'), server['handler_end']),
+            'response_ms': _ms(server['handler_end'], client.get('completed_at')),
+            'total_ms': _ms(scheduled, client.get('completed_at'))
+        }
+        for name, value in breakdown.items():
+            if value is not None:
+                self.components[name].append(value)
+        self.counts['joined'] += 1
+
+        return {
+            'event_type': 'request_trace',
+            'timestamp': datetime.fromtimestamp(client['sent_at']).isoformat(),
+            'trace_id': client['trace_id'],
+            'bot_id': client.get('bot_id'),
+            'bot_type': client.get('bot_type'),
+            'server_id': server.get('server_id'),
+            'url': client.get('url'),
+            'status_code': client.get('status_code', server.get('status_code')),
+            **breakdown
+        }
+
+    def finish(self):
+        """Count every half still waiting for its partner as unmatched"""
+        for _, client, _ in self.pending.values():
+            self.counts['unmatched_client' if client is not None else 'unmatched_server'] += 1
+        self.pending.clear()
+
+    def summary(self):
+        percentiles = {}
+        for name, values in self.components.items():
+            if len(values):
+                ordered = sorted(values)
+                percentiles[name] = {
+                    f'p{p}': ordered[min(len(ordered) - 1, len(ordered) * p // 100)] for p in (50, 95, 99)
+                }
+        return {
+            'event_type': 'request_trace_summary',
+            'timestamp': datetime.now().isoformat(),
+            **{key: self.counts.get(key, 0) for key in ('joined', 'unmatched_client', 'unmatched_server')},
+            'percentiles_ms': percentiles
+        }
+
+
+def join_traces(paths, output, max_wait=60.0):
+    """Stream the logs in line-time order and write one breakdown per joined request"""
+    joiner = TraceJoiner(max_wait)
+    streams = [iter_trace_records(path) for path in paths]
+    with open(output, 'w', buffering=1024 * 1024) as out:
+        for _, record in heapq.merge(*streams, key=lambda item: item[0]):
+            joined = joiner.add(record)
+            if joined is not None:
+                out.write(json.dumps(joined) + "\n")
+    joiner.finish()
+    return joiner.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Join bot and server logs by trace id into latency breakdowns')
+    parser.add_argument('logs', nargs='+', help='Bot logs, server logs and enhanced-server JSONL (plain or .gz)')
+    parser.add_argument('--output', default='logs/request_traces.jsonl')
+    parser.add_argument('--max-wait', type=float, default=60.0,
+                        help='Seconds of log time an unpaired half waits for its partner')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = join_traces(args.logs, args.output, args.max_wait)
+    elapsed = time.perf_counter() - started
+
+    print(f"Joined {summary['joined']:,} requests in {elapsed:.2f}s "
+          f"({summary['unmatched_client']:,} client and {summary['unmatched_server']:,} server records unmatched)")
+    for name in COMPONENTS:
+        stats = summary['percentiles_ms'].get(name)
+        if stats:
+            print(f"  {name:<16} p50 {stats['p50']:>9.2f}  p95 {stats['p95']:>9.2f}  p99 {stats['p99']:>9.2f}")
+    print(f"Request traces saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
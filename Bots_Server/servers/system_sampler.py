@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import psutil
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Point-in-time system and process stats shared by request handlers"""
+    sampled_at: float
+    sample_timestamp: str
+    cpu_percent: float
+    memory_percent: float
+    memory_used_mb: float
+    process_cpu_percent: float
+    process_rss_mb: float
+    process_num_fds: int
+    process_num_threads: int
+
+    def age_ms(self):
+        return (time.time() - self.sampled_at) * 1000
+
+    def as_log_fields(self):
+        return {
+            "cpu_percent": self.cpu_percent,
+            "memory_percent": self.memory_percent,
+            "process_cpu_percent": self.process_cpu_percent,
+            "process_rss_mb": self.process_rss_mb,
+            "process_num_fds": self.process_num_fds,
+            "system_sample_time": self.sample_timestamp
+        }
+
+
+class SystemSampler:
+    """Refresh CPU, memory and per-process stats on a fixed interval.
+
+    Request handlers read `sampler.snapshot` instead of calling psutil on
+    the hot path. The snapshot is replaced as a whole on every refresh, so
+    readers always see one consistent sample together with its timestamp.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.process = psutil.Process(os.getpid())
+        self._task = None
+        self._users = 0
+
+        # The first cpu_percent() call only primes the counters
+        psutil.cpu_percent()
+        self.process.cpu_percent()
+        self.snapshot = self.sample()
+
+    def sample(self):
+        memory = psutil.virtual_memory()
+        with self.process.oneshot():
+            rss = self.process.memory_info().rss
+            process_cpu = self.process.cpu_percent()
+            num_fds = self.process.num_fds() if hasattr(self.process, 'num_fds') else 0
+            num_threads = self.process.num_threads()
+
+        now = time.time()
+        return SystemSnapshot(
+            sampled_at=now,
+            sample_timestamp=datetime.fromtimestamp(now).isoformat(),
+            cpu_percent=psutil.cpu_percent(),
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / 1024 / 1024,
+            process_cpu_percent=process_cpu,
+            process_rss_mb=rss / 1024 / 1024,
+            process_num_fds=num_fds,
+            process_num_threads=num_threads
+        )
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.snapshot = self.sample()
+
+    def start(self):
+        """Start the sampler task; shared samplers are started once per user"""
+        self._users += 1
+        if not self._task:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        self._users -= 1
+        if self._users <= 0 and self._task:
+            self._task.cancel()
+            self._task = None
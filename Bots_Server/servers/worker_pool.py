@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+from datetime import datetime
+
+from servers.log_pipeline import BatchedLogWriter
+
+# Per-worker counter slots in shared memory
+COUNTER_FIELDS = ('request_count', 'connection_count')
+REQUEST_COUNT, CONNECTION_COUNT = range(len(COUNTER_FIELDS))
+
+
+class SharedCounters:
+    """Lock-free per-worker counters in shared memory.
+
+    Every worker owns one row and is the only writer to it, so no lock is
+    needed; readers sum the rows to get the global value.
+    """
+
+    def __init__(self, workers, context=None):
+        context = context or multiprocessing.get_context('spawn')
+        self.workers = workers
+        self.array = context.RawArray('q', workers * len(COUNTER_FIELDS))
+
+    def set(self, worker_index, field, value):
+        self.array[worker_index * len(COUNTER_FIELDS) + field] = value
+
+    def total(self, field):
+        return sum(self.array[field::len(COUNTER_FIELDS)])
+
+    def per_worker(self, field):
+        return list(self.array[field::len(COUNTER_FIELDS)])
+
+
+def worker_main(server_spec, worker_index, shared_counters, server_options):
+    """Entry point of one worker process: serve on a SO_REUSEPORT socket"""
+    # Imported here so spawned workers only load the server when they need it
+    from servers.http2_server import HTTP2Server
+
+    server = HTTP2Server(
+        server_spec['host'], server_spec['port'], server_spec['id'],
+        worker_index=worker_index,
+        shared_counters=shared_counters,
+        reuse_port=True,
+        **server_options
+    )
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        pass
+
+
+async def aggregate_worker_counters(server_id, shared_counters, processes, interval=5.0):
+    """Periodically log the global counters of one logical server"""
+    writer = BatchedLogWriter(
+        f'logs/server_logs/{server_id}.log',
+        prefix=f'[{server_id}] ',
+        source=server_id
+    )
+    writer.start()
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            writer.write({
+                "event_type": "worker_aggregate",
+                "timestamp": datetime.now().isoformat(),
+                "server_id": server_id,
+                "workers": len(processes),
+                "workers_alive": sum(1 for p in processes if p.is_alive()),
+                "request_count": shared_counters.total(REQUEST_COUNT),
+                "connection_count": shared_counters.total(CONNECTION_COUNT),
+                "requests_per_worker": shared_counters.per_worker(REQUEST_COUNT),
+                "connections_per_worker": shared_counters.per_worker(CONNECTION_COUNT)
+            })
+    finally:
+        writer.close()
+
+
+async def run_worker_servers(server_specs, workers, server_options=None, aggregate_interval=5.0):
+    """Fork `workers` processes per logical server, all bound with SO_REUSEPORT"""
+    context = multiprocessing.get_context('spawn')
+    server_options = server_options or {}
+    processes = []
+    aggregators = []
+
+    for spec in server_specs:
+        shared_counters = SharedCounters(workers, context)
+        server_processes = []
+        for worker_index in range(workers):
+            process = context.Process(
+                target=worker_main,
+                args=(spec, worker_index, shared_counters, server_options),
+                name=f"{spec['id']}-w{worker_index}",
+                daemon=True
+            )
+            process.start()
+            server_processes.append(process)
+        processes.extend(server_processes)
+        aggregators.append(asyncio.create_task(
+            aggregate_worker_counters(spec['id'], shared_counters, server_processes, aggregate_interval)
+        ))
+
+    try:
+        await asyncio.gather(*aggregators)
+    finally:
+        for task in aggregators:
+            task.cancel()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(5)
@@ -0,0 +1,108 @@
+import json
+import random
+
+import pytest
+
+from bots.bot_stats import LATENCY_BOUNDS_MS, BotStats
+from servers.metrics import Histogram, log_bounds
+
+BOUNDS = (1.0, 2.0, 5.0, 10.0)
+
+
+def exact_percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(1, -(-len(ordered) * pct // 100)) - 1]
+
+
+def test_values_on_a_bound_fall_into_that_bucket():
+    histogram = Histogram(BOUNDS)
+    for value in (0.5, 1.0, 1.5, 2.0, 10.0, 11.0):
+        histogram.observe(value)
+
+    assert histogram.buckets == [2, 2, 0, 1, 1]
+    assert histogram.count == 6
+    assert histogram.sum == pytest.approx(26.0)
+
+
+def test_percentile_is_the_upper_bound_of_the_target_bucket():
+    histogram = Histogram(BOUNDS)
+    for value in (0.5, 1.5, 1.5, 3.0, 7.0):
+        histogram.observe(value)
+
+    assert histogram.percentile(1) == 1.0
+    assert histogram.percentile(20) == 1.0
+    assert histogram.percentile(21) == 2.0
+    assert histogram.percentile(60) == 2.0
+    assert histogram.percentile(80) == 5.0
+    assert histogram.percentile(100) == 10.0
+
+
+def test_percentile_of_overflow_bucket_is_the_last_bound():
+    histogram = Histogram(BOUNDS)
+    histogram.observe(1000.0)
+    assert histogram.percentile(50) == 10.0
+
+
+def test_empty_histogram_percentile_is_zero():
+    assert Histogram(BOUNDS).percentile(99) == 0.0
+
+
+def test_merge_equals_one_histogram_of_all_values():
+    rng = random.Random(1)
+    values = [rng.uniform(0, 12) for _ in range(1000)]
+    left, right, whole = Histogram(BOUNDS), Histogram(BOUNDS), Histogram(BOUNDS)
+    for i, value in enumerate(values):
+        (left if i % 3 else right).observe(value)
+        whole.observe(value)
+
+    left.merge(right)
+    assert left.buckets == whole.buckets
+    assert left.count == whole.count == len(values)
+    assert left.sum == pytest.approx(whole.sum)
+
+
+def test_merge_rejects_other_bounds():
+    with pytest.raises(ValueError):
+        Histogram(BOUNDS).merge(Histogram((1.0, 2.0)))
+
+
+def test_dict_round_trip_through_json():
+    histogram = Histogram(BOUNDS)
+    for value in (0.2, 3.0, 3.0, 50.0):
+        histogram.observe(value)
+
+    # Bucket indexes become strings once the dict crosses JSON
+    restored = Histogram.from_dict(BOUNDS, json.loads(json.dumps(histogram.to_dict())))
+    assert restored.buckets == histogram.buckets
+    assert restored.count == histogram.count
+    assert restored.sum == histogram.sum
+
+
+def test_log_bounds_grow_geometrically_past_high():
+    bounds = log_bounds(0.1, 1000.0, 1.5)
+    assert bounds[0] == 0.1
+    assert bounds[-2] < 1000.0 <= bounds[-1]
+    assert all(b / a == pytest.approx(1.5) for a, b in zip(bounds, bounds[1:]))
+
+
+def test_bot_stats_percentiles_within_bucket_error_after_shard_merge():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3.0, 1.0) for _ in range(20000)]
+    shards = [BotStats() for _ in range(4)]
+    for i, value in enumerate(values):
+        shards[i % 4].record(value)
+    shards[0].record_error()
+
+    merged = BotStats()
+    for shard in shards:
+        merged.merge(BotStats.from_dict(json.loads(json.dumps(shard.to_dict()))))
+
+    assert merged.requests == len(values)
+    assert merged.errors == 1
+    for pct in (50, 95, 99):
+        exact = exact_percentile(values, pct)
+        reported = merged.latency.percentile(pct)
+        # The reported value is the bucket's upper bound: never below the
+        # exact percentile and at most one growth step above it
+        assert exact <= reported <= exact * 1.05 + 1e-9
+    assert len(LATENCY_BOUNDS_MS) == len(merged.latency.bounds)
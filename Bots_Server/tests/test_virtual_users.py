@@ -0,0 +1,42 @@
+import heapq
+
+import pytest
+
+from bots.virtual_users import USER_AGENTS, USER_BITS, USER_MASK, VirtualUserScheduler
+
+SERVERS = ["https://localhost:8000", "https://localhost:8001"]
+
+
+def make_scheduler(tmp_path, **options):
+    return VirtualUserScheduler(
+        SERVERS, client_pool=None, seed=11, log_path=str(tmp_path / "virtual_users.log"), **options
+    )
+
+
+def test_heap_keys_pack_due_time_and_user_id(tmp_path):
+    scheduler = make_scheduler(tmp_path, user_count=5000, ramp_up=2.0, session_requests=(3, 9))
+    scheduler.populate()
+
+    keys = list(scheduler.heap)
+    assert sorted(key & USER_MASK for key in keys) == list(range(5000))
+    assert all(0 <= key >> USER_BITS <= 2000 for key in keys)
+
+    # Heap order is due-time order, whatever the user ids
+    due = [heapq.heappop(keys) >> USER_BITS for _ in range(len(keys))]
+    assert due == sorted(due)
+
+
+def test_sessions_stay_within_configured_ranges(tmp_path):
+    scheduler = make_scheduler(tmp_path, user_count=2000, session_requests=(3, 9))
+    scheduler.populate()
+
+    assert scheduler.sessions_started == 2000
+    assert set(scheduler.remaining) <= set(range(3, 10))
+    assert set(scheduler.server_index) <= set(range(len(SERVERS)))
+    assert set(scheduler.agent_index) <= set(range(len(USER_AGENTS)))
+
+
+@pytest.mark.parametrize("session_requests", [(0, 5), (5, 3), (1, 0x10000)])
+def test_session_requests_must_fit_the_remaining_array(tmp_path, session_requests):
+    with pytest.raises(ValueError):
+        make_scheduler(tmp_path, session_requests=session_requests)